@@ -12,6 +12,11 @@ from bot.services.stars_service import StarsService
 from bot.services.tribute_service import TributeService
 from bot.services.crypto_pay_service import CryptoPayService
 from bot.services.panel_webhook_service import PanelWebhookService
+from bot.services.webhook_inbox import WebhookInbox
+from bot.services.renewal_scheduler import RenewalScheduler
+from bot.services.expiry_notifier import ExpiryNotificationScheduler
+from bot.services.promo_lookup import init_promo_lookup_cache
+from bot.services.user_search import UserSearchService
 
 
 def build_core_services(
@@ -22,9 +27,18 @@ def build_core_services(
     bot_username_for_default_return: str,
 ):
     panel_service = PanelApiService(settings)
+    webhook_inbox = WebhookInbox(
+        async_session_factory,
+        workers=settings.WEBHOOK_INBOX_WORKERS,
+        max_attempts=settings.WEBHOOK_INBOX_MAX_ATTEMPTS,
+        retry_base_seconds=settings.WEBHOOK_INBOX_RETRY_BASE_SECONDS,
+        retry_max_seconds=settings.WEBHOOK_INBOX_RETRY_MAX_SECONDS,
+        retention_days=settings.WEBHOOK_INBOX_RETENTION_DAYS,
+    )
     subscription_service = SubscriptionService(settings, panel_service, bot, i18n)
     referral_service = ReferralService(settings, subscription_service, bot, i18n)
     promo_code_service = PromoCodeService(settings, subscription_service, bot, i18n)
+    promo_lookup_cache = init_promo_lookup_cache(settings, async_session_factory)
     stars_service = StarsService(bot, settings, i18n, subscription_service, referral_service)
     cryptopay_service = CryptoPayService(
         settings.CRYPTOPAY_TOKEN,
@@ -46,6 +60,8 @@ def build_core_services(
         referral_service,
     )
     panel_webhook_service = PanelWebhookService(bot, settings, i18n, async_session_factory, panel_service)
+    renewal_scheduler = RenewalScheduler(bot, settings, i18n, async_session_factory, subscription_service)
+    expiry_notifier = ExpiryNotificationScheduler(bot, settings, i18n, async_session_factory)
     yookassa_service = YooKassaService(
         shop_id=settings.YOOKASSA_SHOP_ID,
         secret_key=settings.YOOKASSA_SECRET_KEY,
@@ -60,6 +76,11 @@ def build_core_services(
         setattr(subscription_service, "yookassa_service", yookassa_service)
         # Allow panel webhook to trigger renewals through subscription service
         setattr(panel_webhook_service, "subscription_service", subscription_service)
+        # With the scheduler running, the 24h webhook no longer charges
+        setattr(panel_webhook_service, "renewal_scheduler", renewal_scheduler)
+        # Webhook routes store events in the inbox; workers apply them later
+        for service in (tribute_service, cryptopay_service, panel_webhook_service):
+            setattr(service, "webhook_inbox", webhook_inbox)
     except Exception:
         pass
 
@@ -73,6 +94,11 @@ def build_core_services(
         "tribute_service": tribute_service,
         "panel_webhook_service": panel_webhook_service,
         "yookassa_service": yookassa_service,
+        "webhook_inbox": webhook_inbox,
+        "renewal_scheduler": renewal_scheduler,
+        "expiry_notifier": expiry_notifier,
+        "promo_lookup_cache": promo_lookup_cache,
+        "user_search_service": UserSearchService(),
     }
 
 
@@ -1,12 +1,66 @@
 # flake8: noqa: E501
 import asyncio
+import functools
 import logging
+import time
+from typing import Awaitable, Callable
 from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 from sqlalchemy.orm import sessionmaker
 
 from config.settings import Settings
+from bot.utils.message_queue import get_queue_manager
+from bot.utils.metrics import (
+    CONTENT_TYPE_LATEST,
+    QUEUE_DEPTH,
+    QUEUE_PROCESSING,
+    QUEUE_RECENT_SENDS,
+    WEBHOOK_DURATION,
+    render_latest,
+)
+
+
+def _timed_webhook(
+    provider: str,
+    handler: Callable[[web.Request], Awaitable[web.StreamResponse]],
+) -> Callable[[web.Request], Awaitable[web.StreamResponse]]:
+    """Wrap a webhook route so its processing time is recorded per provider."""
+
+    async def wrapper(request: web.Request) -> web.StreamResponse:
+        started = time.perf_counter()
+        status = "exception"
+        try:
+            response = await handler(request)
+            status = str(response.status)
+            return response
+        except web.HTTPException as http_exc:
+            status = str(http_exc.status)
+            raise
+        finally:
+            WEBHOOK_DURATION.observe(time.perf_counter() - started, provider, status)
+
+    return wrapper
+
+
+def _queue_stat_sampler(group_key: str, user_key: str):
+
+    def sample():
+        queue_manager = get_queue_manager()
+        if not queue_manager:
+            return {}
+        stats = queue_manager.get_queue_stats()
+        return {
+            ("group", ): float(stats.get(group_key, 0)),
+            ("user", ): float(stats.get(user_key, 0)),
+        }
+
+    return sample
+
+
+QUEUE_DEPTH.set_callback(_queue_stat_sampler("group_queue_size", "user_queue_size"))
+QUEUE_RECENT_SENDS.set_callback(_queue_stat_sampler("group_recent_sends", "user_recent_sends"))
+QUEUE_PROCESSING.set_callback(_queue_stat_sampler("group_queue_processing", "user_queue_processing"))
 
 
 async def build_and_start_web_app(
@@ -31,6 +85,7 @@ async def build_and_start_web_app(
         "cryptopay_service",
         "tribute_service",
         "panel_webhook_service",
+        "webhook_inbox",
     ):
         # Access dispatcher workflow_data directly to avoid sequence protocol issues
         if hasattr(dp, "workflow_data") and key in dp.workflow_data:  # type: ignore
@@ -56,6 +111,13 @@ async def build_and_start_web_app(
     async def miniapp_ping_handler(_: web.Request) -> web.Response:
         return web.Response(status=200, text="miniapp-ok")
 
+    async def metrics_handler(_: web.Request) -> web.Response:
+        return web.Response(
+            status=200,
+            body=render_latest().encode("utf-8"),
+            headers={"Content-Type": CONTENT_TYPE_LATEST},
+        )
+
     async def miniapp_sub_handler(request: web.Request) -> web.StreamResponse:
         """Resolve current user's subscription link on the panel and redirect there.
         Accepts Telegram WebApp initData via header 'X-Telegram-Init-Data' or
@@ -128,36 +190,51 @@ async def build_and_start_web_app(
 
     app.router.add_get("/healthz", health_handler)
     app.router.add_get("/miniapp/ping", miniapp_ping_handler)
+    app.router.add_get("/metrics", metrics_handler)
     # Support both with and without trailing slash for Telegram WebView peculiarities
     app.router.add_get("/miniapp/sub", miniapp_sub_handler)
     app.router.add_get("/miniapp/sub/", miniapp_sub_handler)
 
-    from bot.handlers.user.payment import yookassa_webhook_route
+    from bot.handlers.user.payment import process_yookassa_webhook_event, yookassa_webhook_route
     from bot.services.tribute_service import tribute_webhook_route
     from bot.services.crypto_pay_service import cryptopay_webhook_route
     from bot.services.panel_webhook_service import panel_webhook_route
 
+    webhook_inbox = app.get("webhook_inbox")
+    if webhook_inbox:
+        webhook_inbox.register_handler(
+            "yookassa", functools.partial(process_yookassa_webhook_event, app))
+        for provider, service_key in (
+            ("tribute", "tribute_service"),
+            ("cryptopay", "cryptopay_service"),
+            ("panel", "panel_webhook_service"),
+        ):
+            service = app.get(service_key)
+            if service:
+                webhook_inbox.register_handler(provider, service.process_webhook_event)
+        webhook_inbox.start()
+
     tribute_path = settings.tribute_webhook_path
     if tribute_path.startswith("/"):
-        app.router.add_post(tribute_path, tribute_webhook_route)
+        app.router.add_post(tribute_path, _timed_webhook("tribute", tribute_webhook_route))
         logging.info(
             f"Tribute webhook route configured at: [POST] {tribute_path}")
 
     cp_path = settings.cryptopay_webhook_path
     if cp_path.startswith("/"):
-        app.router.add_post(cp_path, cryptopay_webhook_route)
+        app.router.add_post(cp_path, _timed_webhook("cryptopay", cryptopay_webhook_route))
         logging.info(
             f"CryptoPay webhook route configured at: [POST] {cp_path}")
 
     # YooKassa webhook (register only when base URL present and path configured)
     yk_path = settings.yookassa_webhook_path
     if settings.WEBHOOK_BASE_URL and yk_path and yk_path.startswith("/"):
-        app.router.add_post(yk_path, yookassa_webhook_route)
+        app.router.add_post(yk_path, _timed_webhook("yookassa", yookassa_webhook_route))
         logging.info(f"YooKassa webhook route configured at: [POST] {yk_path}")
 
     panel_path = settings.panel_webhook_path
     if panel_path.startswith("/"):
-        app.router.add_post(panel_path, panel_webhook_route)
+        app.router.add_post(panel_path, _timed_webhook("panel", panel_webhook_route))
         logging.info(f"Panel webhook route configured at: [POST] {panel_path}")
 
     web_app_runner = web.AppRunner(app)
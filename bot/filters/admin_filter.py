@@ -1,17 +1,24 @@
-from typing import List, Union
+from typing import List, Optional, Union
 from aiogram.filters import Filter
 from aiogram.types import Message, CallbackQuery, User
 
+from config.runtime import get_runtime_config
+
 
 class AdminFilter(Filter):
+    """Passes events from admins.
+
+    Without an explicit `admin_ids` list the current runtime config snapshot
+    is consulted, so admin changes apply after a config reload.
+    """
 
-    def __init__(self, admin_ids: List[int]):
-        self.admin_ids = admin_ids
+    def __init__(self, admin_ids: Optional[List[int]] = None):
+        self.admin_ids = frozenset(admin_ids) if admin_ids is not None else None
 
     async def __call__(self, event: Union[Message, CallbackQuery],
                        event_from_user: User) -> bool:
         if not event_from_user:
             return False
-        if not self.admin_ids:
-            return False
+        if self.admin_ids is None:
+            return get_runtime_config().is_admin(event_from_user.id)
         return event_from_user.id in self.admin_ids
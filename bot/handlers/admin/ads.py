@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from config.settings import Settings
 from bot.middlewares.i18n import JsonI18n
 from db.dal import ad_dal
+from db.read_replica import ReportingDatabase, reporting_session
 from bot.states.admin_states import AdminStates
 
 router = Router(name="admin_ads_router")
@@ -17,7 +18,8 @@ PAGE_SIZE = 5
 
 
 @router.callback_query(F.data == "admin_action:ads")
-async def show_ads_menu(callback: types.CallbackQuery, settings: Settings, i18n_data: dict, session: AsyncSession):
+async def show_ads_menu(callback: types.CallbackQuery, settings: Settings, i18n_data: dict, session: AsyncSession,
+                        reporting_db: Optional[ReportingDatabase] = None):
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
     _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs) if i18n else key
@@ -26,12 +28,17 @@ async def show_ads_menu(callback: types.CallbackQuery, settings: Settings, i18n_
         await callback.answer("Language error.", show_alert=True)
         return
 
-    totals = await ad_dal.get_totals(session)
+    use_counters = settings.AD_STATS_USE_COUNTERS
+    async with reporting_session(reporting_db, session) as report_session:
+        totals = await ad_dal.get_totals(report_session, use_counters=use_counters)
+        total_count = await ad_dal.count_campaigns(report_session)
+        campaigns = await ad_dal.list_campaigns_paged(report_session, page=0, page_size=PAGE_SIZE) if total_count else []
+        stats = await ad_dal.get_campaigns_stats(
+            report_session, [c.ad_campaign_id for c in campaigns], use_counters=use_counters)
     total_cost = totals.get("cost", 0.0)
     total_revenue = totals.get("revenue", 0.0)
     overview = _("admin_ads_overview", revenue=f"{total_revenue:.2f}", cost=f"{total_cost:.2f}")
 
-    total_count = await ad_dal.count_campaigns(session)
     if total_count == 0:
         text = overview + "\n\n" + _("admin_ads_empty")
         from bot.keyboards.inline.admin_keyboards import get_ads_menu_keyboard
@@ -39,10 +46,9 @@ async def show_ads_menu(callback: types.CallbackQuery, settings: Settings, i18n_
     else:
         current_page = 0
         total_pages = max(1, (total_count + PAGE_SIZE - 1) // PAGE_SIZE)
-        campaigns = await ad_dal.list_campaigns_paged(session, page=current_page, page_size=PAGE_SIZE)
         text = overview + "\n\n" + _("admin_ads_header")
         from bot.keyboards.inline.admin_keyboards import get_ads_list_keyboard
-        reply_markup = get_ads_list_keyboard(i18n, current_lang, campaigns, current_page, total_pages)
+        reply_markup = get_ads_list_keyboard(i18n, current_lang, campaigns, current_page, total_pages, stats)
     await callback.message.edit_text(text, reply_markup=reply_markup)
     try:
         await callback.answer()
@@ -51,7 +57,8 @@ async def show_ads_menu(callback: types.CallbackQuery, settings: Settings, i18n_
 
 
 @router.callback_query(F.data.startswith("admin_ads:page:"))
-async def ads_list_pagination(callback: types.CallbackQuery, settings: Settings, i18n_data: dict, session: AsyncSession):
+async def ads_list_pagination(callback: types.CallbackQuery, settings: Settings, i18n_data: dict, session: AsyncSession,
+                              reporting_db: Optional[ReportingDatabase] = None):
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
     _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs) if i18n else key
@@ -64,16 +71,19 @@ async def ads_list_pagination(callback: types.CallbackQuery, settings: Settings,
     except Exception:
         page = 0
 
-    totals = await ad_dal.get_totals(session)
+    use_counters = settings.AD_STATS_USE_COUNTERS
+    async with reporting_session(reporting_db, session) as report_session:
+        totals = await ad_dal.get_totals(report_session, use_counters=use_counters)
+        total_count = await ad_dal.count_campaigns(report_session)
+        total_pages = max(1, (total_count + PAGE_SIZE - 1) // PAGE_SIZE)
+        page = max(0, min(page, total_pages - 1))
+        campaigns = await ad_dal.list_campaigns_paged(report_session, page=page, page_size=PAGE_SIZE)
+        stats = await ad_dal.get_campaigns_stats(
+            report_session, [c.ad_campaign_id for c in campaigns], use_counters=use_counters)
     overview = _("admin_ads_overview", revenue=f"{totals.get('revenue', 0.0):.2f}", cost=f"{totals.get('cost', 0.0):.2f}")
-    total_count = await ad_dal.count_campaigns(session)
-    total_pages = max(1, (total_count + PAGE_SIZE - 1) // PAGE_SIZE)
-    page = max(0, min(page, total_pages - 1))
-
-    campaigns = await ad_dal.list_campaigns_paged(session, page=page, page_size=PAGE_SIZE)
     text = overview + "\n\n" + _("admin_ads_header")
     from bot.keyboards.inline.admin_keyboards import get_ads_list_keyboard
-    reply_markup = get_ads_list_keyboard(i18n, current_lang, campaigns, page, total_pages)
+    reply_markup = get_ads_list_keyboard(i18n, current_lang, campaigns, page, total_pages, stats)
     try:
         await callback.message.edit_text(text, reply_markup=reply_markup)
         await callback.answer()
@@ -83,7 +93,8 @@ async def ads_list_pagination(callback: types.CallbackQuery, settings: Settings,
 
 
 @router.callback_query(F.data.startswith("admin_ads:card:"))
-async def show_ad_card(callback: types.CallbackQuery, settings: Settings, i18n_data: dict, session: AsyncSession):
+async def show_ad_card(callback: types.CallbackQuery, settings: Settings, i18n_data: dict, session: AsyncSession,
+                       reporting_db: Optional[ReportingDatabase] = None):
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
     _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs) if i18n else key
@@ -95,14 +106,16 @@ async def show_ad_card(callback: types.CallbackQuery, settings: Settings, i18n_d
     camp_id = int(parts[2])
     back_page = int(parts[3]) if len(parts) > 3 else 0
 
-    camp = await ad_dal.get_campaign_by_id(session, camp_id)
-    if not camp:
-        await callback.answer(_("admin_promo_not_found"), show_alert=True)
-        return
-    try:
-        stats = await ad_dal.get_campaign_stats(session, camp_id)
-    except Exception:
-        stats = {"starts": 0, "trials": 0, "payers": 0, "revenue": 0.0}
+    async with reporting_session(reporting_db, session) as report_session:
+        camp = await ad_dal.get_campaign_by_id(report_session, camp_id)
+        if not camp:
+            await callback.answer(_("admin_promo_not_found"), show_alert=True)
+            return
+        try:
+            stats = await ad_dal.get_campaign_stats(
+                report_session, camp_id, use_counters=settings.AD_STATS_USE_COUNTERS)
+        except Exception:
+            stats = dict(ad_dal.EMPTY_STATS)
 
     text = _(
         "admin_ads_card",
@@ -1,3 +1,4 @@
+import html
 import logging
 from aiogram import Router, F, types, Bot
 from aiogram.filters import Command
@@ -6,6 +7,7 @@ from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.settings import Settings
+from config.runtime import reload_runtime_config, get_runtime_config
 from bot.keyboards.inline.admin_keyboards import (
     get_admin_panel_keyboard, get_stats_monitoring_keyboard, 
     get_user_management_keyboard, get_ban_management_keyboard,
@@ -15,6 +17,8 @@ from bot.middlewares.i18n import JsonI18n
 from bot.services.panel_api_service import PanelApiService
 from bot.services.subscription_service import SubscriptionService
 from bot.utils.message_queue import get_queue_manager
+from db.dal import webhook_inbox_dal
+from db.read_replica import ReportingDatabase
 
 from . import broadcast as admin_broadcast_handlers
 from .promo import create as admin_promo_create_handlers
@@ -49,11 +53,90 @@ async def admin_panel_command_handler(
                              i18n, current_lang, settings))
 
 
+@router.message(Command("reload_config"))
+async def reload_config_command_handler(message: types.Message,
+                                        settings: Settings, i18n_data: dict):
+    current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
+    i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
+    if not i18n:
+        logging.error("i18n missing in reload_config_command_handler")
+        await message.answer("Language service error.")
+        return
+    _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
+
+    ok, details = reload_runtime_config()
+    if ok:
+        logging.info(f"Admin {message.from_user.id} reloaded runtime config ({details}).")
+        await message.answer(_("admin_config_reloaded",
+                               version=get_runtime_config().version))
+    else:
+        await message.answer(_("admin_config_reload_failed",
+                               error=html.escape(details[:1000])))
+
+
+@router.message(Command("webhook_dead"))
+async def webhook_dead_command_handler(message: types.Message, settings: Settings,
+                                       i18n_data: dict, session: AsyncSession):
+    current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
+    i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
+    if not i18n:
+        logging.error("i18n missing in webhook_dead_command_handler")
+        await message.answer("Language service error.")
+        return
+    _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
+
+    counts = await webhook_inbox_dal.count_by_status(session)
+    dead_events = await webhook_inbox_dal.get_dead_events(session, limit=10)
+    parts = [_("admin_webhook_inbox_summary",
+               pending=counts.get(webhook_inbox_dal.STATUS_PENDING, 0),
+               processing=counts.get(webhook_inbox_dal.STATUS_PROCESSING, 0),
+               done=counts.get(webhook_inbox_dal.STATUS_DONE, 0),
+               dead=counts.get(webhook_inbox_dal.STATUS_DEAD, 0))]
+    if not dead_events:
+        parts.append(_("admin_webhook_dead_empty"))
+    for event in dead_events:
+        parts.append(_("admin_webhook_dead_item",
+                       id=event.event_pk,
+                       provider=html.escape(event.provider),
+                       event_id=html.escape(event.event_id[:64]),
+                       created_at=event.created_at.strftime('%Y-%m-%d %H:%M') if event.created_at else "-",
+                       attempts=event.attempts,
+                       error=html.escape((event.last_error or "")[:300])))
+    if dead_events:
+        parts.append(_("admin_webhook_dead_footer"))
+    await message.answer("\n\n".join(parts))
+
+
+@router.message(Command("webhook_retry"))
+async def webhook_retry_command_handler(message: types.Message, settings: Settings,
+                                        i18n_data: dict, session: AsyncSession):
+    current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
+    i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
+    if not i18n:
+        logging.error("i18n missing in webhook_retry_command_handler")
+        await message.answer("Language service error.")
+        return
+    _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
+
+    args = (message.text or "").split()
+    if len(args) < 2 or not args[1].isdigit():
+        await message.answer(_("admin_webhook_retry_usage"))
+        return
+    event_pk = int(args[1])
+    if await webhook_inbox_dal.requeue_dead_event(session, event_pk):
+        await session.commit()
+        logging.info(f"Admin {message.from_user.id} requeued webhook inbox event {event_pk}.")
+        await message.answer(_("admin_webhook_requeued", id=event_pk))
+    else:
+        await message.answer(_("admin_webhook_requeue_not_found", id=event_pk))
+
+
 @router.callback_query(F.data.startswith("admin_action:"))
 async def admin_panel_actions_callback_handler(
         callback: types.CallbackQuery, state: FSMContext, settings: Settings,
         i18n_data: dict, bot: Bot, panel_service: PanelApiService,
-        subscription_service: SubscriptionService, session: AsyncSession):
+        subscription_service: SubscriptionService, session: AsyncSession,
+        reporting_db: Optional[ReportingDatabase] = None):
     action_parts = callback.data.split(":")
     action = action_parts[1]
 
@@ -75,7 +158,10 @@ async def admin_panel_actions_callback_handler(
 
     if action == "stats":
         await admin_stats_handlers.show_statistics_handler(
-            callback, i18n_data, settings, session)
+            callback, i18n_data, settings, session, reporting_db)
+    elif action == "top_referrers":
+        await admin_stats_handlers.show_top_referrers_handler(
+            callback, i18n_data, settings, session, reporting_db)
     elif action == "broadcast":
         await admin_broadcast_handlers.broadcast_message_prompt_handler(
             callback, state, i18n_data, settings, session)
@@ -126,10 +212,10 @@ async def admin_panel_actions_callback_handler(
     elif action == "view_payments":
         from . import payments as admin_payments_handlers
         await admin_payments_handlers.view_payments_handler(
-            callback, i18n_data, settings, session)
+            callback, i18n_data, settings, session, reporting_db=reporting_db)
     elif action == "ads":
         from . import ads as admin_ads_handlers
-        await admin_ads_handlers.show_ads_menu(callback, settings, i18n_data, session)
+        await admin_ads_handlers.show_ads_menu(callback, settings, i18n_data, session, reporting_db)
     elif action == "ads_create":
         from . import ads as admin_ads_handlers
         await admin_ads_handlers.ads_create_start(callback, state, settings, i18n_data)
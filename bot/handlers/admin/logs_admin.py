@@ -14,6 +14,7 @@ from config.settings import Settings
 
 from db.dal import message_log_dal, user_dal
 from db.models import MessageLog, User
+from db.read_replica import ReportingDatabase, reporting_session
 
 from bot.states.admin_states import AdminStates
 from bot.keyboards.inline.admin_keyboards import (
@@ -156,7 +157,8 @@ async def _display_formatted_logs(target_message: types.Message,
 @router.callback_query(F.data.startswith("admin_logs:view_all"))
 async def view_all_logs_handler(callback: types.CallbackQuery,
                                 settings: Settings, i18n_data: dict,
-                                session: AsyncSession):
+                                session: AsyncSession,
+                                reporting_db: Optional[ReportingDatabase] = None):
     page_idx = 0
     parts = callback.data.split(":")
     if len(parts) == 3:
@@ -171,9 +173,12 @@ async def view_all_logs_handler(callback: types.CallbackQuery,
         await callback.answer("Error processing request.", show_alert=True)
         return
 
-    logs_models = await message_log_dal.get_all_message_logs(
-        session, settings.LOGS_PAGE_SIZE, page_idx * settings.LOGS_PAGE_SIZE)
-    total_logs_count = await message_log_dal.count_all_message_logs(session)
+    async with reporting_session(reporting_db, session) as report_session:
+        logs_models = await message_log_dal.get_all_message_logs(
+            report_session, settings.LOGS_PAGE_SIZE,
+            page_idx * settings.LOGS_PAGE_SIZE)
+        total_logs_count = await message_log_dal.count_all_message_logs(
+            report_session)
 
     await _display_formatted_logs(
         target_message=callback.message,
@@ -212,7 +217,8 @@ async def prompt_user_for_logs_handler(callback: types.CallbackQuery,
 async def process_user_id_for_logs_handler(message: types.Message,
                                            state: FSMContext,
                                            settings: Settings, i18n_data: dict,
-                                           session: AsyncSession):
+                                           session: AsyncSession,
+                                           reporting_db: Optional[ReportingDatabase] = None):
     await state.clear()
 
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
@@ -247,10 +253,11 @@ async def process_user_id_for_logs_handler(message: types.Message,
         f"@{user_model_for_logs.username}"
         if user_model_for_logs.username else f"ID {target_user_id}")
 
-    logs_models = await message_log_dal.get_user_message_logs(
-        session, target_user_id, settings.LOGS_PAGE_SIZE, 0)
-    total_user_logs_count = await message_log_dal.count_user_message_logs(
-        session, target_user_id)
+    async with reporting_session(reporting_db, session) as report_session:
+        logs_models = await message_log_dal.get_user_message_logs(
+            report_session, target_user_id, settings.LOGS_PAGE_SIZE, 0)
+        total_user_logs_count = await message_log_dal.count_user_message_logs(
+            report_session, target_user_id)
 
     await _display_formatted_logs(
         target_message=message,
@@ -268,7 +275,8 @@ async def process_user_id_for_logs_handler(message: types.Message,
 @router.callback_query(F.data.startswith("admin_logs:view_user:"))
 async def view_user_logs_paginated_handler(callback: types.CallbackQuery,
                                            settings: Settings, i18n_data: dict,
-                                           session: AsyncSession):
+                                           session: AsyncSession,
+                                           reporting_db: Optional[ReportingDatabase] = None):
     try:
         parts = callback.data.split(":")
         target_user_id = int(parts[2])
@@ -294,11 +302,12 @@ async def view_user_logs_paginated_handler(callback: types.CallbackQuery,
         f"@{user_model_for_logs.username}"
         if user_model_for_logs.username else f"ID {target_user_id}")
 
-    logs_models = await message_log_dal.get_user_message_logs(
-        session, target_user_id, settings.LOGS_PAGE_SIZE,
-        page_idx * settings.LOGS_PAGE_SIZE)
-    total_user_logs_count = await message_log_dal.count_user_message_logs(
-        session, target_user_id)
+    async with reporting_session(reporting_db, session) as report_session:
+        logs_models = await message_log_dal.get_user_message_logs(
+            report_session, target_user_id, settings.LOGS_PAGE_SIZE,
+            page_idx * settings.LOGS_PAGE_SIZE)
+        total_user_logs_count = await message_log_dal.count_user_message_logs(
+            report_session, target_user_id)
 
     await _display_formatted_logs(
         target_message=callback.message,
@@ -329,7 +338,8 @@ async def cancel_log_user_input_state_to_menu(callback: types.CallbackQuery,
 @router.callback_query(F.data == "admin_logs:export_csv")
 async def export_logs_csv_handler(callback: types.CallbackQuery,
                                  settings: Settings, i18n_data: dict,
-                                 session: AsyncSession):
+                                 session: AsyncSession,
+                                 reporting_db: Optional[ReportingDatabase] = None):
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     if not i18n or not callback.message:
@@ -344,8 +354,9 @@ async def export_logs_csv_handler(callback: types.CallbackQuery,
 
     try:
         # Get all logs (limit to 10000 for performance)
-        logs_models = await message_log_dal.get_all_message_logs(
-            session, limit=10000, offset=0)
+        async with reporting_session(reporting_db, session) as report_session:
+            logs_models = await message_log_dal.get_all_message_logs(
+                report_session, limit=10000, offset=0)
         
         if not logs_models:
             await callback.message.answer(_(
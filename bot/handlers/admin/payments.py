@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from config.settings import Settings
 from db.dal import payment_dal
 from db.models import Payment
+from db.read_replica import ReportingDatabase, reporting_session
 from bot.keyboards.inline.admin_keyboards import get_back_to_admin_panel_keyboard
 from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardButton
 from bot.middlewares.i18n import JsonI18n
@@ -68,7 +69,8 @@ def format_payment_text(payment: Payment, i18n: JsonI18n, lang: str) -> str:
 
 
 async def view_payments_handler(callback: types.CallbackQuery, i18n_data: dict, 
-                              settings: Settings, session: AsyncSession, page: int = 0):
+                              settings: Settings, session: AsyncSession, page: int = 0,
+                              reporting_db: Optional[ReportingDatabase] = None):
     """Display paginated list of all payments."""
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
@@ -78,7 +80,8 @@ async def view_payments_handler(callback: types.CallbackQuery, i18n_data: dict,
     _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
 
     page_size = 5  # Show 5 payments per page
-    payments, total_count = await get_payments_with_pagination(session, page, page_size)
+    async with reporting_session(reporting_db, session) as report_session:
+        payments, total_count = await get_payments_with_pagination(report_session, page, page_size)
     total_pages = (total_count + page_size - 1) // page_size if total_count > 0 else 1
 
     if not payments and page == 0:
@@ -146,18 +149,21 @@ async def view_payments_handler(callback: types.CallbackQuery, i18n_data: dict,
 
 @router.callback_query(F.data.startswith("payments_page:"))
 async def payments_pagination_handler(callback: types.CallbackQuery, i18n_data: dict, 
-                                    settings: Settings, session: AsyncSession):
+                                    settings: Settings, session: AsyncSession,
+                                    reporting_db: Optional[ReportingDatabase] = None):
     """Handle pagination for payments list."""
     try:
         page = int(callback.data.split(":")[1])
-        await view_payments_handler(callback, i18n_data, settings, session, page)
+        await view_payments_handler(callback, i18n_data, settings, session, page,
+                                    reporting_db=reporting_db)
     except (ValueError, IndexError):
         await callback.answer("Error processing pagination.", show_alert=True)
 
 
 @router.callback_query(F.data == "payments_export_csv")
 async def export_payments_csv_handler(callback: types.CallbackQuery, i18n_data: dict, 
-                                    settings: Settings, session: AsyncSession):
+                                    settings: Settings, session: AsyncSession,
+                                    reporting_db: Optional[ReportingDatabase] = None):
     """Export all successful payments to CSV file."""
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
@@ -168,7 +174,8 @@ async def export_payments_csv_handler(callback: types.CallbackQuery, i18n_data:
 
     try:
         # Get all successful payments
-        all_payments = await payment_dal.get_all_succeeded_payments_with_user(session)
+        async with reporting_session(reporting_db, session) as report_session:
+            all_payments = await payment_dal.get_all_succeeded_payments_with_user(report_session)
         
         if not all_payments:
             await callback.answer(
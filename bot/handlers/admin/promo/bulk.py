@@ -1,13 +1,15 @@
 import logging
-import random
+import os
+import secrets
 import string
 import csv
-import io
+import tempfile
+import time
 from aiogram import Router, F, types
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Awaitable, Callable, List, Optional, TextIO
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.settings import Settings
@@ -16,9 +18,18 @@ from bot.states.admin_states import AdminStates
 from bot.keyboards.inline.admin_keyboards import get_back_to_admin_panel_keyboard, get_admin_panel_keyboard
 from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardButton
 from bot.middlewares.i18n import JsonI18n
+from bot.utils.bot_identity import get_bot_username
+from bot.services.promo_lookup import register_new_promo_codes
 
 router = Router(name="promo_bulk_router")
 
+MAX_BULK_PROMO_QUANTITY = 10000
+# Codes inserted per statement; 8 columns each stays well under the bind parameter limit
+BULK_PROMO_CHUNK_SIZE = 1000
+# Rounds of fresh candidates generated for codes lost to collisions
+BULK_PROMO_TOPUP_ROUNDS = 5
+PROMO_CODE_ALPHABET = string.ascii_uppercase + string.digits
+
 
 async def create_bulk_promo_prompt_handler(callback: types.CallbackQuery,
                                           state: FSMContext, i18n_data: dict,
@@ -35,7 +46,8 @@ async def create_bulk_promo_prompt_handler(callback: types.CallbackQuery,
     # Step 1: Ask for quantity
     prompt_text = _(
         "admin_bulk_promo_step1_quantity",
-        default="🎟 <b>Массовое создание промокодов</b>\n\n<b>Шаг 1 из 4:</b> Количество\n\nВведите количество промокодов для создания (1-100):"
+        default="🎟 <b>Массовое создание промокодов</b>\n\n<b>Шаг 1 из 4:</b> Количество\n\nВведите количество промокодов для создания (1-{max_quantity}):",
+        max_quantity=MAX_BULK_PROMO_QUANTITY
     )
 
     try:
@@ -55,9 +67,46 @@ async def create_bulk_promo_prompt_handler(callback: types.CallbackQuery,
 
 
 def generate_unique_promo_code(length: int = 8) -> str:
-    """Generate a unique random promo code"""
-    characters = string.ascii_uppercase + string.digits
-    return ''.join(random.choice(characters) for _ in range(length))
+    """Generate a random promo code (cryptographically secure)"""
+    return ''.join(secrets.choice(PROMO_CODE_ALPHABET) for _ in range(length))
+
+
+async def generate_promo_codes_bulk(
+        session: AsyncSession,
+        quantity: int,
+        base_row: dict,
+        on_chunk: Callable[[List[str]], Awaitable[None]],
+        length: int = 8) -> int:
+    """Create `quantity` random promo codes with set-based inserts.
+
+    Candidates are generated unique in memory and inserted
+    BULK_PROMO_CHUNK_SIZE at a time with ``ON CONFLICT (code) DO NOTHING``;
+    codes that already existed are replaced by fresh candidates in the next
+    round. Each chunk is committed before `on_chunk` receives its codes, so
+    whatever was reported is durable. Returns the number of codes created.
+    """
+    created = 0
+    taken: set = set()
+    for _round in range(1 + BULK_PROMO_TOPUP_ROUNDS):
+        missing = quantity - created
+        if missing <= 0:
+            break
+        candidates: List[str] = []
+        while len(candidates) < missing:
+            code = generate_unique_promo_code(length)
+            if code not in taken:
+                taken.add(code)
+                candidates.append(code)
+        for start in range(0, len(candidates), BULK_PROMO_CHUNK_SIZE):
+            chunk = candidates[start:start + BULK_PROMO_CHUNK_SIZE]
+            inserted = await promo_code_dal.insert_promo_codes_skip_existing(
+                session, [dict(base_row, code=code) for code in chunk])
+            await session.commit()
+            register_new_promo_codes(*inserted)
+            created += len(inserted)
+            if inserted:
+                await on_chunk(inserted)
+    return created
 
 
 # Step 1: Process quantity
@@ -75,10 +124,11 @@ async def process_bulk_promo_quantity_handler(message: types.Message,
 
     try:
         quantity = int(message.text.strip())
-        if not (1 <= quantity <= 100):
+        if not (1 <= quantity <= MAX_BULK_PROMO_QUANTITY):
             await message.answer(_(
                 "admin_bulk_promo_invalid_quantity",
-                default="❌ Количество промокодов должно быть от 1 до 100"
+                default="❌ Количество промокодов должно быть от 1 до {max_quantity}",
+                max_quantity=MAX_BULK_PROMO_QUANTITY
             ))
             return
         
@@ -337,186 +387,168 @@ async def create_bulk_promo_codes_final(callback_or_message,
             quantity=quantity
         )
         
+        # Kept to edit with progress while the codes are generated
         if hasattr(callback_or_message, 'message'):  # CallbackQuery
+            progress_message = callback_or_message.message
             try:
-                await callback_or_message.message.edit_text(progress_text, parse_mode="HTML")
+                await progress_message.edit_text(progress_text, parse_mode="HTML")
             except Exception:
-                await callback_or_message.message.answer(progress_text, parse_mode="HTML")
+                progress_message = await callback_or_message.message.answer(progress_text, parse_mode="HTML")
             await callback_or_message.answer()
         else:  # Message
-            await callback_or_message.answer(progress_text, parse_mode="HTML")
-        
-        # Generate and create promo codes
-        created_codes = []
-        failed_codes = []
-        
-        for i in range(quantity):
-            try:
-                # Generate unique code
-                attempts = 0
-                while attempts < 10:  # Max 10 attempts to generate unique code
-                    promo_code = generate_unique_promo_code()
-                    existing_promo = await promo_code_dal.get_promo_code_by_code(session, promo_code)
-                    if not existing_promo:
-                        break
-                    attempts += 1
-                
-                if attempts >= 10:
-                    failed_codes.append(f"Код #{i+1} (не удалось сгенерировать уникальный)")
-                    continue
-                
-                # Prepare promo code data
-                promo_data = {
-                    "code": promo_code,
-                    "bonus_days": data["bonus_days"],
-                    "max_activations": data["max_activations"],
-                    "current_activations": 0,
-                    "is_active": True,
-                    "created_by_admin_id": callback_or_message.from_user.id,
-                    "created_at": datetime.now(timezone.utc)
-                }
-                
-                # Set validity
-                if data.get("validity_days"):
-                    promo_data["valid_until"] = datetime.now(timezone.utc) + timedelta(days=data["validity_days"])
-                else:
-                    promo_data["valid_until"] = None
-                
-                # Create promo code
-                created_promo = await promo_code_dal.create_promo_code(session, promo_data)
-                created_codes.append(created_promo.code)
-                
-            except Exception as e:
-                logging.error(f"Error creating bulk promo code #{i+1}: {e}")
-                failed_codes.append(f"Код #{i+1} ({str(e)[:50]})")
-        
-        await session.commit()
-        
-        # Success message
-        success_lines = [
-            _(
-                "admin_bulk_promo_created_title",
-                default="✅ <b>Массовое создание завершено!</b>\n"
-            ),
-            _(
-                "admin_bulk_promo_created_stats",
-                default="📊 Создано: <b>{created}</b> из <b>{total}</b>",
-                created=len(created_codes),
-                total=quantity
-            )
-        ]
-        
-        if data.get("validity_days"):
-            validity_text = f"{data['validity_days']} дней"
-        else:
-            validity_text = _("admin_promo_unlimited", default="Без ограничений")
-        
-        success_lines.append(
-            _(
-                "admin_bulk_promo_settings",
-                default="🎁 Бонусные дни: <b>{bonus_days}</b>\n"
-                       "📊 Макс. активаций: <b>{max_activations}</b>\n"
-                       "⏰ Срок действия: <b>{validity}</b>",
-                bonus_days=data["bonus_days"],
-                max_activations=data["max_activations"],
-                validity=validity_text
-            )
-        )
-        
-        # Create CSV file with promo codes if any were created
-        csv_file = None
-        if created_codes:
-            success_lines.append(f"\n🎟 <b>Создано {len(created_codes)} промокодов</b>")
-            success_lines.append("📄 CSV файл с промокодами отправлен отдельным сообщением")
-            
-            # Create CSV file
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # CSV headers
+            progress_message = await callback_or_message.answer(progress_text, parse_mode="HTML")
+
+        now = datetime.now(timezone.utc)
+        valid_until = now + timedelta(days=data["validity_days"]) if data.get("validity_days") else None
+        base_row = {
+            "bonus_days": data["bonus_days"],
+            "max_activations": data["max_activations"],
+            "current_activations": 0,
+            "is_active": True,
+            "created_by_admin_id": callback_or_message.from_user.id,
+            "created_at": now,
+            "valid_until": valid_until,
+        }
+
+        bot_username = await get_bot_username()
+        if not bot_username:
+            logging.error("Bot username unavailable for CSV links, using placeholder")
+            bot_username = 'your_bot'
+        valid_until_text = valid_until.strftime("%Y-%m-%d %H:%M:%S") if valid_until else "Без ограничений"
+
+        # The CSV is written to a temp file chunk by chunk as codes are committed
+        csv_handle: TextIO = tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8-sig", newline="", suffix=".csv", delete=False)
+        csv_path = csv_handle.name
+        try:
+            writer = csv.writer(csv_handle)
             writer.writerow([
-                "Промокод", "Бонусные дни", "Макс. активации", "Действителен до", 
+                "Промокод", "Бонусные дни", "Макс. активации", "Действителен до",
                 "Команда для старта", "Ссылка для активации"
             ])
-            
-            # Get real bot username
-            bot_username = 'your_bot'  # fallback
+
+            created_count = 0
+            last_progress_at = time.monotonic()
+
+            async def on_chunk(codes: List[str]) -> None:
+                nonlocal created_count, last_progress_at
+                for code in codes:
+                    writer.writerow([
+                        code,
+                        data["bonus_days"],
+                        data["max_activations"],
+                        valid_until_text,
+                        f"/start promo_{code}",
+                        f"https://t.me/{bot_username}?start=promo_{code}",
+                    ])
+                created_count += len(codes)
+                # Progress edits are throttled to stay clear of Telegram's edit limits
+                if created_count < quantity and time.monotonic() - last_progress_at >= 2:
+                    last_progress_at = time.monotonic()
+                    text = _(
+                        "admin_bulk_promo_progress",
+                        default="⏳ Создано {created} из {total} промокодов...",
+                        created=created_count,
+                        total=quantity
+                    )
+                    try:
+                        await progress_message.edit_text(text, parse_mode="HTML")
+                    except Exception as e:
+                        logging.debug(f"Bulk promo progress update skipped: {e}")
+
+            failed_codes = []
             try:
-                if hasattr(callback_or_message, 'message'):
-                    bot = callback_or_message.message.bot
-                else:
-                    bot = callback_or_message.bot
-                
-                bot_info = await bot.get_me()
-                bot_username = bot_info.username or 'your_bot'
+                await generate_promo_codes_bulk(session, quantity, base_row, on_chunk)
             except Exception as e:
-                logging.error(f"Failed to get bot username for CSV links: {e}")
-                bot_username = 'your_bot'
-            
-            for code in created_codes:
-                # Determine validity info
-                if data.get("validity_days"):
-                    valid_until = (datetime.now(timezone.utc) + timedelta(days=data["validity_days"])).strftime("%Y-%m-%d %H:%M:%S")
-                else:
-                    valid_until = "Без ограничений"
-                
-                start_command = f"/start promo_{code}"
-                telegram_link = f"https://t.me/{bot_username}?start=promo_{code}"
-                
-                writer.writerow([
-                    code,
-                    data["bonus_days"],
-                    data["max_activations"], 
-                    valid_until,
-                    start_command,
-                    telegram_link
-                ])
-            
-            output.seek(0)
-            
-            # Create file for sending
-            filename = f"bulk_promo_codes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            csv_file = types.BufferedInputFile(
-                output.getvalue().encode('utf-8-sig'),  # BOM for correct Excel display
-                filename=filename
-            )
-        
-        if failed_codes:
-            success_lines.append(f"\n❌ <b>Ошибки ({len(failed_codes)}):</b>")
-            for error in failed_codes[:5]:  # Show first 5 errors
-                success_lines.append(error)
-            if len(failed_codes) > 5:
-                success_lines.append(f"... и еще {len(failed_codes) - 5} ошибок")
-        
-        success_text = "\n".join(success_lines)
-        
-        if hasattr(callback_or_message, 'message'):  # CallbackQuery
-            try:
-                await callback_or_message.message.edit_text(
-                    success_text,
-                    reply_markup=get_back_to_admin_panel_keyboard(current_lang, i18n),
-                    parse_mode="HTML"
+                # Chunks committed so far are live: still hand them to the admin
+                await session.rollback()
+                if not created_count:
+                    raise
+                logging.error(f"Bulk promo generation stopped after {created_count} codes: {e}", exc_info=True)
+                failed_codes.append(f"Создание прервано ошибкой: {e}")
+            csv_handle.close()
+
+            if created_count < quantity and not failed_codes:
+                failed_codes.append(
+                    f"Не удалось сгенерировать уникальные коды: {quantity - created_count}")
+
+            # Success message
+            success_lines = [
+                _(
+                    "admin_bulk_promo_created_title",
+                    default="✅ <b>Массовое создание завершено!</b>\n"
+                ),
+                _(
+                    "admin_bulk_promo_created_stats",
+                    default="📊 Создано: <b>{created}</b> из <b>{total}</b>",
+                    created=created_count,
+                    total=quantity
                 )
-                message_obj = callback_or_message.message
-            except Exception:
-                message_obj = await callback_or_message.message.answer(
+            ]
+
+            if data.get("validity_days"):
+                validity_text = f"{data['validity_days']} дней"
+            else:
+                validity_text = _("admin_promo_unlimited", default="Без ограничений")
+
+            success_lines.append(
+                _(
+                    "admin_bulk_promo_settings",
+                    default="🎁 Бонусные дни: <b>{bonus_days}</b>\n"
+                           "📊 Макс. активаций: <b>{max_activations}</b>\n"
+                           "⏰ Срок действия: <b>{validity}</b>",
+                    bonus_days=data["bonus_days"],
+                    max_activations=data["max_activations"],
+                    validity=validity_text
+                )
+            )
+
+            csv_file = None
+            if created_count:
+                success_lines.append(f"\n🎟 <b>Создано {created_count} промокодов</b>")
+                success_lines.append("📄 CSV файл с промокодами отправлен отдельным сообщением")
+                filename = f"bulk_promo_codes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+                csv_file = types.FSInputFile(csv_path, filename=filename)
+
+            if failed_codes:
+                success_lines.append(f"\n❌ <b>Ошибки ({len(failed_codes)}):</b>")
+                for error in failed_codes[:5]:  # Show first 5 errors
+                    success_lines.append(error)
+                if len(failed_codes) > 5:
+                    success_lines.append(f"... и еще {len(failed_codes) - 5} ошибок")
+        
+            success_text = "\n".join(success_lines)
+        
+            if hasattr(callback_or_message, 'message'):  # CallbackQuery
+                try:
+                    await callback_or_message.message.edit_text(
+                        success_text,
+                        reply_markup=get_back_to_admin_panel_keyboard(current_lang, i18n),
+                        parse_mode="HTML"
+                    )
+                    message_obj = callback_or_message.message
+                except Exception:
+                    message_obj = await callback_or_message.message.answer(
+                        success_text,
+                        reply_markup=get_back_to_admin_panel_keyboard(current_lang, i18n),
+                        parse_mode="HTML"
+                    )
+                await callback_or_message.answer()
+            else:  # Message
+                message_obj = await callback_or_message.answer(
                     success_text,
                     reply_markup=get_back_to_admin_panel_keyboard(current_lang, i18n),
                     parse_mode="HTML"
                 )
-            await callback_or_message.answer()
-        else:  # Message
-            message_obj = await callback_or_message.answer(
-                success_text,
-                reply_markup=get_back_to_admin_panel_keyboard(current_lang, i18n),
-                parse_mode="HTML"
-            )
-        
-        # Send CSV file if created
-        if csv_file:
-            csv_caption = f"📄 Промокоды для массового создания\n💫 Всего: {len(created_codes)} промокодов\n🎁 Бонус: {data['bonus_days']} дней каждый"
-            await message_obj.answer_document(csv_file, caption=csv_caption)
         
+            # Send CSV file if created
+            if csv_file:
+                csv_caption = f"📄 Промокоды для массового создания\n💫 Всего: {created_count} промокодов\n🎁 Бонус: {data['bonus_days']} дней каждый"
+                await message_obj.answer_document(csv_file, caption=csv_caption)
+        finally:
+            csv_handle.close()
+            os.remove(csv_path)
+
         await state.clear()
         
     except Exception as e:
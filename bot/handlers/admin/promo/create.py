@@ -12,6 +12,7 @@ from bot.states.admin_states import AdminStates
 from bot.keyboards.inline.admin_keyboards import get_back_to_admin_panel_keyboard, get_admin_panel_keyboard
 from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardButton
 from bot.middlewares.i18n import JsonI18n
+from bot.services.promo_lookup import register_new_promo_codes
 
 router = Router(name="promo_create_router")
 
@@ -344,6 +345,7 @@ async def create_promo_code_final(callback_or_message,
         # Create promo code
         created_promo = await promo_code_dal.create_promo_code(session, promo_data)
         await session.commit()
+        register_new_promo_codes(created_promo.code)
         
         # Log successful creation
         logging.info(f"Promo code '{data['promo_code']}' created with ID {created_promo.promo_code_id}")
@@ -15,6 +15,7 @@ from bot.states.admin_states import AdminStates
 from bot.keyboards.inline.admin_keyboards import get_back_to_admin_panel_keyboard, get_admin_panel_keyboard
 from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardButton
 from bot.middlewares.i18n import JsonI18n
+from bot.services.promo_lookup import invalidate_cached_promo
 
 router = Router(name="promo_manage_router")
 
@@ -184,6 +185,7 @@ async def promo_toggle_handler(callback: types.CallbackQuery, i18n_data: dict, s
         new_status = not promo.is_active
         if await promo_code_dal.update_promo_code(session, promo_id, {"is_active": new_status}):
             await session.commit()
+            invalidate_cached_promo(promo.code)
             status_text = _("admin_promo_status_activated") if new_status else _("admin_promo_status_deactivated")
             await callback.answer(_("admin_promo_toggle_success", code=promo.code, status=status_text))
             
@@ -357,6 +359,7 @@ async def promo_delete_handler(callback: types.CallbackQuery, i18n_data: dict, s
         promo = await promo_code_dal.delete_promo_code(session, promo_id)
         if promo:
             await session.commit()
+            invalidate_cached_promo(promo.code)
             await callback.answer(_("admin_promo_deleted_success", code=promo.code), show_alert=True)
             await promo_management_handler(callback, i18n_data, settings, session, 0)
         else:
@@ -430,8 +433,10 @@ async def process_promo_edit_details(message: types.Message, state: FSMContext,
                 days = int(value)
                 update_data["valid_until"] = datetime.now(timezone.utc) + timedelta(days=days)
 
-        if await promo_code_dal.update_promo_code(session, promo_id, update_data):
+        updated_promo = await promo_code_dal.update_promo_code(session, promo_id, update_data)
+        if updated_promo:
             await session.commit()
+            invalidate_cached_promo(updated_promo.code)
             await message.answer(_("admin_promo_edit_success"))
             
             # Reset state and show updated details
@@ -1,13 +1,15 @@
 import logging
 from aiogram import Router, F, types
+from aiogram.utils.text_decorations import html_decoration as hd
 from typing import Optional, Dict, List
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.settings import Settings
 
-from db.dal import user_dal, payment_dal, panel_sync_dal
+from db.dal import user_dal, payment_dal, panel_sync_dal, referral_dal
 from db.models import Payment, PanelSyncStatus
+from db.read_replica import ReportingDatabase, reporting_session
 from bot.services.panel_api_service import PanelApiService
 
 from bot.keyboards.inline.admin_keyboards import get_back_to_admin_panel_keyboard
@@ -18,7 +20,8 @@ router = Router(name="admin_statistics_router")
 
 async def show_statistics_handler(callback: types.CallbackQuery,
                                   i18n_data: dict, settings: Settings,
-                                  session: AsyncSession):
+                                  session: AsyncSession,
+                                  reporting_db: Optional[ReportingDatabase] = None):
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
     if not i18n or not callback.message:
@@ -30,8 +33,18 @@ async def show_statistics_handler(callback: types.CallbackQuery,
 
     stats_text_parts = [f"<b>{_('admin_stats_header')}</b>"]
 
+    # All report queries are read-only and go to the replica when available
+    async with reporting_session(reporting_db, session) as report_session:
+        user_stats = await user_dal.get_enhanced_user_statistics(report_session)
+        financial_stats = await payment_dal.get_financial_statistics(report_session)
+        last_payments_models: List[
+            Payment] = await payment_dal.get_recent_payment_logs_with_user(
+                report_session, limit=5)
+        sync_status_model: Optional[
+            PanelSyncStatus] = await panel_sync_dal.get_panel_sync_status(
+                report_session)
+
     # Enhanced user statistics
-    user_stats = await user_dal.get_enhanced_user_statistics(session)
     
     stats_text_parts.append(
         f"\n<b>👥 {_('admin_enhanced_users_stats_header', default='Пользователи')}</b>"
@@ -137,8 +150,6 @@ async def show_statistics_handler(callback: types.CallbackQuery,
         stats_text_parts.append(f"⚠️ {_('admin_panel_stats_error_details', default='Детали')}: {str(e)}")
 
     # Financial statistics
-    financial_stats = await payment_dal.get_financial_statistics(session)
-    
     stats_text_parts.append(
         f"\n<b>💰 {_('admin_financial_stats_header', default='Финансовая статистика')}</b>"
     )
@@ -155,9 +166,6 @@ async def show_statistics_handler(callback: types.CallbackQuery,
         f"🏆 {_('admin_financial_all_time_label', default='За все время')}: <b>{financial_stats['all_time_revenue']:.2f} RUB</b>"
     )
 
-    last_payments_models: List[
-        Payment] = await payment_dal.get_recent_payment_logs_with_user(session,
-                                                                       limit=5)
     if last_payments_models:
         stats_text_parts.append(
             f"\n<b>{_('admin_stats_recent_payments_header')}</b>")
@@ -186,8 +194,6 @@ async def show_statistics_handler(callback: types.CallbackQuery,
     else:
         stats_text_parts.append(f"\n{_('admin_stats_no_payments_found')}")
 
-    sync_status_model: Optional[
-        PanelSyncStatus] = await panel_sync_dal.get_panel_sync_status(session)
     if sync_status_model and sync_status_model.status != "never_run":
         stats_text_parts.append(
             f"\n<b>{_('admin_stats_last_sync_header')}</b>")
@@ -243,3 +249,54 @@ async def show_statistics_handler(callback: types.CallbackQuery,
                         reply_markup=get_back_to_admin_panel_keyboard(
                             current_lang, i18n))
                 break
+
+
+TOP_REFERRERS_LIMIT = 15
+
+
+async def show_top_referrers_handler(callback: types.CallbackQuery,
+                                     i18n_data: dict, settings: Settings,
+                                     session: AsyncSession,
+                                     reporting_db: Optional[ReportingDatabase] = None):
+    current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
+    i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
+    if not i18n or not callback.message:
+        await callback.answer("Error displaying statistics.", show_alert=True)
+        return
+    _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
+
+    await callback.answer()
+
+    # Read from referral_counters: one index scan regardless of users table size
+    async with reporting_session(reporting_db, session) as report_session:
+        top_referrers = await referral_dal.get_top_referrers(
+            report_session, limit=TOP_REFERRERS_LIMIT)
+
+    lines = [_("admin_top_referrers_header", default="🏆 <b>Топ рефереров</b>")]
+    if not top_referrers:
+        lines.append(_("admin_top_referrers_empty", default="Рефералов пока нет."))
+    for place, row in enumerate(top_referrers, start=1):
+        user_info = hd.code(str(row["user_id"]))
+        if row["username"]:
+            user_info += f" (@{hd.quote(row['username'])})"
+        elif row["first_name"]:
+            user_info += f" ({hd.quote(row['first_name'])})"
+        lines.append(_("admin_top_referrers_item",
+                       default="{place}. {user_info}: 👥 <b>{invited}</b> · 💳 <b>{purchased}</b> · 🎁 {bonus_days}",
+                       place=place,
+                       user_info=user_info,
+                       invited=row["invited"],
+                       purchased=row["purchased"],
+                       bonus_days=row["bonus_days_earned"]))
+
+    try:
+        await callback.message.edit_text(
+            "\n".join(lines),
+            reply_markup=get_back_to_admin_panel_keyboard(current_lang, i18n),
+            parse_mode="HTML")
+    except Exception as e_edit:
+        logging.error(f"Error editing message for top referrers: {e_edit}")
+        await callback.message.answer(
+            "\n".join(lines),
+            reply_markup=get_back_to_admin_panel_keyboard(current_lang, i18n),
+            parse_mode="HTML")
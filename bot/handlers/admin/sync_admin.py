@@ -1,4 +1,5 @@
 import logging
+import time
 from aiogram import Router, types, Bot
 from aiogram.filters import Command
 from typing import Optional, Union
@@ -6,12 +7,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone
 
 from config.settings import Settings
+from config.runtime import get_runtime_config
 from bot.services.panel_api_service import PanelApiService
 from bot.services.notification_service import NotificationService
 
 from db.dal import user_dal, subscription_dal, panel_sync_dal
 
 from bot.middlewares.i18n import JsonI18n
+from bot.utils.metrics import SYNC_DURATION
+from bot.utils.bounded_executor import BoundedExecutor
 
 router = Router(name="admin_sync_router")
 
@@ -22,6 +26,18 @@ async def perform_sync(panel_service: PanelApiService, session: AsyncSession,
     Perform panel synchronization and return results
     Returns dict with status, details, and sync statistics
     """
+    started = time.perf_counter()
+    status = "error"
+    try:
+        result = await _perform_sync(panel_service, session, settings, i18n_instance)
+        status = result.get("status", "unknown")
+        return result
+    finally:
+        SYNC_DURATION.observe(time.perf_counter() - started, status)
+
+
+async def _perform_sync(panel_service: PanelApiService, session: AsyncSession,
+                        settings: Settings, i18n_instance: JsonI18n) -> dict:
     panel_records_checked = 0
     users_found_in_db = 0
     users_updated = 0
@@ -36,6 +52,10 @@ async def perform_sync(panel_service: PanelApiService, session: AsyncSession,
     subscriptions_created = 0
     subscriptions_updated = 0
 
+    # Panel side effects run alongside the DB work instead of one round trip per user
+    panel_effects = BoundedExecutor(
+        settings.PANEL_SYNC_CONCURRENCY, name="Sync panel updates")
+
     try:
         panel_users_data = await panel_service.get_all_panel_users()
 
@@ -148,8 +168,12 @@ async def perform_sync(panel_service: PanelApiService, session: AsyncSession,
                         current_panel_description = (panel_user_dict.get("description") or "").strip()
                         desired_description = description_text.strip()
                         if desired_description and desired_description != current_panel_description:
-                            await panel_service.update_user_details_on_panel(
-                                panel_uuid, {"description": description_text}
+                            await panel_effects.submit(
+                                panel_service.update_user_details_on_panel(
+                                    panel_uuid, {"description": description_text}, log_response=False
+                                ),
+                                f"Description update for panel user {panel_uuid} (tg {actual_user_id})",
+                                is_failure=lambda result: result is None,
                             )
                 except Exception as e_desc:
                     logging.warning(
@@ -211,7 +235,7 @@ async def perform_sync(panel_service: PanelApiService, session: AsyncSession,
                                     "duration_months": None,
                                     "is_active": panel_status == "ACTIVE",
                                     "status_from_panel": panel_status,
-                                    "traffic_limit_bytes": settings.user_traffic_limit_bytes,
+                                    "traffic_limit_bytes": get_runtime_config().user_traffic_limit_bytes,
                                 }
                                 created_sub = await subscription_dal.upsert_subscription(
                                     session, sub_payload
@@ -260,6 +284,12 @@ async def perform_sync(panel_service: PanelApiService, session: AsyncSession,
                 sync_errors.append(f"Error processing panel user {panel_user_dict.get('uuid', 'unknown')}: {str(e_user)}")
                 logging.error(f"Error syncing user: {e_user}")
 
+        panel_errors = await panel_effects.drain()
+        sync_errors.extend(panel_errors)
+        if panel_effects.submitted:
+            logging.info(
+                f"Sync: {panel_effects.submitted} panel description update(s) sent, {len(panel_errors)} failed.")
+
         # Update sync status
         status = "completed_with_errors" if sync_errors else "completed"
         # Build additional stats
@@ -314,6 +344,7 @@ async def perform_sync(panel_service: PanelApiService, session: AsyncSession,
         }
 
     except Exception as e_sync_global:
+        await panel_effects.drain()
         await session.rollback()
         logging.error(f"Global error during sync: {e_sync_global}", exc_info=True)
         error_detail = f"Unexpected error during sync: {str(e_sync_global)}"
@@ -10,11 +10,13 @@ from datetime import datetime, timezone
 
 from config.settings import Settings
 from db.dal import user_dal, subscription_dal, message_log_dal
+from db.dal.user_dal import SCORE_EXACT_USERNAME
 from db.models import User
 from bot.states.admin_states import AdminStates
 from bot.keyboards.inline.admin_keyboards import get_back_to_admin_panel_keyboard
 from bot.services.subscription_service import SubscriptionService
 from bot.services.panel_api_service import PanelApiService
+from bot.services.user_search import UserSearchService, UserSearchPage
 from bot.middlewares.i18n import JsonI18n
 from bot.utils import get_message_content, send_direct_message
 from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardButton
@@ -36,7 +38,7 @@ async def user_management_menu_handler(callback: types.CallbackQuery,
 
     prompt_text = _(
         "admin_user_management_prompt",
-        default="👤 Управление пользователями\n\nВведите ID пользователя или @username для поиска:"
+        default="👤 Управление пользователями\n\nВведите ID пользователя, @username, часть имени, начало UUID в панели или ID платежа для поиска:"
     )
 
     try:
@@ -183,12 +185,58 @@ async def format_user_card(user: User, session: AsyncSession,
     return "\n".join(card_parts)
 
 
+USER_SEARCH_PAGE_SIZE = 8
+
+
+def get_user_search_results_keyboard(search_page: UserSearchPage, i18n_instance,
+                                     lang: str) -> InlineKeyboardBuilder:
+    """One button per found user plus pagination"""
+    _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
+    builder = InlineKeyboardBuilder()
+
+    for user, _score in search_page.results:
+        label = user.first_name or str(user.user_id)
+        if user.username:
+            label += f" (@{user.username})"
+        label = f"{label[:48]} · {user.user_id}"
+        builder.row(InlineKeyboardButton(
+            text=label, callback_data=f"user_action:refresh:{user.user_id}"))
+
+    nav_buttons = []
+    if search_page.page > 0:
+        nav_buttons.append(InlineKeyboardButton(
+            text="⬅️", callback_data=f"admin_user_search_page:{search_page.page - 1}"))
+    if search_page.has_next:
+        nav_buttons.append(InlineKeyboardButton(
+            text="➡️", callback_data=f"admin_user_search_page:{search_page.page + 1}"))
+    if nav_buttons:
+        builder.row(*nav_buttons)
+
+    builder.row(InlineKeyboardButton(
+        text=_(key="back_to_admin_panel_button"), callback_data="admin_action:main"))
+    return builder
+
+
+def format_user_search_results(search_page: UserSearchPage, i18n_instance, lang: str) -> str:
+    _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
+    total_pages = max(1, (search_page.total + search_page.page_size - 1) // search_page.page_size)
+    return _(
+        "admin_user_search_results",
+        default="🔍 Найдено пользователей: <b>{total}</b> по запросу {query}\nСтраница {page}/{pages}",
+        total=search_page.total,
+        query=hcode(search_page.query),
+        page=search_page.page + 1,
+        pages=total_pages
+    )
+
+
 @router.message(AdminStates.waiting_for_user_search, F.text)
 async def process_user_search_handler(message: types.Message, state: FSMContext,
                                      settings: Settings, i18n_data: dict,
                                      subscription_service: SubscriptionService,
+                                     user_search_service: UserSearchService,
                                      session: AsyncSession):
-    """Process user search input and display user card"""
+    """Process user search input and display the user card or a list of matches"""
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
     if not i18n:
@@ -197,20 +245,10 @@ async def process_user_search_handler(message: types.Message, state: FSMContext,
     _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
 
     input_text = message.text.strip() if message.text else ""
-    user_model: Optional[User] = None
+    search_page = await user_search_service.search(
+        session, input_text, page_size=USER_SEARCH_PAGE_SIZE)
 
-    # Try to find user by ID or username
-    if input_text.isdigit():
-        try:
-            user_model = await user_dal.get_user_by_id(session, int(input_text))
-        except ValueError:
-            pass
-    elif input_text.startswith("@") and USERNAME_REGEX.match(input_text[1:]):
-        user_model = await user_dal.get_user_by_username(session, input_text[1:])
-    elif USERNAME_REGEX.match(input_text):
-        user_model = await user_dal.get_user_by_username(session, input_text)
-
-    if not user_model:
+    if not search_page.total:
         await message.answer(_(
             "admin_user_not_found",
             default="❌ Пользователь не найден: {input}",
@@ -218,6 +256,20 @@ async def process_user_search_handler(message: types.Message, state: FSMContext,
         ))
         return
 
+    # An exact id or @username opens the card even if other users match loosely
+    exact_match = search_page.results[0][1] >= SCORE_EXACT_USERNAME
+    if search_page.total > 1 and not exact_match:
+        # Keep the search state so the admin can page or type another query
+        await state.update_data(user_search_query=input_text)
+        await message.answer(
+            format_user_search_results(search_page, i18n, current_lang),
+            reply_markup=get_user_search_results_keyboard(search_page, i18n, current_lang).as_markup(),
+            parse_mode="HTML"
+        )
+        return
+
+    user_model: User = search_page.results[0][0]
+
     # Store user ID in state for further operations
     await state.update_data(target_user_id=user_model.user_id)
     await state.clear()
@@ -240,6 +292,43 @@ async def process_user_search_handler(message: types.Message, state: FSMContext,
         ))
 
 
+@router.callback_query(F.data.startswith("admin_user_search_page:"))
+async def user_search_page_handler(callback: types.CallbackQuery, state: FSMContext,
+                                   settings: Settings, i18n_data: dict,
+                                   user_search_service: UserSearchService,
+                                   session: AsyncSession):
+    current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
+    i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
+    if not i18n or not callback.message:
+        await callback.answer("Language service error.", show_alert=True)
+        return
+    _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
+
+    try:
+        page = int(callback.data.split(":")[1])
+    except (IndexError, ValueError):
+        await callback.answer("Invalid action format.", show_alert=True)
+        return
+    query = (await state.get_data()).get("user_search_query")
+    if not query:
+        await callback.answer(_("admin_user_search_expired",
+                                default="Поиск устарел, введите запрос заново"),
+                              show_alert=True)
+        return
+
+    search_page = await user_search_service.search(
+        session, query, page=page, page_size=USER_SEARCH_PAGE_SIZE)
+    try:
+        await callback.message.edit_text(
+            format_user_search_results(search_page, i18n, current_lang),
+            reply_markup=get_user_search_results_keyboard(search_page, i18n, current_lang).as_markup(),
+            parse_mode="HTML"
+        )
+    except TelegramBadRequest:
+        pass
+    await callback.answer()
+
+
 @router.callback_query(F.data.startswith("user_action:"))
 async def user_action_handler(callback: types.CallbackQuery, state: FSMContext,
                              settings: Settings, i18n_data: dict, bot: Bot,
@@ -1,16 +1,32 @@
 import logging
+import re
 from aiogram import Router, types, Bot
 from aiogram.types import InlineQuery, InlineQueryResultArticle, InputTextMessageContent
+from aiogram.utils.markdown import hcode
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.settings import Settings
+from config.runtime import get_runtime_config
 from db.dal import user_dal, payment_dal
+from db.models import User
+from db.read_replica import ReportingDatabase, reporting_session
 from bot.services.referral_service import ReferralService
+from bot.services.user_search import UserSearchService
 from bot.middlewares.i18n import JsonI18n
+from bot.utils.bot_identity import get_bot_username
 
 router = Router(name="inline_mode_router")
 
+INLINE_SEARCH_PAGE_SIZE = 20
+# Whole words that switch the inline query from user search to a fixed result
+REFERRAL_KEYWORDS = frozenset({
+    "ref", "refs", "referral", "referrals", "friend", "friends",
+    "реф", "рефка", "реферал", "рефералы", "друг", "друзья"})
+STATS_KEYWORDS = frozenset({
+    "stat", "stats", "statistics", "admin",
+    "стат", "статы", "статистика", "админ"})
+
 
 @router.inline_query()
 async def inline_query_handler(inline_query: InlineQuery,
@@ -18,8 +34,10 @@ async def inline_query_handler(inline_query: InlineQuery,
                                i18n_data: dict,
                                referral_service: ReferralService,
                                bot: Bot,
-                               session: AsyncSession):
-    """Handle inline queries for referral links and admin statistics"""
+                               session: AsyncSession,
+                               reporting_db: Optional[ReportingDatabase] = None,
+                               user_search_service: Optional[UserSearchService] = None):
+    """Handle inline queries for referral links, admin statistics and admin user search"""
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
     if not i18n:
@@ -32,22 +50,41 @@ async def inline_query_handler(inline_query: InlineQuery,
     results: List[InlineQueryResultArticle] = []
     
     # Check if user is admin
-    is_admin = user_id in settings.ADMIN_IDS if settings.ADMIN_IDS else False
+    is_admin = get_runtime_config().is_admin(user_id)
     
+    words = set(re.findall(r"\w+", query))
+    wants_referral = not query or bool(words & REFERRAL_KEYWORDS)
+    wants_stats = not query or bool(words & STATS_KEYWORDS)
+
     try:
+        # For admins: any other text is a user search, paged through next_offset
+        if is_admin and user_search_service and query and not wants_referral and not wants_stats:
+            page = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+            search_page = await user_search_service.search(
+                session, inline_query.query, page=page, page_size=INLINE_SEARCH_PAGE_SIZE)
+            await inline_query.answer(
+                results=[create_user_search_result(user, i18n, current_lang)
+                         for user, _score in search_page.results],
+                cache_time=5,
+                is_personal=True,
+                next_offset=str(page + 1) if search_page.has_next else ""
+            )
+            return
+
         # For all users: referral functionality
-        if not query or "реф" in query or "ref" in query or "друг" in query or "friend" in query:
+        if wants_referral:
             referral_result = await create_referral_result(
-                inline_query, bot, referral_service, i18n, current_lang, settings
+                inline_query, bot, referral_service, i18n, current_lang, settings, session
             )
             if referral_result:
                 results.append(referral_result)
         
         # For admins: statistics
-        if is_admin and (not query or "стат" in query or "stat" in query or "админ" in query or "admin" in query):
-            stats_results = await create_admin_stats_results(
-                session, i18n, current_lang, settings
-            )
+        if is_admin and wants_stats:
+            async with reporting_session(reporting_db, session) as report_session:
+                stats_results = await create_admin_stats_results(
+                    report_session, i18n, current_lang, settings
+                )
             results.extend(stats_results)
         
 
@@ -69,13 +106,13 @@ async def inline_query_handler(inline_query: InlineQuery,
 
 async def create_referral_result(inline_query: InlineQuery, bot: Bot,
                                 referral_service: ReferralService,
-                                i18n_instance, lang: str, settings: Settings) -> Optional[InlineQueryResultArticle]:
+                                i18n_instance, lang: str, settings: Settings,
+                                session: Optional[AsyncSession] = None) -> Optional[InlineQueryResultArticle]:
     """Create referral link result for inline query"""
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     
     try:
-        bot_info = await bot.get_me()
-        bot_username = bot_info.username
+        bot_username = await get_bot_username()
         if not bot_username:
             return None
         
@@ -90,16 +127,27 @@ async def create_referral_result(inline_query: InlineQuery, bot: Bot,
             referral_link=referral_link
         )
         
+        description = _(
+            "inline_referral_description",
+            default="Поделиться реферальной ссылкой для получения бонусов"
+        )
+        if session is not None:
+            referral_stats = await referral_service.get_referral_stats(session, user_id)
+            if referral_stats["invited_count"]:
+                description = _(
+                    "inline_referral_description_stats",
+                    default="Приглашено: {invited} · купили: {purchased}",
+                    invited=referral_stats["invited_count"],
+                    purchased=referral_stats["purchased_count"]
+                )
+
         return InlineQueryResultArticle(
             id="referral_link",
             title=_(
                 "inline_referral_title",
                 default="🎁 Пригласить друга"
             ),
-            description=_(
-                "inline_referral_description", 
-                default="Поделиться реферальной ссылкой для получения бонусов"
-            ),
+            description=description,
             input_message_content=InputTextMessageContent(
                 message_text=message_text,
                 disable_web_page_preview=True
@@ -112,6 +160,43 @@ async def create_referral_result(inline_query: InlineQuery, bot: Bot,
         return None
 
 
+def create_user_search_result(user: User, i18n_instance, lang: str) -> InlineQueryResultArticle:
+    """Compact user card built from the users row only, so search answers need no extra queries"""
+    _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
+    na_value = _("admin_user_na_value", default="N/A")
+    title = user.first_name or str(user.user_id)
+    if user.username:
+        title += f" (@{user.username})"
+    registration_date = user.registration_date.strftime('%Y-%m-%d') if user.registration_date else na_value
+    status = (_("admin_user_status_banned", default="🚫 Заблокирован") if user.is_banned
+              else _("admin_user_status_active", default="✅ Активен"))
+
+    card_text = "\n".join([
+        f"👤 <b>{_('admin_user_card_title', default='Карточка пользователя')}</b>\n",
+        f"{_('admin_user_id_label', default='🆔 <b>ID:</b>')} {hcode(str(user.user_id))}",
+        f"{_('admin_user_name_label', default='👤 <b>Имя:</b>')} {hcode(user.first_name or na_value)}",
+        f"{_('admin_user_username_label', default='📱 <b>Username:</b>')} {hcode(f'@{user.username}' if user.username else na_value)}",
+        f"{_('admin_user_registration_label', default='📅 <b>Регистрация:</b>')} {hcode(registration_date)}",
+        f"{_('admin_user_status_label', default='🛡 <b>Статус:</b>')} {status}",
+        f"{_('admin_user_panel_uuid_label', default='🔗 <b>Panel UUID:</b>')} {hcode(user.panel_user_uuid or na_value)}",
+    ])
+
+    return InlineQueryResultArticle(
+        id=f"admin_user_{user.user_id}",
+        title=title,
+        description=_(
+            "inline_user_search_description",
+            default="ID {user_id} · регистрация {registration_date}",
+            user_id=user.user_id,
+            registration_date=registration_date
+        ),
+        input_message_content=InputTextMessageContent(
+            message_text=card_text,
+            parse_mode="HTML"
+        )
+    )
+
+
 async def create_admin_stats_results(session: AsyncSession, i18n_instance, lang: str, settings: Settings) -> List[InlineQueryResultArticle]:
     """Create admin statistics results for inline query"""
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
@@ -18,6 +18,7 @@ from bot.services.subscription_service import SubscriptionService
 from bot.services.referral_service import ReferralService
 from bot.services.panel_api_service import PanelApiService
 from bot.services.yookassa_service import YooKassaService
+from bot.services.webhook_inbox import PermanentWebhookError, WebhookInbox
 from bot.middlewares.i18n import JsonI18n
 from config.settings import Settings
 from bot.services.notification_service import NotificationService
@@ -388,236 +389,254 @@ async def process_cancelled_payment(session: AsyncSession, bot: Bot,
         raise
 
 
-async def yookassa_webhook_route(request: web.Request):
+async def process_yookassa_webhook_event(app: web.Application, raw_payload: str) -> None:
+    """Webhook inbox handler for a stored YooKassa notification.
 
-    try:
-        bot: Bot = request.app['bot']
-        i18n_instance: JsonI18n = request.app['i18n']
-        settings: Settings = request.app['settings']
-        panel_service: PanelApiService = request.app['panel_service']
-        subscription_service: SubscriptionService = request.app[
-            'subscription_service']
-        referral_service: ReferralService = request.app['referral_service']
-        async_session_factory: sessionmaker = request.app[
-            'async_session_factory']
-    except KeyError as e_app_ctx:
-        logging.error(
-            f"KeyError accessing app context in yookassa_webhook_route: {e_app_ctx}.",
-            exc_info=True)
-        return web.Response(
-            status=500,
-            text="Internal Server Error: Missing app context component")
+    Exceptions propagate so the inbox retries the event.
+    """
+    bot: Bot = app['bot']
+    i18n_instance: JsonI18n = app['i18n']
+    settings: Settings = app['settings']
+    panel_service: PanelApiService = app['panel_service']
+    subscription_service: SubscriptionService = app['subscription_service']
+    referral_service: ReferralService = app['referral_service']
+    async_session_factory: sessionmaker = app['async_session_factory']
 
-    try:
-        event_json = await request.json()
+    event_json = json.loads(raw_payload)
+    notification_object = WebhookNotification(event_json)
+    payment_data_from_notification = notification_object.object
 
-        notification_object = WebhookNotification(event_json)
-        payment_data_from_notification = notification_object.object
+    logging.info(
+        f"YooKassa Webhook Parsed: Event='{notification_object.event}', "
+        f"PaymentId='{payment_data_from_notification.id}', Status='{payment_data_from_notification.status}'"
+    )
+    logging.debug(
+        "YooKassa Webhook RAW JSON: %s",
+        json.dumps(event_json, ensure_ascii=False),
+    )
 
-        logging.info(
-            f"YooKassa Webhook Parsed: Event='{notification_object.event}', "
-            f"PaymentId='{payment_data_from_notification.id}', Status='{payment_data_from_notification.status}'"
-        )
-        logging.debug(
-            "YooKassa Webhook RAW JSON: %s",
-            json.dumps(event_json, ensure_ascii=False),
+    if not payment_data_from_notification or not hasattr(
+            payment_data_from_notification,
+            'metadata') or payment_data_from_notification.metadata is None:
+        raise PermanentWebhookError(
+            f"YooKassa webhook payment {payment_data_from_notification.id} lacks metadata. Cannot process."
         )
 
-        if not payment_data_from_notification or not hasattr(
-                payment_data_from_notification,
-                'metadata') or payment_data_from_notification.metadata is None:
-            logging.error(
-                f"YooKassa webhook payment {payment_data_from_notification.id} lacks metadata. Cannot process."
-            )
-            return web.Response(status=200, text="ok_error_no_metadata")
-
-        # Safely extract payment_method details (SDK objects may not have to_dict)
-        pm_obj = getattr(payment_data_from_notification,
-                         'payment_method', None)
-        pm_dict = None
-        if pm_obj is not None:
+    # Safely extract payment_method details (SDK objects may not have to_dict)
+    pm_obj = getattr(payment_data_from_notification,
+                     'payment_method', None)
+    pm_dict = None
+    if pm_obj is not None:
+        try:
+            card_obj = getattr(pm_obj, 'card', None)
+            pm_dict = {
+                "id": getattr(pm_obj, 'id', None),
+                "type": getattr(pm_obj, 'type', None),
+                "saved": bool(getattr(pm_obj, 'saved', False)),
+                "title": getattr(pm_obj, 'title', None),
+                "account_number": (
+                    getattr(pm_obj, 'account_number', None)
+                    if hasattr(pm_obj, 'account_number') else (
+                        getattr(pm_obj, 'account', None)
+                        if hasattr(pm_obj, 'account') else None
+                    )
+                ),
+                "card": (
+                    {
+                        "first6": getattr(card_obj, 'first6', None),
+                        "last4": getattr(card_obj, 'last4', None),
+                        "expiry_month": getattr(card_obj, 'expiry_month', None),
+                        "expiry_year": getattr(card_obj, 'expiry_year', None),
+                        "card_type": getattr(card_obj, 'card_type', None),
+                    }
+                    if card_obj is not None
+                    else None
+                ),
+            }
+        except Exception:
+            logging.exception(
+                "Failed to serialize YooKassa payment_method from webhook")
+            pm_dict = None
+
+    payment_dict_for_processing = {
+        "id":
+        str(payment_data_from_notification.id),
+        "status":
+        str(payment_data_from_notification.status),
+        "paid":
+        bool(payment_data_from_notification.paid),
+        "amount": {
+            "value": str(payment_data_from_notification.amount.value),
+            "currency": str(payment_data_from_notification.amount.currency)
+        } if payment_data_from_notification.amount else {},
+        "metadata":
+        dict(payment_data_from_notification.metadata),
+        "description":
+        str(payment_data_from_notification.description)
+        if payment_data_from_notification.description else None,
+        "payment_method": pm_dict,
+    }
+
+    async with payment_processing_lock:
+        async with async_session_factory() as session:
             try:
-                card_obj = getattr(pm_obj, 'card', None)
-                pm_dict = {
-                    "id": getattr(pm_obj, 'id', None),
-                    "type": getattr(pm_obj, 'type', None),
-                    "saved": bool(getattr(pm_obj, 'saved', False)),
-                    "title": getattr(pm_obj, 'title', None),
-                    "account_number": (
-                        getattr(pm_obj, 'account_number', None)
-                        if hasattr(pm_obj, 'account_number') else (
-                            getattr(pm_obj, 'account', None)
-                            if hasattr(pm_obj, 'account') else None
-                        )
-                    ),
-                    "card": (
-                        {
-                            "first6": getattr(card_obj, 'first6', None),
-                            "last4": getattr(card_obj, 'last4', None),
-                            "expiry_month": getattr(card_obj, 'expiry_month', None),
-                            "expiry_year": getattr(card_obj, 'expiry_year', None),
-                            "card_type": getattr(card_obj, 'card_type', None),
-                        }
-                        if card_obj is not None
-                        else None
-                    ),
-                }
-            except Exception:
-                logging.exception(
-                    "Failed to serialize YooKassa payment_method from webhook")
-                pm_dict = None
-
-        payment_dict_for_processing = {
-            "id":
-            str(payment_data_from_notification.id),
-            "status":
-            str(payment_data_from_notification.status),
-            "paid":
-            bool(payment_data_from_notification.paid),
-            "amount": {
-                "value": str(payment_data_from_notification.amount.value),
-                "currency": str(payment_data_from_notification.amount.currency)
-            } if payment_data_from_notification.amount else {},
-            "metadata":
-            dict(payment_data_from_notification.metadata),
-            "description":
-            str(payment_data_from_notification.description)
-            if payment_data_from_notification.description else None,
-            "payment_method": pm_dict,
-        }
-
-        async with payment_processing_lock:
-            async with async_session_factory() as session:
-                try:
-                    if notification_object.event == YOOKASSA_EVENT_PAYMENT_SUCCEEDED:
-                        if payment_dict_for_processing.get(
-                                "paid") and payment_dict_for_processing.get(
-                                    "status") == "succeeded":
-                            await process_successful_payment(
-                                session, bot, payment_dict_for_processing,
-                                i18n_instance, settings, panel_service,
-                                subscription_service, referral_service)
-                            await session.commit()
-                        else:
-                            logging.warning(
-                                f"Payment Succeeded event for {payment_dict_for_processing.get('id')} "
-                                f"but data not as expected: status='{payment_dict_for_processing.get('status')}', "
-                                f"paid='{payment_dict_for_processing.get('paid')}'"
-                            )
-                    elif notification_object.event == YOOKASSA_EVENT_PAYMENT_CANCELED:
-                        await process_cancelled_payment(
+                if notification_object.event == YOOKASSA_EVENT_PAYMENT_SUCCEEDED:
+                    if payment_dict_for_processing.get(
+                            "paid") and payment_dict_for_processing.get(
+                                "status") == "succeeded":
+                        await process_successful_payment(
                             session, bot, payment_dict_for_processing,
-                            i18n_instance, settings)
+                            i18n_instance, settings, panel_service,
+                            subscription_service, referral_service)
                         await session.commit()
-                    elif notification_object.event == YOOKASSA_EVENT_PAYMENT_WAITING_FOR_CAPTURE:
-                        # Bind-only flow: save method and cancel auth if metadata has bind_only
-                        metadata = payment_dict_for_processing.get(
-                            "metadata", {}) or {}
-                        if getattr(settings, 'YOOKASSA_AUTOPAYMENTS_ENABLED', False) and metadata.get("bind_only") == "1":
-                            try:
-                                user_id_str = metadata.get("user_id")
-                                if user_id_str and user_id_str.isdigit():
-                                    user_id = int(user_id_str)
-                                    payment_method = payment_dict_for_processing.get(
-                                        "payment_method")
-                                    if isinstance(payment_method, dict) and payment_method.get("id"):
-                                        pm_type = payment_method.get("type")
-                                        title = payment_method.get("title")
-                                        card = payment_method.get("card") or {}
-                                        account_number = payment_method.get(
-                                            "account_number") or payment_method.get("account")
-                                        display_network = None
-                                        display_last4 = None
-                                        if (pm_type or "").lower() in {"bank_card", "bank-card", "card"}:
-                                            display_network = card.get(
-                                                "card_type") or title or "Card"
-                                            display_last4 = card.get("last4")
-                                        elif (pm_type or "").lower() in {"yoo_money", "yoomoney", "yoo-money", "wallet"}:
-                                            # Normalize wallet display name to avoid leaking full account from title
-                                            display_network = "YooMoney"
-                                            if isinstance(account_number, str) and len(account_number) >= 4:
-                                                display_last4 = account_number[-4:]
-                                            else:
-                                                display_last4 = None
+                    else:
+                        logging.warning(
+                            f"Payment Succeeded event for {payment_dict_for_processing.get('id')} "
+                            f"but data not as expected: status='{payment_dict_for_processing.get('status')}', "
+                            f"paid='{payment_dict_for_processing.get('paid')}'"
+                        )
+                elif notification_object.event == YOOKASSA_EVENT_PAYMENT_CANCELED:
+                    await process_cancelled_payment(
+                        session, bot, payment_dict_for_processing,
+                        i18n_instance, settings)
+                    await session.commit()
+                elif notification_object.event == YOOKASSA_EVENT_PAYMENT_WAITING_FOR_CAPTURE:
+                    # Bind-only flow: save method and cancel auth if metadata has bind_only
+                    metadata = payment_dict_for_processing.get(
+                        "metadata", {}) or {}
+                    if getattr(settings, 'YOOKASSA_AUTOPAYMENTS_ENABLED', False) and metadata.get("bind_only") == "1":
+                        try:
+                            user_id_str = metadata.get("user_id")
+                            if user_id_str and user_id_str.isdigit():
+                                user_id = int(user_id_str)
+                                payment_method = payment_dict_for_processing.get(
+                                    "payment_method")
+                                if isinstance(payment_method, dict) and payment_method.get("id"):
+                                    pm_type = payment_method.get("type")
+                                    title = payment_method.get("title")
+                                    card = payment_method.get("card") or {}
+                                    account_number = payment_method.get(
+                                        "account_number") or payment_method.get("account")
+                                    display_network = None
+                                    display_last4 = None
+                                    if (pm_type or "").lower() in {"bank_card", "bank-card", "card"}:
+                                        display_network = card.get(
+                                            "card_type") or title or "Card"
+                                        display_last4 = card.get("last4")
+                                    elif (pm_type or "").lower() in {"yoo_money", "yoomoney", "yoo-money", "wallet"}:
+                                        # Normalize wallet display name to avoid leaking full account from title
+                                        display_network = "YooMoney"
+                                        if isinstance(account_number, str) and len(account_number) >= 4:
+                                            display_last4 = account_number[-4:]
                                         else:
-                                            display_network = title or (
-                                                pm_type.upper() if pm_type else "Payment method")
                                             display_last4 = None
-                                        await user_billing_dal.upsert_yk_payment_method(
+                                    else:
+                                        display_network = title or (
+                                            pm_type.upper() if pm_type else "Payment method")
+                                        display_last4 = None
+                                    await user_billing_dal.upsert_yk_payment_method(
+                                        session,
+                                        user_id=user_id,
+                                        payment_method_id=payment_method.get(
+                                            "id"),
+                                        card_last4=display_last4,
+                                        card_network=display_network,
+                                    )
+                                    await session.commit()
+                                    # Save multi-card entry and mark default if first
+                                    try:
+                                        from db.dal import user_billing_dal as ub
+                                        await ub.upsert_user_payment_method(
                                             session,
                                             user_id=user_id,
-                                            payment_method_id=payment_method.get(
+                                            provider_payment_method_id=payment_method.get(
                                                 "id"),
+                                            provider="yookassa",
                                             card_last4=display_last4,
                                             card_network=display_network,
+                                            set_default=True,
                                         )
                                         await session.commit()
-                                        # Save multi-card entry and mark default if first
-                                        try:
-                                            from db.dal import user_billing_dal as ub
-                                            await ub.upsert_user_payment_method(
-                                                session,
-                                                user_id=user_id,
-                                                provider_payment_method_id=payment_method.get(
-                                                    "id"),
-                                                provider="yookassa",
-                                                card_last4=display_last4,
-                                                card_network=display_network,
-                                                set_default=True,
-                                            )
-                                            await session.commit()
-                                        except Exception:
-                                            await session.rollback()
-                                        # Notify user about successful binding with Back button
-                                        try:
-                                            # Use user's DB language for bind success notification
-                                            i18n_lang = settings.DEFAULT_LANGUAGE
-                                            from db.dal import user_dal
-                                            db_user = await user_dal.get_user_by_id(session, user_id)
-                                            if db_user and db_user.language_code:
-                                                i18n_lang = db_user.language_code
-
-                                            def _(key, **kwargs):
-                                                return i18n_instance.gettext(i18n_lang, key, **kwargs)
-                                            from bot.keyboards.inline.user_keyboards import get_back_to_payment_methods_keyboard
-                                            await bot.send_message(
-                                                chat_id=user_id,
-                                                text=_(
-                                                    "payment_method_bound_success"),
-                                                reply_markup=get_back_to_payment_methods_keyboard(
-                                                    i18n_lang, i18n_instance)
-                                            )
-                                        except Exception:
-                                            pass
-                                        # Attempt to cancel the authorization to avoid charge hold
-                                        try:
-                                            yk: YooKassaService = request.app.get(
-                                                'yookassa_service')
-                                            if yk:
-                                                await yk.cancel_payment(payment_dict_for_processing.get("id"))
-                                        except Exception:
-                                            logging.exception(
-                                                "Failed to cancel bind-only payment auth")
-                            except Exception:
-                                logging.exception(
-                                    "Failed to handle bind-only waiting_for_capture webhook")
-                except Exception as e_webhook_db_processing:
-                    await session.rollback()
-                    logging.error(
-                        f"Error processing YooKassa webhook event '{notification_object.event}' "
-                        f"for YK Payment ID {payment_dict_for_processing.get('id')} in DB transaction: {e_webhook_db_processing}",
-                        exc_info=True)
-                    return web.Response(
-                        status=200, text="ok_internal_processing_error_logged")
-
-        return web.Response(status=200, text="ok")
+                                    except Exception:
+                                        await session.rollback()
+                                    # Notify user about successful binding with Back button
+                                    try:
+                                        # Use user's DB language for bind success notification
+                                        i18n_lang = settings.DEFAULT_LANGUAGE
+                                        from db.dal import user_dal
+                                        db_user = await user_dal.get_user_by_id(session, user_id)
+                                        if db_user and db_user.language_code:
+                                            i18n_lang = db_user.language_code
+
+                                        def _(key, **kwargs):
+                                            return i18n_instance.gettext(i18n_lang, key, **kwargs)
+                                        from bot.keyboards.inline.user_keyboards import get_back_to_payment_methods_keyboard
+                                        await bot.send_message(
+                                            chat_id=user_id,
+                                            text=_(
+                                                "payment_method_bound_success"),
+                                            reply_markup=get_back_to_payment_methods_keyboard(
+                                                i18n_lang, i18n_instance)
+                                        )
+                                    except Exception:
+                                        pass
+                                    # Attempt to cancel the authorization to avoid charge hold
+                                    try:
+                                        yk: YooKassaService = app.get(
+                                            'yookassa_service')
+                                        if yk:
+                                            await yk.cancel_payment(payment_dict_for_processing.get("id"))
+                                    except Exception:
+                                        logging.exception(
+                                            "Failed to cancel bind-only payment auth")
+                        except Exception:
+                            logging.exception(
+                                "Failed to handle bind-only waiting_for_capture webhook")
+            except Exception as e_webhook_db_processing:
+                await session.rollback()
+                logging.error(
+                    f"Error processing YooKassa webhook event '{notification_object.event}' "
+                    f"for YK Payment ID {payment_dict_for_processing.get('id')} in DB transaction: {e_webhook_db_processing}",
+                    exc_info=True)
+                raise
+
+
+async def yookassa_webhook_route(request: web.Request):
+    """Store the notification in the webhook inbox and acknowledge it.
 
+    Processing happens in the inbox workers (`process_yookassa_webhook_event`).
+    """
+    try:
+        webhook_inbox: WebhookInbox = request.app['webhook_inbox']
+    except KeyError as e_app_ctx:
+        logging.error(
+            f"KeyError accessing app context in yookassa_webhook_route: {e_app_ctx}.",
+            exc_info=True)
+        return web.Response(
+            status=500,
+            text="Internal Server Error: Missing app context component")
+
+    try:
+        event_json = await request.json()
+        notification_object = WebhookNotification(event_json)
+        payment_id = str(notification_object.object.id)
     except json.JSONDecodeError:
         logging.error("YooKassa Webhook: Invalid JSON received.")
         return web.Response(status=400, text="bad_request_invalid_json")
-    except Exception as e_general_webhook:
-        logging.error(
-            f"YooKassa Webhook general processing error: {e_general_webhook}",
-            exc_info=True)
-        return web.Response(status=200,
-                            text="ok_general_internal_error_logged")
+    except Exception as e_parse:
+        logging.error(f"YooKassa Webhook: unparseable notification: {e_parse}", exc_info=True)
+        return web.Response(status=200, text="ok_error_invalid_notification")
+
+    try:
+        await webhook_inbox.accept(
+            "yookassa",
+            f"{notification_object.event}:{payment_id}",
+            json.dumps(event_json, ensure_ascii=False),
+        )
+    except Exception as e_inbox:
+        # Not stored: let YooKassa redeliver
+        logging.error(f"YooKassa Webhook: failed to store event for payment {payment_id}: {e_inbox}",
+                      exc_info=True)
+        return web.Response(status=500, text="inbox_unavailable")
+
+    return web.Response(status=200, text="ok")
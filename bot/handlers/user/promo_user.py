@@ -18,7 +18,7 @@ from datetime import datetime
 from bot.middlewares.i18n import JsonI18n
 
 from .start import send_main_menu
-import os
+from bot.utils.media_registry import get_media_registry
 
 router = Router(name="user_promo_router")
 
@@ -54,11 +54,9 @@ async def prompt_promo_code_input(callback: types.CallbackQuery,
     sent_with_image = False
     if image_ref:
         try:
-            if os.path.exists(image_ref):
-                from aiogram.types import FSInputFile
-                await callback.message.answer_photo(photo=FSInputFile(image_ref), caption=prompt_text, reply_markup=kb)
-            else:
-                await callback.message.answer_photo(photo=image_ref, caption=prompt_text, reply_markup=kb)
+            await get_media_registry().send_photo(
+                callback.bot, callback.message.chat.id, image_ref,
+                caption=prompt_text, reply_markup=kb)
             # Try to delete previous message to keep UI clean
             try:
                 await callback.message.delete()
@@ -5,10 +5,12 @@ from typing import Optional, Union
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.settings import Settings
+from config.runtime import get_runtime_config
 from bot.services.referral_service import ReferralService
 
 from bot.keyboards.inline.user_keyboards import get_back_to_main_menu_markup
 from bot.middlewares.i18n import JsonI18n
+from bot.utils.bot_identity import get_bot_username
 
 router = Router(name="user_referral_router")
 
@@ -43,16 +45,7 @@ async def referral_command_handler(event: Union[types.Message,
 
     _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
 
-    try:
-        bot_info = await bot.get_me()
-        bot_username = bot_info.username
-    except Exception as e_bot_info:
-        logging.error(
-            f"Failed to get bot info for referral link: {e_bot_info}")
-        await target_message_obj.answer(_("error_generating_referral_link"))
-        if isinstance(event, types.CallbackQuery): await event.answer()
-        return
-
+    bot_username = await get_bot_username()
     if not bot_username:
         logging.error("Bot username is None, cannot generate referral link.")
         await target_message_obj.answer(_("error_generating_referral_link"))
@@ -64,13 +57,14 @@ async def referral_command_handler(event: Union[types.Message,
         bot_username, inviter_user_id)
 
     bonus_info_parts = []
-    if settings.subscription_options:
+    runtime_config = get_runtime_config()
+    if runtime_config.subscription_options:
 
         for months_period_key, _price in sorted(
-                settings.subscription_options.items()):
+                runtime_config.subscription_options.items()):
 
-            inv_bonus = settings.referral_bonus_inviter.get(months_period_key)
-            ref_bonus = settings.referral_bonus_referee.get(months_period_key)
+            inv_bonus = runtime_config.referral_bonus_inviter.get(months_period_key)
+            ref_bonus = runtime_config.referral_bonus_referee.get(months_period_key)
             if inv_bonus is not None or ref_bonus is not None:
                 bonus_info_parts.append(
                     _("referral_bonus_per_period",
@@ -90,7 +84,8 @@ async def referral_command_handler(event: Union[types.Message,
              referral_link=referral_link,
              bonus_details=bonus_details_str,
              invited_count=referral_stats["invited_count"],
-             purchased_count=referral_stats["purchased_count"])
+             purchased_count=referral_stats["purchased_count"],
+             bonus_days_earned=referral_stats["bonus_days_earned"])
 
     from bot.keyboards.inline.user_keyboards import get_referral_link_keyboard
     reply_markup_val = get_referral_link_keyboard(current_lang, i18n)
@@ -125,8 +120,7 @@ async def referral_action_handler(callback: types.CallbackQuery, settings: Setti
 
     if action == "share_message":
         try:
-            bot_info = await bot.get_me()
-            bot_username = bot_info.username
+            bot_username = await get_bot_username()
             if not bot_username:
                 await callback.answer("Ошибка получения имени бота", show_alert=True)
                 return
@@ -1,5 +1,4 @@
 import logging
-import os
 import re
 from aiogram import Router, F, types, Bot
 from aiogram.utils.text_decorations import html_decoration as hd
@@ -18,6 +17,7 @@ from bot.services.referral_service import ReferralService
 from bot.services.promo_code_service import PromoCodeService
 from config.settings import Settings
 from bot.middlewares.i18n import JsonI18n
+from bot.utils.media_registry import get_media_registry
 
 router = Router(name="user_start_router")
 
@@ -249,12 +249,8 @@ async def start_command_handler(message: types.Message,
         image_ref = getattr(settings, "WELCOME_IMAGE_URL", None)
         if image_ref:
             try:
-                # If local path exists – use FSInputFile; otherwise pass URL directly
-                if os.path.exists(image_ref):
-                    from aiogram.types import FSInputFile
-                    await message.answer_photo(photo=FSInputFile(image_ref), caption=welcome_text)
-                else:
-                    await message.answer_photo(photo=image_ref, caption=welcome_text)
+                await get_media_registry().send_photo(
+                    message.bot, message.chat.id, image_ref, caption=welcome_text)
             except Exception as e:
                 logging.warning(f"Failed to send welcome image: {e}")
                 await message.answer(welcome_text)
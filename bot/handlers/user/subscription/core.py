@@ -9,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 
 from config.settings import Settings
+from config.runtime import get_runtime_config
 from bot.keyboards.inline.user_keyboards import (
     get_subscription_options_keyboard,
     get_back_to_main_menu_markup,
@@ -42,13 +43,14 @@ async def display_subscription_options(event: Union[types.Message, types.Callbac
         return
 
     currency_symbol_val = settings.DEFAULT_CURRENCY_SYMBOL
-    text_content = get_text("select_subscription_period") if settings.subscription_options else get_text(
+    subscription_options = get_runtime_config().subscription_options
+    text_content = get_text("select_subscription_period") if subscription_options else get_text(
         "no_subscription_options_available")
 
     reply_markup = (
         get_subscription_options_keyboard(
-            settings.subscription_options, currency_symbol_val, current_lang, i18n)
-        if settings.subscription_options
+            subscription_options, currency_symbol_val, current_lang, i18n)
+        if subscription_options
         else get_back_to_main_menu_markup(current_lang, i18n)
     )
 
@@ -140,8 +142,7 @@ async def my_subscription_command_handler(
         if local_sub:
             if local_sub.provider == "tribute":
                 link = None
-                link = settings.tribute_payment_links.get(local_sub.duration_months or 1) if hasattr(
-                    settings, "tribute_payment_links") else None
+                link = get_runtime_config().tribute_payment_links.get(local_sub.duration_months or 1)
                 tribute_hint = "\n\n" + (
                     get_text("subscription_tribute_notice_with_link", link=link) if link else get_text(
                         "subscription_tribute_notice")
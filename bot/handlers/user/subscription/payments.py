@@ -8,6 +8,7 @@ from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.settings import Settings
+from config.runtime import get_runtime_config
 from bot.keyboards.inline.user_keyboards import get_payment_method_keyboard, get_payment_url_keyboard
 from bot.services.yookassa_service import YooKassaService
 from bot.services.crypto_pay_service import CryptoPayService
@@ -43,10 +44,10 @@ async def select_subscription_period_callback_handler(callback: types.CallbackQu
             pass
         return
 
-    price_rub = settings.subscription_options.get(months)
+    price_rub = get_runtime_config().subscription_options.get(months)
     if price_rub is None:
         logging.error(
-            f"Price not found for {months} months subscription period in settings.subscription_options."
+            f"Price not found for {months} months subscription period in runtime config subscription_options."
         )
         try:
             await callback.answer(get_text("error_try_again"), show_alert=True)
@@ -56,41 +57,15 @@ async def select_subscription_period_callback_handler(callback: types.CallbackQu
 
     currency_symbol_val = settings.DEFAULT_CURRENCY_SYMBOL
     text_content = get_text("choose_payment_method")
-    # Для Tribute используем донат-ссылки из настроек (как у bedolaga)
-    tribute_url = settings.tribute_payment_links.get(months)
-    if not tribute_url and getattr(settings, 'TRIBUTE_DONATE_LINK', None):
-        tribute_url = settings.TRIBUTE_DONATE_LINK
-
-    # аккуратно подставляем сумму (в минорных единицах) и идентификатор пользователя
-    if tribute_url:
-        try:
-            user_id_val = callback.from_user.id
-        except Exception:
-            user_id_val = None
-        try:
-            amount_minor = int(float(price_rub) * 100)
-        except Exception:
-            amount_minor = None
-
-        try:
-            parsed = urlparse(tribute_url)
-            query = dict(parse_qsl(parsed.query))
-            if user_id_val is not None and 'telegram_user_id' not in query:
-                query['telegram_user_id'] = str(user_id_val)
-            if amount_minor is not None and 'amount' not in query:
-                query['amount'] = str(amount_minor)
-            if 'period' not in query:
-                query['period'] = str(months)
-            new_query = urlencode(query, doseq=True)
-            tribute_url = urlunparse(parsed._replace(query=new_query))
-        except Exception:
-            # Если не удалось распарсить/склеить URL — оставляем исходный
-            pass
-    stars_price = settings.stars_subscription_options.get(months)
+    # Для Tribute используем донат-ссылки из настроек (как у bedolaga);
+    # ссылка для пользователя собирается в обработчике pay_tribute
+    has_tribute = bool(get_runtime_config().tribute_payment_links.get(months)
+                       or getattr(settings, 'TRIBUTE_DONATE_LINK', None))
+    stars_price = get_runtime_config().stars_subscription_options.get(months)
     reply_markup = get_payment_method_keyboard(
         months,
         price_rub,
-        tribute_url,
+        has_tribute,
         stars_price,
         currency_symbol_val,
         current_lang,
@@ -158,7 +133,7 @@ async def pay_tribute_callback_handler(
         return
 
     # Сформировать ссылку Tribute (донат) с префиллом суммы, user_id и периода
-    tribute_url = settings.tribute_payment_links.get(months)
+    tribute_url = get_runtime_config().tribute_payment_links.get(months)
     if not tribute_url and getattr(settings, 'TRIBUTE_DONATE_LINK', None):
         tribute_url = settings.TRIBUTE_DONATE_LINK
     if tribute_url:
@@ -0,0 +1,81 @@
+import functools
+import inspect
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple, TypeVar
+
+from config.runtime import add_reload_listener, get_runtime_config
+from bot.utils.metrics import KEYBOARD_CACHE_REQUESTS
+
+# Entries only go stale through config/locale versions, which are part of the
+# key; the cap evicts the least recently used entries so abandoned versions
+# don't pile up while the hot keyboards stay cached.
+MAX_ENTRIES_PER_KEYBOARD = 256
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_caches: Dict[str, "OrderedDict[Tuple[Hashable, ...], Any]"] = {}
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict) or hasattr(value, "items"):
+        return tuple((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def cached_keyboard(func: F) -> F:
+    """Memoize a keyboard builder whose output depends only on its arguments.
+
+    The key is built from the language, the i18n catalog version, the runtime
+    config version and the remaining arguments. `settings` and
+    `i18n_instance` are keyed by identity. The returned markup is shared
+    between callers and must not be mutated; build new row lists instead.
+    """
+    signature = inspect.signature(func)
+    name = func.__name__
+    cache = _caches.setdefault(name, OrderedDict())
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key_parts = [get_runtime_config().version]
+        for arg_name, value in bound.arguments.items():
+            if arg_name == "i18n_instance":
+                key_parts.append((id(value), getattr(value, "version", None)))
+            elif arg_name == "settings":
+                key_parts.append(id(value))
+            else:
+                key_parts.append(_freeze(value))
+        key = tuple(key_parts)
+
+        try:
+            markup = cache.get(key)
+        except TypeError:
+            # Unhashable argument: build without caching
+            KEYBOARD_CACHE_REQUESTS.inc(name, "bypass")
+            return func(*args, **kwargs)
+        if markup is not None:
+            KEYBOARD_CACHE_REQUESTS.inc(name, "hit")
+            cache.move_to_end(key)
+            return markup
+
+        KEYBOARD_CACHE_REQUESTS.inc(name, "miss")
+        markup = func(*args, **kwargs)
+        cache[key] = markup
+        while len(cache) > MAX_ENTRIES_PER_KEYBOARD:
+            cache.popitem(last=False)
+        return markup
+
+    return wrapper  # type: ignore[return-value]
+
+
+def clear_keyboard_cache() -> None:
+    for cache in _caches.values():
+        cache.clear()
+    logging.info("Keyboard cache cleared.")
+
+
+add_reload_listener(lambda _config: clear_keyboard_cache())
@@ -5,9 +5,11 @@ import math
 
 from config.settings import Settings
 from bot.middlewares.i18n import JsonI18n
+from bot.keyboards.cache import cached_keyboard
 from db.models import User
 
 
+@cached_keyboard
 def get_admin_panel_keyboard(i18n_instance, lang: str,
                              settings: Settings) -> InlineKeyboardMarkup:
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
@@ -37,6 +39,7 @@ def get_admin_panel_keyboard(i18n_instance, lang: str,
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_stats_monitoring_keyboard(i18n_instance, lang: str) -> InlineKeyboardMarkup:
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     builder = InlineKeyboardBuilder()
@@ -47,13 +50,16 @@ def get_stats_monitoring_keyboard(i18n_instance, lang: str) -> InlineKeyboardMar
                    callback_data="admin_action:view_payments")
     builder.button(text=_(key="admin_view_logs_menu_button"),
                    callback_data="admin_action:view_logs_menu")
+    builder.button(text=_(key="admin_top_referrers_button", default="🏆 Топ рефереров"),
+                   callback_data="admin_action:top_referrers")
     
     builder.button(text=_(key="back_to_admin_panel_button"),
                    callback_data="admin_action:main")
-    builder.adjust(2, 1, 1)
+    builder.adjust(2, 2, 1)
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_user_management_keyboard(i18n_instance, lang: str) -> InlineKeyboardMarkup:
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     builder = InlineKeyboardBuilder()
@@ -69,6 +75,7 @@ def get_user_management_keyboard(i18n_instance, lang: str) -> InlineKeyboardMark
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_ban_management_keyboard(i18n_instance, lang: str) -> InlineKeyboardMarkup:
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     builder = InlineKeyboardBuilder()
@@ -86,6 +93,7 @@ def get_ban_management_keyboard(i18n_instance, lang: str) -> InlineKeyboardMarku
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_promo_marketing_keyboard(i18n_instance, lang: str) -> InlineKeyboardMarkup:
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     builder = InlineKeyboardBuilder()
@@ -103,6 +111,7 @@ def get_promo_marketing_keyboard(i18n_instance, lang: str) -> InlineKeyboardMark
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_system_functions_keyboard(i18n_instance, lang: str) -> InlineKeyboardMarkup:
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     builder = InlineKeyboardBuilder()
@@ -120,6 +129,7 @@ def get_system_functions_keyboard(i18n_instance, lang: str) -> InlineKeyboardMar
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_ads_menu_keyboard(i18n_instance, lang: str) -> InlineKeyboardMarkup:
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     builder = InlineKeyboardBuilder()
@@ -137,12 +147,16 @@ def get_ads_list_keyboard(
     campaigns: list,
     current_page: int,
     total_pages: int,
+    stats: Optional[dict] = None,
 ) -> InlineKeyboardMarkup:
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     builder = InlineKeyboardBuilder()
 
     for c in campaigns:
         title = f"{c.source}"
+        campaign_stats = (stats or {}).get(c.ad_campaign_id)
+        if campaign_stats:
+            title += f" · 👥{campaign_stats['starts']} 💳{campaign_stats['payers']}"
         builder.button(
             text=title,
             callback_data=f"admin_ads:card:{c.ad_campaign_id}:{current_page}",
@@ -193,6 +207,7 @@ def get_ad_card_keyboard(i18n_instance, lang: str, campaign_id: int, back_page:
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_logs_menu_keyboard(i18n_instance, lang: str) -> InlineKeyboardMarkup:
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     builder = InlineKeyboardBuilder()
@@ -336,6 +351,7 @@ def get_confirmation_keyboard(yes_callback_data: str, no_callback_data: str,
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_broadcast_confirmation_keyboard(lang: str,
                                         i18n_instance,
                                         target: str = "all") -> InlineKeyboardMarkup:
@@ -383,6 +399,7 @@ def get_broadcast_confirmation_keyboard(lang: str,
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_back_to_admin_panel_keyboard(lang: str,
                                      i18n_instance) -> InlineKeyboardMarkup:
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
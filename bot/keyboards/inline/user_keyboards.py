@@ -4,8 +4,10 @@ from aiogram.types import InlineKeyboardMarkup, WebAppInfo
 from typing import Dict, Optional, List, Tuple
 
 from config.settings import Settings
+from bot.keyboards.cache import cached_keyboard
 
 
+@cached_keyboard
 def get_main_menu_inline_keyboard(
         lang: str,
         i18n_instance,
@@ -83,6 +85,7 @@ def get_main_menu_inline_keyboard(
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_language_selection_keyboard(i18n_instance,
                                     current_lang: str) -> InlineKeyboardMarkup:
 
@@ -99,6 +102,7 @@ def get_language_selection_keyboard(i18n_instance,
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_trial_confirmation_keyboard(lang: str,
                                     i18n_instance) -> InlineKeyboardMarkup:
 
@@ -113,6 +117,7 @@ def get_trial_confirmation_keyboard(lang: str,
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_subscription_options_keyboard(
         subscription_options: Dict[int, Optional[int]],
         currency_symbol_val: str,
@@ -138,10 +143,11 @@ def get_subscription_options_keyboard(
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_payment_method_keyboard(
         months: int,
         price: float,
-        tribute_url: Optional[str],
+        has_tribute: bool,
         stars_price: Optional[int],
         currency_symbol_val: str,
         lang: str,
@@ -154,7 +160,7 @@ def get_payment_method_keyboard(
     if settings.STARS_ENABLED and stars_price is not None:
         builder.button(text=_("pay_with_stars_button"),
                        callback_data=f"pay_stars:{months}:{stars_price}")
-    if settings.TRIBUTE_ENABLED and tribute_url:
+    if settings.TRIBUTE_ENABLED and has_tribute:
         builder.button(text=_("pay_with_tribute_button"),
                        callback_data=f"pay_tribute:{months}:{price}")
     if settings.YOOKASSA_ENABLED:
@@ -186,6 +192,7 @@ def get_payment_url_keyboard(payment_url: str, lang: str,
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_referral_link_keyboard(lang: str,
                                i18n_instance) -> InlineKeyboardMarkup:
 
@@ -200,6 +207,7 @@ def get_referral_link_keyboard(lang: str,
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_back_to_main_menu_markup(lang: str,
                                  i18n_instance) -> InlineKeyboardMarkup:
 
@@ -211,6 +219,7 @@ def get_back_to_main_menu_markup(lang: str,
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_subscribe_only_markup(lang: str, i18n_instance) -> InlineKeyboardMarkup:
 
     def _(key, **kwargs):
@@ -221,6 +230,7 @@ def get_subscribe_only_markup(lang: str, i18n_instance) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_user_banned_keyboard(support_link: Optional[str], lang: str,
                              i18n_instance) -> Optional[InlineKeyboardMarkup]:
     if not support_link:
@@ -307,6 +317,7 @@ def get_connect_and_main_keyboard(
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_payment_methods_manage_keyboard(lang: str, i18n_instance, has_card: bool) -> InlineKeyboardMarkup:
     """Deprecated in favor of get_payment_methods_list_keyboard. Kept for backward compatibility."""
 
@@ -413,6 +424,7 @@ def get_bind_url_keyboard(bind_url: str, lang: str, i18n_instance) -> InlineKeyb
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_back_to_payment_methods_keyboard(lang: str, i18n_instance) -> InlineKeyboardMarkup:
 
     def _(key, **kwargs):
@@ -434,6 +446,7 @@ def get_back_to_payment_method_details_keyboard(pm_id: str, lang: str, i18n_inst
     return builder.as_markup()
 
 
+@cached_keyboard
 def get_autorenew_cancel_keyboard(lang: str, i18n_instance) -> InlineKeyboardMarkup:
 
     def _(key, **kwargs):
@@ -1,5 +1,6 @@
 import logging
 import asyncio
+import signal
 from typing import Dict, Any, Optional
 
 from aiogram import Bot, Dispatcher
@@ -13,8 +14,10 @@ from bot.services.panel_webhook_service import PanelWebhookService, panel_webhoo
 from sqlalchemy.orm import sessionmaker
 
 from config.settings import Settings
+from config.runtime import reload_runtime_config
 
-from db.database_setup import init_db_connection
+from db.database_setup import init_db_connection, init_replica_db_connection
+from db.read_replica import ReportingDatabase
 
 from bot.middlewares.i18n import I18nMiddleware, get_i18n_instance, JsonI18n
 from bot.middlewares.db_session import DBSessionMiddleware
@@ -39,6 +42,7 @@ from bot.services.crypto_pay_service import CryptoPayService, cryptopay_webhook_
 from bot.handlers.user import payment as user_payment_webhook_module
 from bot.handlers.admin.sync_admin import perform_sync
 from bot.utils.message_queue import init_queue_manager
+from bot.utils.bot_identity import init_bot_identity
 
 
 async def register_all_routers(dp: Dispatcher, settings: Settings):
@@ -150,6 +154,21 @@ async def on_startup_configured(dispatcher: Dispatcher):
     except Exception as e:
         logging.error(f"STARTUP: Failed to initialize message queue manager: {e}", exc_info=True)
 
+    if settings.LOCALES_RELOAD_INTERVAL_SECONDS > 0:
+        i18n_instance.start_watching(settings.LOCALES_RELOAD_INTERVAL_SECONDS)
+        logging.info(
+            f"STARTUP: Locales hot reload enabled (every {settings.LOCALES_RELOAD_INTERVAL_SECONDS}s)")
+
+    try:
+        await panel_service.detect_api_version()
+    except Exception as e:
+        logging.error(f"STARTUP: Panel API version detection failed: {e}", exc_info=True)
+
+    for scheduler_key in ("renewal_scheduler", "expiry_notifier", "promo_lookup_cache"):
+        scheduler = dispatcher.get(scheduler_key)
+        if scheduler:
+            scheduler.start()
+
     # Automatic sync on startup
     try:
         logging.info("STARTUP: Running automatic panel sync...")
@@ -196,7 +215,16 @@ async def on_shutdown_configured(dispatcher: Dispatcher):
                 except Exception as e:
                     logging.warning(f"Failed to close session for {key}: {e}")
 
+    i18n_instance: Optional[JsonI18n] = dispatcher.get("i18n_instance")
+    if i18n_instance:
+        await i18n_instance.stop_watching()
+
     for service_key in (
+        # Stop background workers first; they use the services closed below
+        "webhook_inbox",
+        "renewal_scheduler",
+        "expiry_notifier",
+        "promo_lookup_cache",
         "panel_service",
         "cryptopay_service",
         "tribute_service",
@@ -224,6 +252,12 @@ async def on_shutdown_configured(dispatcher: Dispatcher):
         await global_async_engine.dispose()
         logging.info("SHUTDOWN: SQLAlchemy engine disposed.")
 
+    from db.database_setup import replica_async_engine as global_replica_engine
+
+    if global_replica_engine:
+        await global_replica_engine.dispose()
+        logging.info("SHUTDOWN: SQLAlchemy read replica engine disposed.")
+
     logging.info("SHUTDOWN: Bot on_shutdown_configured completed.")
 
 
@@ -237,15 +271,14 @@ async def run_bot(settings_param: Settings):
     dp, bot, extra = build_dispatcher(settings_param, local_async_session_factory)
     i18n_instance = extra["i18n_instance"]
 
-    # Get bot username for YooKassa default return URL if needed
-    actual_bot_username = "your_bot_username"
-    try:
-        bot_info = await bot.get_me()
-        actual_bot_username = bot_info.username
-        logging.info(f"Bot username resolved: @{actual_bot_username}")
-    except Exception as e:
+    # Resolve the bot identity once; handlers read it from the cache.
+    # The username is also the YooKassa default return URL.
+    bot_identity = init_bot_identity(bot)
+    await bot_identity.refresh()
+    actual_bot_username = bot_identity.username or "your_bot_username"
+    if not bot_identity.username:
         logging.error(
-            f"Failed to get bot info (e.g., for YooKassa default URL): {e}. Using fallback: {actual_bot_username}"
+            f"Failed to resolve bot username (e.g., for YooKassa default URL). Using fallback: {actual_bot_username}"
         )
 
     services = build_core_services(
@@ -259,6 +292,18 @@ async def run_bot(settings_param: Settings):
         dp[key] = service
     dp["panel_service"] = services["panel_service"]
     dp["async_session_factory"] = local_async_session_factory
+    dp["reporting_db"] = ReportingDatabase(
+        local_async_session_factory,
+        init_replica_db_connection(settings_param),
+        max_lag_seconds=settings_param.DB_REPLICA_MAX_LAG_SECONDS,
+        lag_check_interval=settings_param.DB_REPLICA_LAG_CHECK_INTERVAL,
+    )
+
+    # SIGHUP re-reads RUNTIME_CONFIG_ENV_FILE (admins, prices, squads) without a restart
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_runtime_config)
+    except (NotImplementedError, AttributeError, RuntimeError) as e:
+        logging.warning(f"SIGHUP config reload is unavailable on this platform: {e}")
 
     # Wrap startup/shutdown handlers to satisfy aiogram event signature (no args passed)
     async def _on_startup_wrapper():
@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.dal import message_log_dal, user_dal
 from config.settings import Settings
+from config.runtime import get_runtime_config
 
 
 class ActionLoggerMiddleware(BaseMiddleware):
@@ -36,7 +37,7 @@ class ActionLoggerMiddleware(BaseMiddleware):
             user_id = event_user.id
             telegram_username = event_user.username
             telegram_first_name = event_user.first_name
-            if user_id in self.settings.ADMIN_IDS:
+            if get_runtime_config().is_admin(user_id):
                 is_admin_event_flag = True
 
         raw_update_snippet = None
@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError, TelegramBadRequest, AiogramError
 
 from config.settings import Settings
+from config.runtime import get_runtime_config
 from db.dal import user_dal
 
 from .i18n import JsonI18n
@@ -30,7 +31,7 @@ class BanCheckMiddleware(BaseMiddleware):
         if not event_user:
             return await handler(event, data)
 
-        if event_user.id in self.settings.ADMIN_IDS:
+        if get_runtime_config().is_admin(event_user.id):
             return await handler(event, data)
 
         try:
@@ -1,7 +1,10 @@
+import asyncio
 import logging
 import json
 import os
-from typing import Any, Awaitable, Callable, Dict, Optional
+import string
+from collections import Counter
+from typing import Any, Awaitable, Callable, Counter as TypedCounter, Dict, List, Optional, Tuple
 
 from aiogram import BaseMiddleware
 from aiogram.types import User, Update
@@ -9,6 +12,57 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.dal import user_dal
 from config.settings import Settings
+from bot.utils.metrics import I18N_MISSING_KEYS
+
+
+_FORMATTER = string.Formatter()
+
+
+_CONVERTERS = {"s": str, "r": repr, "a": ascii}
+
+
+class CompiledMessage:
+    """A translation string parsed once at load time.
+
+    Strings without placeholders are stored already unescaped ("{{" -> "{")
+    and are returned without calling `str.format`. Strings with plain named
+    placeholders keep their parsed (literal, field, spec, conversion)
+    segments and are rendered by joining them; anything fancier (positional,
+    attribute/index access, nested specs) falls back to `str.format`.
+    """
+    __slots__ = ("template", "literal", "segments")
+
+    def __init__(self, template: str):
+        self.template = template
+        self.literal: Optional[str] = None
+        self.segments: Optional[Tuple[Tuple[str, Optional[str], str, Optional[str]], ...]] = None
+        try:
+            parsed = list(_FORMATTER.parse(template))
+        except ValueError:
+            # Unbalanced braces: treat as plain text, as str.format would fail anyway
+            self.literal = template
+            return
+        if all(field_name is None for _literal, field_name, _spec, _conv in parsed):
+            self.literal = "".join(literal for literal, _field, _spec, _conv in parsed)
+        elif all(field_name is None
+                 or (field_name.isidentifier() and "{" not in (spec or "") and conv in (None, *_CONVERTERS))
+                 for _literal, field_name, spec, conv in parsed):
+            self.segments = tuple((literal, field_name, spec or "", conv)
+                                  for literal, field_name, spec, conv in parsed)
+
+    def render(self, kwargs: Dict[str, Any]) -> str:
+        """Same result as ``template.format(**kwargs)``; raises KeyError on a missing field."""
+        if self.segments is None:
+            return self.template.format(**kwargs)
+        parts: List[str] = []
+        for literal, field_name, spec, conv in self.segments:
+            parts.append(literal)
+            if field_name is not None:
+                value = kwargs[field_name]
+                if conv is not None:
+                    value = _CONVERTERS[conv](value)
+                parts.append(format(value, spec))
+        return "".join(parts)
 
 
 class JsonI18n:
@@ -18,23 +72,33 @@ class JsonI18n:
         self.path = path
         self.default_lang = default
         self.locales_data: Dict[str, Dict[str, str]] = {}
-        self._load_locales()
+        # Per-language flat catalogs with the lang -> default -> en chain merged in
+        self._catalogs: Dict[str, Dict[str, CompiledMessage]] = {}
+        self._fallback_catalog: Dict[str, CompiledMessage] = {}
+        self.version = 0
+        self.missing_keys: TypedCounter[Tuple[str, str]] = Counter()
+        # Inline `default=` strings used for keys absent from the catalogs
+        self._compiled_defaults: Dict[str, CompiledMessage] = {}
+        self._source_mtimes: Dict[str, float] = {}
+        self._watch_task: Optional[asyncio.Task] = None
+        self.reload()
         logging.info(
             f"JsonI18n initialized. Loaded languages: {list(self.locales_data.keys())}. Default: {self.default_lang}"
         )
 
-    def _load_locales(self):
+    def _load_locales(self) -> Dict[str, Dict[str, str]]:
+        locales_data: Dict[str, Dict[str, str]] = {}
         if not os.path.isdir(self.path):
             logging.error(
                 f"Locales path not found or not a directory: {self.path}")
-            return
+            return locales_data
         for item in os.listdir(self.path):
             if item.endswith(".json"):
                 lang_code = item.split(".")[0]
                 file_path = os.path.join(self.path, item)
                 try:
                     with open(file_path, "r", encoding="utf-8") as f:
-                        self.locales_data[lang_code] = json.load(f)
+                        locales_data[lang_code] = json.load(f)
                 except json.JSONDecodeError as e_json_load:
                     logging.error(
                         f"Error loading locale {lang_code} from {file_path} (JSON Decode Error): {e_json_load}"
@@ -43,58 +107,127 @@ class JsonI18n:
                     logging.error(
                         f"Error loading locale {lang_code} from {file_path}: {e_load}",
                         exc_info=True)
+        return locales_data
 
-    def gettext(self, lang_code: Optional[str], key: str, **kwargs) -> str:
-        # Determine effective language with robust fallback
-        if lang_code and lang_code in self.locales_data:
-            effective_lang_code = lang_code
-        elif self.default_lang in self.locales_data:
-            effective_lang_code = self.default_lang
-        elif 'en' in self.locales_data:
-            effective_lang_code = 'en'
-        else:
-            effective_lang_code = lang_code or self.default_lang
-
-        lang_data = self.locales_data.get(effective_lang_code)
-        if lang_data is None:
-            # Try explicit fallback to English if available
-            fallback_data = self.locales_data.get('en')
-            if fallback_data is not None:
-                text = fallback_data.get(key)
-                if text is not None:
-                    try:
-                        return text.format(**kwargs) if kwargs else text
-                    except Exception:
-                        return text
+    def _compile(self, locales_data: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, CompiledMessage]]:
+        compiled_sources = {
+            lang: {k: CompiledMessage(v) for k, v in data.items() if isinstance(v, str)}
+            for lang, data in locales_data.items()
+        }
+        catalogs: Dict[str, Dict[str, CompiledMessage]] = {}
+        for lang in compiled_sources:
+            merged: Dict[str, CompiledMessage] = {}
+            # Lowest priority first so the language's own strings win
+            for source_lang in ("en", self.default_lang, lang):
+                merged.update(compiled_sources.get(source_lang, {}))
+            catalogs[lang] = merged
+        return catalogs
+
+    def _snapshot_mtimes(self) -> Dict[str, float]:
+        mtimes: Dict[str, float] = {}
+        try:
+            for item in os.listdir(self.path):
+                if item.endswith(".json"):
+                    mtimes[item] = os.path.getmtime(os.path.join(self.path, item))
+        except OSError:
+            pass
+        return mtimes
+
+    def reload(self) -> None:
+        """Re-read all locale files and swap the compiled catalogs in one step.
+
+        A file that fails to parse keeps its previously loaded strings.
+        """
+        mtimes = self._snapshot_mtimes()
+        locales_data = self._load_locales()
+        for lang, previous in self.locales_data.items():
+            if lang not in locales_data and f"{lang}.json" in mtimes:
+                locales_data[lang] = previous
+        catalogs = self._compile(locales_data)
+        fallback = catalogs.get(self.default_lang) or catalogs.get("en") or {}
+
+        self.locales_data = locales_data
+        self._catalogs = catalogs
+        self._fallback_catalog = fallback
+        self._source_mtimes = mtimes
+        self.missing_keys.clear()
+        self.version += 1
+
+    def reload_if_changed(self) -> bool:
+        if self._snapshot_mtimes() == self._source_mtimes:
+            return False
+        self.reload()
+        logging.info(
+            f"Locales reloaded from {self.path} (version {self.version}). Languages: {list(self.locales_data.keys())}"
+        )
+        return True
+
+    def start_watching(self, interval_seconds: float) -> None:
+        """Poll the locales directory and reload when a file changes."""
+        if self._watch_task is not None and not self._watch_task.done():
+            return
+
+        async def _watch():
+            while True:
+                await asyncio.sleep(interval_seconds)
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    logging.error(f"Locales hot reload failed: {e}", exc_info=True)
+
+        self._watch_task = asyncio.create_task(_watch(), name="LocalesWatcher")
+
+    async def stop_watching(self) -> None:
+        if self._watch_task is None:
+            return
+        self._watch_task.cancel()
+        try:
+            await self._watch_task
+        except asyncio.CancelledError:
+            pass
+        self._watch_task = None
+
+    def _record_missing(self, lang_code: str, key: str) -> None:
+        counter_key = (lang_code, key)
+        first_time = counter_key not in self.missing_keys
+        self.missing_keys[counter_key] += 1
+        I18N_MISSING_KEYS.inc(lang_code)
+        if first_time:
             logging.warning(
-                f"No language data for '{effective_lang_code}' (default '{self.default_lang}' also missing). Key '{key}' will be returned as is."
+                f"Translation key '{key}' not found for lang '{lang_code}' or its fallbacks. Further misses are only counted."
             )
-            return key.format(**kwargs) if kwargs else key
 
-        text = lang_data.get(key)
-        if text is None:
-            if effective_lang_code != self.default_lang:
-                default_lang_data = self.locales_data.get(
-                    self.default_lang, {})
-                text = default_lang_data.get(key)
+    def gettext(self, lang_code: Optional[str], key: str, **kwargs) -> str:
+        catalog = self._catalogs.get(lang_code) if lang_code else None
+        if catalog is None:
+            catalog = self._fallback_catalog
 
+        message = catalog.get(key)
+        if message is None:
+            self._record_missing(lang_code or self.default_lang, key)
+            text = kwargs.get("default")
             if text is None:
-                logging.warning(
-                    f"Translation key '{key}' not found for lang '{effective_lang_code}' or default '{self.default_lang}'. Returning key."
-                )
-                return key.format(**kwargs) if kwargs else key
+                return key
+            message = self._compiled_defaults.get(text)
+            if message is None:
+                message = self._compiled_defaults[text] = CompiledMessage(text)
+
+        if message.literal is not None:
+            return message.literal
+        if not kwargs:
+            return message.template
         try:
-            return text.format(**kwargs) if kwargs else text
+            return message.render(kwargs)
         except KeyError as e_format:
             logging.warning(
-                f"Missing format key '{e_format}' for i18n key '{key}' (lang: {effective_lang_code}). Original text: '{text}'"
+                f"Missing format key '{e_format}' for i18n key '{key}' (lang: {lang_code}). Original text: '{message.template}'"
             )
-            return text
+            return message.template
         except Exception as e_general_format:
             logging.error(
-                f"General error formatting i18n key '{key}' (lang: {effective_lang_code}): {e_general_format}. Original text: '{text}'",
+                f"General error formatting i18n key '{key}' (lang: {lang_code}): {e_general_format}. Original text: '{message.template}'",
                 exc_info=True)
-            return text
+            return message.template
 
 
 _i18n_instance_singleton: Optional[JsonI18n] = None
@@ -0,0 +1,60 @@
+import time
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from bot.utils.metrics import UPDATE_DURATION, UPDATE_ERRORS, HANDLER_DURATION
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Outer update middleware: measures total processing time per update type."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        update_type = event.event_type if isinstance(event, Update) else "unknown"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            UPDATE_ERRORS.inc(update_type)
+            raise
+        finally:
+            UPDATE_DURATION.observe(time.perf_counter() - started, update_type)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Inner middleware: measures time spent in the matched handler."""
+
+    def __init__(self, update_type: str):
+        super().__init__()
+        self.update_type = update_type
+        self._names: Dict[int, str] = {}
+
+    def _handler_name(self, data: Dict[str, Any]) -> str:
+        handler_obj = data.get("handler")
+        callback = getattr(handler_obj, "callback", None)
+        if callback is None:
+            return "unknown"
+        name = self._names.get(id(callback))
+        if name is None:
+            name = f"{getattr(callback, '__module__', '?')}.{getattr(callback, '__qualname__', repr(callback))}"
+            self._names[id(callback)] = name
+        return name
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            HANDLER_DURATION.observe(time.perf_counter() - started,
+                                     self.update_type, self._handler_name(data))
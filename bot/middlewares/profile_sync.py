@@ -46,7 +46,7 @@ class ProfileSyncMiddleware(BaseMiddleware):
                                     tg_user.first_name or "",
                                     tg_user.last_name or "",
                                 ])
-                                await panel_service.update_user_details_on_panel(
+                                panel_service.enqueue_user_update(
                                     db_user.panel_user_uuid,
                                     {"description": description_text},
                                 )
@@ -1,4 +1,6 @@
 # flake8: noqa: E501
+import hashlib
+import hmac
 import logging
 import json
 from typing import Optional
@@ -16,8 +18,9 @@ from bot.services.subscription_service import SubscriptionService
 from bot.services.referral_service import ReferralService
 from bot.keyboards.inline.user_keyboards import get_connect_and_main_keyboard
 from bot.services.notification_service import NotificationService
+from bot.services.webhook_inbox import PermanentWebhookError, WebhookInbox
 from db.dal import payment_dal, user_dal
-import os
+from bot.utils.media_registry import get_media_registry
 
 
 class CryptoPayService:
@@ -38,11 +41,13 @@ class CryptoPayService:
         self.async_session_factory = async_session_factory
         self.subscription_service = subscription_service
         self.referral_service = referral_service
+        self._token = token
+        # Set by build_core_services
+        self.webhook_inbox: Optional[WebhookInbox] = None
         if token:
             net = Networks.TEST_NET if str(
                 network).lower() == "testnet" else Networks.MAIN_NET
             self.client = AioCryptoPay(token=token, network=net)
-            self.client.register_pay_handler(self._invoice_paid_handler)
             self.configured = True
         else:
             logging.warning("CryptoPay token not provided. CryptoPay disabled")
@@ -132,7 +137,7 @@ class CryptoPayService:
                 f"CryptoPay invoice creation failed: {e}", exc_info=True)
             return None
 
-    async def _invoice_paid_handler(self, update: Update, app: web.Application):
+    async def _invoice_paid_handler(self, update: Update):
         invoice = update.payload
         if not invoice.payload:
             logging.warning("CryptoPay webhook without payload")
@@ -143,15 +148,14 @@ class CryptoPayService:
             months = int(meta["subscription_months"])
             payment_db_id = int(meta["payment_db_id"])
         except Exception as e:
-            logging.error(f"Failed to parse CryptoPay payload: {e}")
-            return
+            raise PermanentWebhookError(f"Failed to parse CryptoPay payload: {e}")
 
-        async_session_factory: sessionmaker = app["async_session_factory"]
-        bot: Bot = app["bot"]
-        settings: Settings = app["settings"]
-        i18n: JsonI18n = app["i18n"]
-        subscription_service: SubscriptionService = app["subscription_service"]
-        referral_service: ReferralService = app["referral_service"]
+        async_session_factory: sessionmaker = self.async_session_factory
+        bot: Bot = self.bot
+        settings: Settings = self.settings
+        i18n: JsonI18n = self.i18n
+        subscription_service: SubscriptionService = self.subscription_service
+        referral_service: ReferralService = self.referral_service
 
         async with async_session_factory() as session:
             try:
@@ -190,7 +194,7 @@ class CryptoPayService:
                 await session.rollback()
                 logging.error(
                     f"Failed to process CryptoPay invoice: {e}", exc_info=True)
-                return
+                raise
 
             db_user = await user_dal.get_user_by_id(session, user_id)
             # Use DB language for user-facing messages
@@ -235,23 +239,14 @@ class CryptoPayService:
             try:
                 image_ref = settings.PAYMENT_SUCCESS_IMAGE_PATH
                 if image_ref:
-                    if os.path.exists(image_ref):
-                        from aiogram.types import FSInputFile
-                        await bot.send_photo(
-                            user_id,
-                            photo=FSInputFile(image_ref),
-                            caption=text,
-                            reply_markup=markup,
-                            parse_mode="HTML",
-                        )
-                    else:
-                        await bot.send_photo(
-                            user_id,
-                            photo=image_ref,
-                            caption=text,
-                            reply_markup=markup,
-                            parse_mode="HTML",
-                        )
+                    await get_media_registry().send_photo(
+                        bot,
+                        user_id,
+                        image_ref,
+                        caption=text,
+                        reply_markup=markup,
+                        parse_mode="HTML",
+                    )
                 else:
                     await bot.send_message(
                         user_id,
@@ -279,10 +274,39 @@ class CryptoPayService:
                 logging.error(
                     f"Failed to send crypto_pay payment notification: {e}")
 
+    def _check_signature(self, raw_body: bytes, signature: Optional[str]) -> bool:
+        if not signature or not self._token:
+            return False
+        secret = hashlib.sha256(self._token.encode()).digest()
+        expected = hmac.new(secret, raw_body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
     async def webhook_route(self, request: web.Request) -> web.Response:
+        """Verify the update signature and store it in the webhook inbox."""
         if not self.configured or not self.client:
             return web.Response(status=503, text="cryptopay_disabled")
-        return await self.client.get_updates(request)
+        raw_body = await request.read()
+        if not self._check_signature(raw_body, request.headers.get("crypto-pay-api-signature")):
+            return web.Response(status=403, text="invalid_signature")
+        try:
+            raw_text = raw_body.decode()
+            update_id = json.loads(raw_text)["update_id"]
+        except Exception:
+            return web.Response(status=400, text="bad_request")
+        try:
+            await self.webhook_inbox.accept("cryptopay", str(update_id), raw_text)
+        except Exception as e:
+            logging.error(f"CryptoPay webhook: failed to store update {update_id}: {e}", exc_info=True)
+            return web.Response(status=500, text="inbox_unavailable")
+        return web.Response(status=200, text="ok")
+
+    async def process_webhook_event(self, raw_payload: str) -> None:
+        """Webhook inbox handler: apply a stored CryptoPay update."""
+        update = Update(**json.loads(raw_payload))
+        if update.update_type != "invoice_paid":
+            logging.info(f"CryptoPay update {update.update_id} of type {update.update_type} ignored")
+            return
+        await self._invoice_paid_handler(update)
 
 
 async def cryptopay_webhook_route(request: web.Request) -> web.Response:
@@ -0,0 +1,68 @@
+import hashlib
+import logging
+import time
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.dal import webhook_inbox_dal
+from bot.utils.metrics import WEBHOOK_EVENT_DUPLICATES
+from bot.utils.ttl_cache import TTLCache
+
+PURGE_INTERVAL_SECONDS = 3600
+
+
+class EventDeduplicator:
+    """Remembers handled webhook events by a semantic fingerprint.
+
+    The inbox already drops byte-identical redeliveries; this catches events
+    that are resent with a different body (new timestamp, extra fields) but
+    mean the same thing. A bounded in-memory LRU answers repeat checks
+    without a query; the ``webhook_event_fingerprints`` table makes the
+    decision hold across restarts and bot instances. Entries expire after
+    `ttl_seconds`.
+    """
+
+    def __init__(self, provider: str, ttl_seconds: float, maxsize: int = 10000):
+        self.provider = provider
+        self.ttl_seconds = ttl_seconds
+        self._recent: TTLCache[bool] = TTLCache(maxsize, ttl_seconds)
+        self._last_purge = 0.0
+
+    @staticmethod
+    def fingerprint(*parts: Any) -> str:
+        raw = "\x1f".join("" if part is None else str(part) for part in parts)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def seen(self, fingerprint: str) -> bool:
+        if self._recent.get(fingerprint):
+            WEBHOOK_EVENT_DUPLICATES.inc(self.provider, "memory")
+            return True
+        return False
+
+    async def claim(self, session: AsyncSession, fingerprint: str) -> bool:
+        """Claim the fingerprint inside the caller's transaction.
+
+        Returns False for a duplicate. Call `remember()` after the caller
+        commits so later checks skip the database.
+        """
+        if self.seen(fingerprint):
+            return False
+        await self._purge_expired(session)
+        if await webhook_inbox_dal.claim_fingerprint(session, fingerprint, self.ttl_seconds):
+            return True
+        WEBHOOK_EVENT_DUPLICATES.inc(self.provider, "db")
+        self._recent.set(fingerprint, True)
+        return False
+
+    def remember(self, fingerprint: str) -> None:
+        self._recent.set(fingerprint, True)
+
+    async def _purge_expired(self, session: AsyncSession) -> None:
+        now = time.monotonic()
+        if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        deleted = await webhook_inbox_dal.delete_expired_fingerprints(session)
+        if deleted:
+            logging.info(f"Event dedup ({self.provider}): removed {deleted} expired fingerprint(s).")
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup
+from sqlalchemy.orm import sessionmaker
+
+from config.settings import Settings
+from bot.middlewares.i18n import JsonI18n
+from bot.keyboards.inline.user_keyboards import get_subscribe_only_markup, get_autorenew_cancel_keyboard
+from bot.services.panel_webhook_service import EVENT_MAP
+from bot.utils.message_queue import get_queue_manager
+from db.dal import subscription_dal, user_billing_dal
+
+# Pause producing while the user queue holds more than this many messages
+QUEUE_HIGH_WATERMARK = 1000
+
+
+class ExpiryNotificationScheduler:
+    """Sends expiry reminders from the local database.
+
+    Mirrors the panel's ``user.expires_in_*`` webhooks so reminders still go
+    out when those are not delivered. Every run walks the 72h/48h/24h buckets
+    (limited by SUBSCRIPTION_NOTIFY_DAYS_BEFORE) page by page with keyset
+    pagination on (end_date, subscription_id), so memory use is bounded by the
+    page size. Each page is claimed with a conditional update of
+    ``last_notification_sent``; the panel webhook handler claims the same
+    way, so whichever path comes second skips the reminder. Messages go
+    through the rate-limited message queue.
+    """
+
+    def __init__(self, bot: Bot, settings: Settings, i18n: JsonI18n,
+                 async_session_factory: sessionmaker):
+        self.bot = bot
+        self.settings = settings
+        self.i18n = i18n
+        self.async_session_factory = async_session_factory
+        self._task: Optional[asyncio.Task] = None
+        self._stop = asyncio.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return (self.settings.EXPIRY_NOTIFY_INTERVAL_SECONDS > 0
+                and self.settings.SUBSCRIPTION_NOTIFICATIONS_ENABLED)
+
+    def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        self._stop.clear()
+        self._task = asyncio.create_task(self._loop(), name="ExpiryNotificationScheduler")
+        logging.info(
+            f"Expiry notification scheduler started (every {self.settings.EXPIRY_NOTIFY_INTERVAL_SECONDS}s).")
+
+    async def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                await self.run_once()
+            except Exception as e:
+                logging.error(f"Expiry notification run failed: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._stop.wait(),
+                                       timeout=self.settings.EXPIRY_NOTIFY_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_once(self) -> Dict[int, int]:
+        """Scan all reminder buckets; returns the number of reminders queued per bucket (days)."""
+        sent: Dict[int, int] = {}
+        for days_left, msg_key in sorted(EVENT_MAP.values()):
+            if days_left > self.settings.SUBSCRIPTION_NOTIFY_DAYS_BEFORE or self._stop.is_set():
+                continue
+            sent[days_left] = await self._scan_bucket(days_left, msg_key)
+        if any(sent.values()):
+            logging.info(f"Expiry notification run queued reminders by days left: {sent}")
+        return sent
+
+    async def _scan_bucket(self, days_left: int, msg_key: str) -> int:
+        page_size = max(1, self.settings.EXPIRY_NOTIFY_BATCH_SIZE)
+        after: Optional[Tuple[datetime, int]] = None
+        queued = 0
+        while not self._stop.is_set():
+            now = datetime.now(timezone.utc)
+            outgoing: List[Tuple[int, str, Optional[InlineKeyboardMarkup]]] = []
+            async with self.async_session_factory() as session:
+                page = await subscription_dal.get_subscriptions_near_expiration(
+                    session, days_left,
+                    window_from=now + timedelta(days=days_left - 1),
+                    notified_before_hours=days_left * 24,
+                    after=after,
+                    limit=page_size)
+                if not page:
+                    break
+                after = (page[-1].end_date, page[-1].subscription_id)
+                # Claim the page; rows the panel webhook notified meanwhile drop out
+                claimed = set(await subscription_dal.mark_subscriptions_notified(
+                    session, [sub.subscription_id for sub in page], now,
+                    notified_before_hours=days_left * 24))
+                with_saved_method = await user_billing_dal.get_users_with_default_payment_method(
+                    session, [sub.user_id for sub in page if sub.subscription_id in claimed])
+                for sub in page:
+                    if sub.subscription_id not in claimed:
+                        continue
+                    message = self._build_message(sub, days_left, msg_key,
+                                                  sub.user_id in with_saved_method)
+                    if message:
+                        outgoing.append((sub.user_id, *message))
+                await session.commit()
+
+            for user_id, text, markup in outgoing:
+                await self._send(user_id, text, markup)
+            queued += len(outgoing)
+            if len(page) < page_size:
+                break
+        return queued
+
+    def _build_message(self, sub, days_left: int, msg_key: str,
+                       has_saved_method: bool) -> Optional[Tuple[str, Optional[InlineKeyboardMarkup]]]:
+        user = sub.user
+        if not user or user.is_banned:
+            return None
+        lang = user.language_code or self.settings.DEFAULT_LANGUAGE
+        first_name = user.first_name or f"User {sub.user_id}"
+        auto_renew = sub.auto_renew_enabled and sub.provider != "tribute"
+        if days_left == 1 and auto_renew and self.settings.YOOKASSA_AUTOPAYMENTS_ENABLED \
+                and self.settings.AUTORENEW_SCHEDULER_INTERVAL_SECONDS > 0 and has_saved_method:
+            # The renewal scheduler charges it (and reports a failed charge); no 24h reminder
+            return None
+        if days_left == 2 and auto_renew:
+            text = self.i18n.gettext(lang, "autorenew_48h_charge_tomorrow_notice", user_name=first_name)
+            return text, get_autorenew_cancel_keyboard(lang, self.i18n)
+        text = self.i18n.gettext(lang, msg_key, user_name=first_name,
+                                 end_date=sub.end_date.strftime("%Y-%m-%d"))
+        return text, get_subscribe_only_markup(lang, self.i18n)
+
+    async def _send(self, user_id: int, text: str, markup: Optional[InlineKeyboardMarkup]) -> None:
+        queue_manager = get_queue_manager()
+        if queue_manager is None:
+            try:
+                await self.bot.send_message(user_id, text, reply_markup=markup)
+            except Exception as e:
+                logging.error(f"Failed to send expiry reminder to {user_id}: {e}")
+            return
+        # Backpressure: let the queue drain instead of buffering a whole bucket
+        while queue_manager.get_queue_stats()["user_queue_size"] > QUEUE_HIGH_WATERMARK:
+            await asyncio.sleep(1)
+        await queue_manager.send_message(user_id, text=text, reply_markup=markup)
+
+    async def close(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=30)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                self._task.cancel()
+            self._task = None
@@ -7,6 +7,7 @@ from datetime import datetime, timezone
 from typing import Optional, Union, Dict, Any
 
 from config.settings import Settings
+from config.runtime import get_runtime_config
 from sqlalchemy.orm import sessionmaker
 from bot.middlewares.i18n import JsonI18n
 from bot.utils.message_queue import get_queue_manager
@@ -62,13 +63,14 @@ class NotificationService:
     
     async def _send_to_admins(self, message: str):
         """Send message to all admin users using message queue"""
-        if not self.settings.ADMIN_IDS:
+        admin_ids = get_runtime_config().admin_ids_ordered
+        if not admin_ids:
             return
         
         queue_manager = get_queue_manager()
         if not queue_manager:
             logging.warning("Message queue manager not available, falling back to direct send")
-            for admin_id in self.settings.ADMIN_IDS:
+            for admin_id in admin_ids:
                 try:
                     await self.bot.send_message(
                         chat_id=admin_id,
@@ -80,7 +82,7 @@ class NotificationService:
                     logging.error(f"Failed to send notification to admin {admin_id}: {e}")
             return
         
-        for admin_id in self.settings.ADMIN_IDS:
+        for admin_id in admin_ids:
             try:
                 await queue_manager.send_message(
                     chat_id=admin_id,
@@ -257,6 +259,35 @@ class NotificationService:
         # Send to log channel 
         await self._send_to_log_channel(message)
 
+    async def notify_autorenew_run(self, report: Dict[str, int]):
+        """Send the renewal scheduler run report"""
+        if not getattr(self.settings, 'LOG_AUTORENEW_RUNS', True):
+            return
+
+        admin_lang = self.settings.DEFAULT_LANGUAGE
+        _ = lambda k, **kw: self.i18n.gettext(admin_lang, k, **kw) if self.i18n else k
+
+        message = _(
+            "log_autorenew_run",
+            default="🔄 <b>Автопродление</b>\n\n"
+                   "📋 Проверено подписок: <b>{checked}</b>\n"
+                   "💳 Списаний создано: <b>{initiated}</b>\n"
+                   "✅ Подтверждено: <b>{succeeded}</b>\n"
+                   "⛔ Отклонено: <b>{declined}</b>\n"
+                   "⚠️ Ошибок: <b>{failed}</b>\n"
+                   "🚫 Попытки исчерпаны: <b>{exhausted}</b>\n"
+                   "🕐 Время: {timestamp}",
+            checked=report.get("checked", 0),
+            initiated=report.get("initiated", 0),
+            succeeded=report.get("succeeded", 0),
+            declined=report.get("declined", 0),
+            failed=report.get("failed", 0),
+            exhausted=report.get("exhausted", 0),
+            timestamp=datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S %Z"),
+        )
+
+        await self._send_to_log_channel(message)
+
     async def notify_suspicious_promo_attempt(
             self, user_id: int, suspicious_input: str,
             username: Optional[str] = None, first_name: Optional[str] = None):
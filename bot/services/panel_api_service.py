@@ -1,9 +1,13 @@
 import aiohttp
 import logging
 import json
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, timedelta, timezone
 import asyncio
+import random
+import re
+import time
+from collections import OrderedDict
 from urllib.parse import urlencode
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,6 +15,57 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from config.settings import Settings
 from db.dal import panel_sync_dal
 from db.models import PanelSyncStatus
+from bot.utils.circuit_breaker import CircuitBreaker, STATE_CLOSED
+from bot.utils.ttl_cache import TTLCache
+from .panel_write_queue import PanelWriteQueue
+from bot.utils.metrics import (
+    PANEL_CIRCUIT_OPEN,
+    PANEL_REQUEST_DURATION,
+    PANEL_REQUEST_ERRORS,
+    PANEL_REQUEST_RETRIES,
+    PANEL_SHORT_CIRCUITED,
+    PANEL_USER_CACHE_REQUESTS,
+)
+
+_ENDPOINT_ID_RE = re.compile(
+    r"^(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|\d+)$")
+
+
+def _endpoint_metric_label(endpoint: str) -> str:
+    """Collapse ids, uuids and lookup values in an endpoint path so metric label cardinality stays bounded."""
+    segments = endpoint.strip("/").split("/")
+    for idx, segment in enumerate(segments):
+        if _ENDPOINT_ID_RE.match(segment) or (idx > 0 and segments[idx - 1].startswith("by-")):
+            segments[idx] = ":id"
+    return "/" + "/".join(segments)
+
+
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Synthetic status codes from _send_request: -1 connect error, -2 client error, -3 timeout
+_TRANSIENT_LOCAL_STATUS_CODES = frozenset({-1, -2, -3})
+_STALE_CACHE_MAX_ENTRIES = 2000
+_API_V1 = "v1"
+_API_V2 = "v2"
+_ROUTE_NOT_FOUND_STATUS_CODES = frozenset({404, 410})
+
+
+def _endpoint_family(endpoint: str) -> str:
+    """First path segment after any api/ or api/v2/ prefix, e.g. 'users' or 'nodes'."""
+    ep = endpoint.strip("/")
+    for prefix in ("api/v2/", "api/"):
+        if ep.startswith(prefix):
+            ep = ep[len(prefix):]
+            break
+    return ep.split("/", 1)[0].split("?", 1)[0]
+
+
+def _is_transient_failure(result: Optional[Dict[str, Any]]) -> bool:
+    if not isinstance(result, dict) or not result.get("error"):
+        return False
+    status_code = result.get("status_code")
+    if not isinstance(status_code, int):
+        return False
+    return status_code in _TRANSIENT_LOCAL_STATUS_CODES or status_code >= 500
 
 
 class PanelApiService:
@@ -27,6 +82,25 @@ class PanelApiService:
         self.api_key = settings.PANEL_API_KEY
         self._session: Optional[aiohttp.ClientSession] = None
         self.default_client_ip = "127.0.0.1"
+        self.circuit_breaker = CircuitBreaker(
+            "panel_api",
+            failure_threshold=settings.PANEL_CIRCUIT_BREAKER_THRESHOLD,
+            reset_timeout=settings.PANEL_CIRCUIT_BREAKER_RESET_SECONDS,
+        )
+        # Last successful GET responses, served while the panel is unreachable
+        self._stale_cache: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # Panel API version tried first for families without a confirmed version
+        self._default_api_version = _API_V1
+        # endpoint family -> (api version that answered, monotonic time confirmed)
+        self._api_version_by_family: Dict[str, Tuple[str, float]] = {}
+        # Panel user records by uuid; invalidated by our writes and panel webhooks
+        self.user_cache: TTLCache[Dict[str, Any]] = TTLCache(
+            settings.PANEL_USER_CACHE_SIZE, settings.PANEL_USER_CACHE_TTL_SECONDS)
+        self.write_queue = PanelWriteQueue(
+            self,
+            flush_interval=settings.PANEL_WRITE_QUEUE_FLUSH_SECONDS,
+            concurrency=settings.PANEL_WRITE_QUEUE_CONCURRENCY,
+        )
 
     async def __aenter__(self):
         """Context manager entry"""
@@ -38,8 +112,19 @@ class PanelApiService:
 
     async def _get_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
-            timeout = aiohttp.ClientTimeout(total=30)
-            self._session = aiohttp.ClientSession(timeout=timeout)
+            timeout = aiohttp.ClientTimeout(
+                total=self.settings.PANEL_HTTP_TIMEOUT,
+                connect=self.settings.PANEL_HTTP_CONNECT_TIMEOUT,
+            )
+            connector = aiohttp.TCPConnector(
+                limit=self.settings.PANEL_HTTP_POOL_LIMIT,
+                limit_per_host=self.settings.PANEL_HTTP_POOL_LIMIT_PER_HOST,
+                keepalive_timeout=self.settings.PANEL_HTTP_KEEPALIVE_TIMEOUT,
+                use_dns_cache=True,
+                ttl_dns_cache=self.settings.PANEL_HTTP_DNS_CACHE_TTL,
+            )
+            self._session = aiohttp.ClientSession(timeout=timeout,
+                                                  connector=connector)
         return self._session
 
     async def close_session(self):
@@ -49,7 +134,8 @@ class PanelApiService:
             logging.debug("Panel API service HTTP session closed.")
 
     async def close(self):
-        """Alias for close_session for API consistency."""
+        """Flush queued panel writes, then close the HTTP session."""
+        await self.write_queue.close()
         await self.close_session()
 
     async def _prepare_headers(self) -> Dict[str, str]:
@@ -75,11 +161,112 @@ class PanelApiService:
                 return payload.get("data")
         return payload
 
+    def _stale_cache_key(self, endpoint: str, params: Optional[Dict[str, Any]]) -> Tuple[str, str]:
+        return endpoint, urlencode(sorted(params.items())) if params else ""
+
+    def _remember_response(self, key: Tuple[str, str], result: Dict[str, Any]) -> None:
+        self._stale_cache[key] = (time.monotonic(), result)
+        self._stale_cache.move_to_end(key)
+        while len(self._stale_cache) > _STALE_CACHE_MAX_ENTRIES:
+            self._stale_cache.popitem(last=False)
+
+    def _stale_response(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        max_age = self.settings.PANEL_STALE_CACHE_SECONDS
+        cached = self._stale_cache.get(key)
+        if not cached or max_age <= 0:
+            return None
+        stored_at, result = cached
+        if time.monotonic() - stored_at > max_age:
+            return None
+        return result
+
+    def _update_breaker_gauge(self) -> None:
+        PANEL_CIRCUIT_OPEN.set(0 if self.circuit_breaker.state == STATE_CLOSED else 1)
+
     async def _request(self,
                        method: str,
                        endpoint: str,
                        log_full_response: bool = False,
+                       cacheable: bool = True,
                        **kwargs) -> Optional[Dict[str, Any]]:
+        """Send a panel request with retries, circuit breaking and stale fallback.
+
+        Idempotent methods are retried on timeouts, connection errors and 5xx.
+        While the breaker is open requests fail fast with status_code -5; GET
+        requests are answered from the last successful response instead when
+        one is recent enough. Pass cacheable=False for large or paginated reads.
+        """
+        method_upper = method.upper()
+        endpoint_label = _endpoint_metric_label(endpoint)
+        stale_key = None
+        if cacheable and method_upper == "GET":
+            stale_key = self._stale_cache_key(endpoint, kwargs.get("params"))
+
+        if not self.circuit_breaker.allow_request():
+            stale = self._stale_response(stale_key) if stale_key else None
+            if stale is not None:
+                PANEL_SHORT_CIRCUITED.inc("stale_cache")
+                logging.debug(f"Panel API breaker open, serving cached {method_upper} {endpoint}")
+                return stale
+            PANEL_SHORT_CIRCUITED.inc("rejected")
+            return {
+                "error": True,
+                "status_code": -5,
+                "message": f"Panel API unavailable (circuit open, retry in {self.circuit_breaker.retry_after:.0f}s)"
+            }
+
+        max_attempts = 1
+        if method_upper in _IDEMPOTENT_METHODS:
+            max_attempts += max(0, self.settings.PANEL_HTTP_RETRY_ATTEMPTS)
+
+        result: Optional[Dict[str, Any]] = None
+        outcome_recorded = False
+        try:
+            for attempt in range(max_attempts):
+                if attempt:
+                    PANEL_REQUEST_RETRIES.inc(method_upper, endpoint_label)
+                    backoff = self.settings.PANEL_HTTP_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1))
+                    await asyncio.sleep(backoff * random.uniform(0.5, 1.5))
+                started = time.perf_counter()
+                result = await self._send_request(method, endpoint,
+                                                  log_full_response=log_full_response,
+                                                  **kwargs)
+                PANEL_REQUEST_DURATION.observe(time.perf_counter() - started,
+                                               method_upper, endpoint_label)
+                if isinstance(result, dict) and result.get("error"):
+                    PANEL_REQUEST_ERRORS.inc(method_upper, endpoint_label,
+                                             result.get("status_code"))
+                if not _is_transient_failure(result):
+                    break
+
+            if _is_transient_failure(result):
+                self.circuit_breaker.record_failure()
+                outcome_recorded = True
+                self._update_breaker_gauge()
+                stale = self._stale_response(stale_key) if stale_key else None
+                if stale is not None:
+                    PANEL_SHORT_CIRCUITED.inc("stale_cache")
+                    logging.warning(f"Panel API {method_upper} {endpoint} failed, serving cached response")
+                    return stale
+                return result
+
+            self.circuit_breaker.record_success()
+            outcome_recorded = True
+            self._update_breaker_gauge()
+        finally:
+            if not outcome_recorded:
+                # Cancelled (handler timeout, shutdown) or a BaseException escaped:
+                # free the half-open probe slot so the breaker does not stay shut
+                self.circuit_breaker.release_probe()
+        if stale_key and isinstance(result, dict) and not result.get("error"):
+            self._remember_response(stale_key, result)
+        return result
+
+    async def _send_request(self,
+                            method: str,
+                            endpoint: str,
+                            log_full_response: bool = False,
+                            **kwargs) -> Optional[Dict[str, Any]]:
         if not self.base_url:
             logging.error(
                 "Panel API URL (PANEL_API_URL) not configured in settings.")
@@ -92,32 +279,30 @@ class PanelApiService:
         aiohttp_session = await self._get_session()
         headers = await self._prepare_headers()
 
-        # Ensure API prefix for business endpoints
-        ep = endpoint.lstrip('/')
-        if not ep.startswith('api/') and not ep.startswith('system/'):
-            ep = f"api/{ep}"
-        url_for_request = f"{self.base_url.rstrip('/')}/{ep}"
+        family = _endpoint_family(endpoint)
+        url_for_request = self._build_url(endpoint, _API_V1)
 
+        params_for_log = ""
         current_params = kwargs.get("params")
-        url_with_params_for_log = url_for_request
         if current_params:
             try:
-                url_with_params_for_log += "?" + urlencode(current_params)
+                params_for_log = "?" + urlencode(current_params)
             except Exception:
                 pass
 
+        payload_for_log = ""
         json_payload_for_log = kwargs.get('json') if method.upper() in [
             "POST", "PATCH", "PUT"
         ] else None
-        log_prefix = f"Panel API Req: {method.upper()} {url_with_params_for_log}"
         if json_payload_for_log:
             try:
                 payload_str = json.dumps(json_payload_for_log)
-                log_prefix += f" | Payload: {payload_str[:300]}{'...' if len(payload_str) > 300 else ''}"
+                payload_for_log = f" | Payload: {payload_str[:300]}{'...' if len(payload_str) > 300 else ''}"
             except Exception:
-                log_prefix += f" | Payload: {str(json_payload_for_log)[:300]}..."
+                payload_for_log = f" | Payload: {str(json_payload_for_log)[:300]}..."
 
         async def _do_request(url: str) -> Dict[str, Any]:
+            log_prefix = f"Panel API Req: {method.upper()} {url}{params_for_log}{payload_for_log}"
             async with aiohttp_session.request(method.upper(), url, headers=headers, **kwargs) as response:
                 response_status = response.status
                 response_text = await response.text()
@@ -125,18 +310,10 @@ class PanelApiService:
                 log_suffix = f"| Status: {response_status}"
 
                 if log_full_response or not (200 <= response_status < 300):
-                    try:
-                        parsed_json_for_log = json.loads(response_text)
-                        pretty_response_text = json.dumps(parsed_json_for_log,
-                                                          indent=2,
-                                                          ensure_ascii=False)
-                        logging.info(
-                            f"{log_prefix} {log_suffix} | Full Response Body:\n{pretty_response_text}"
-                        )
-                    except json.JSONDecodeError:
-                        logging.info(
-                            f"{log_prefix} {log_suffix} | Full Response Text (not JSON):\n{response_text[:2000]}{'...' if len(response_text) > 2000 else ''}"
-                        )
+                    # Raw text, truncated: re-serializing large /users pages is expensive
+                    logging.info(
+                        f"{log_prefix} {log_suffix} | Response Body: {response_text[:2000]}{'...' if len(response_text) > 2000 else ''}"
+                    )
                 else:
                     logging.debug(
                         f"{log_prefix} {log_suffix} | OK. Response Body Preview: {response_text[:200]}{'...' if len(response_text) > 200 else ''}"
@@ -184,19 +361,28 @@ class PanelApiService:
                     }
 
         try:
-            # First attempt: as-is
+            known_version = self._known_api_version(family)
+            if known_version:
+                # Confirmed route: a 404 here means the resource itself is missing
+                url_for_request = self._build_url(endpoint, known_version)
+                return await _do_request(url_for_request)
+
+            first_version = self._default_api_version
+            other_version = _API_V2 if first_version == _API_V1 else _API_V1
+            url_for_request = self._build_url(endpoint, first_version)
             result = await _do_request(url_for_request)
-            # If 404/410/"not found" then try v2 prefix fallback (avoid duplicating api/)
-            if result and result.get("error") and result.get("status_code") in {404, 410}:
-                v2_ep = endpoint.lstrip('/')
-                if v2_ep.startswith('api/'):
-                    v2_ep = v2_ep[4:]
-                v2_url = f"{self.base_url.rstrip('/')}/api/v2/{v2_ep}"
-                logging.debug(
-                    f"Retrying Panel API request with v2 prefix: {v2_url}")
-                result_v2 = await _do_request(v2_url)
-                return result_v2
-            return result
+            if not self._is_route_not_found(result):
+                if self._confirms_route(result):
+                    self._remember_api_version(family, first_version)
+                return result
+
+            url_for_request = self._build_url(endpoint, other_version)
+            logging.debug(
+                f"Retrying Panel API request with {other_version} prefix: {url_for_request}")
+            result_other = await _do_request(url_for_request)
+            if self._confirms_route(result_other):
+                self._remember_api_version(family, other_version)
+            return result_other
         except aiohttp.ClientConnectorError as e:
             logging.error(
                 f"Panel API ClientConnectorError to {url_for_request}: {e}")
@@ -229,6 +415,70 @@ class PanelApiService:
                 "message": f"Unexpected error: {str(e)}"
             }
 
+    def _build_url(self, endpoint: str, api_version: str) -> str:
+        ep = endpoint.lstrip('/')
+        if api_version == _API_V2:
+            if ep.startswith('api/'):
+                ep = ep[4:]
+            if not ep.startswith('v2/'):
+                ep = f"v2/{ep}"
+            return f"{self.base_url.rstrip('/')}/api/{ep}"
+        # Ensure API prefix for business endpoints
+        if not ep.startswith('api/') and not ep.startswith('system/'):
+            ep = f"api/{ep}"
+        return f"{self.base_url.rstrip('/')}/{ep}"
+
+    @staticmethod
+    def _is_route_not_found(result: Optional[Dict[str, Any]]) -> bool:
+        return bool(result and result.get("error")
+                    and result.get("status_code") in _ROUTE_NOT_FOUND_STATUS_CODES)
+
+    @staticmethod
+    def _confirms_route(result: Optional[Dict[str, Any]]) -> bool:
+        """True when the answer came from the panel route itself: a 2xx or a non-404/410 4xx.
+
+        5xx (often a proxy while the panel restarts) says nothing about the
+        route, so it must not pin a version.
+        """
+        if not isinstance(result, dict):
+            return False
+        if not result.get("error"):
+            return True
+        status_code = result.get("status_code")
+        return (isinstance(status_code, int) and 400 <= status_code < 500
+                and status_code not in _ROUTE_NOT_FOUND_STATUS_CODES)
+
+    def _known_api_version(self, family: str) -> Optional[str]:
+        entry = self._api_version_by_family.get(family)
+        if not entry:
+            return None
+        api_version, confirmed_at = entry
+        if time.monotonic() - confirmed_at > self.settings.PANEL_API_VERSION_REPROBE_SECONDS:
+            # Re-probe occasionally so a panel upgrade is picked up without a restart
+            return None
+        return api_version
+
+    def _remember_api_version(self, family: str, api_version: str) -> None:
+        previous = self._api_version_by_family.get(family)
+        if previous is None or previous[0] != api_version:
+            logging.info(f"Panel API: using {api_version} routes for '{family}' endpoints.")
+        self._api_version_by_family[family] = (api_version, time.monotonic())
+
+    async def detect_api_version(self) -> Optional[str]:
+        """Probe the panel once and make the answering API version the default for all endpoints."""
+        if not self.base_url:
+            return None
+        self._api_version_by_family.pop("users", None)
+        await self._request("GET", "/users", params={"size": 1, "start": 0},
+                            cacheable=False)
+        detected = self._api_version_by_family.get("users")
+        if detected is None:
+            logging.warning("Panel API version could not be detected; trying v1 then v2 per endpoint.")
+            return None
+        self._default_api_version = detected[0]
+        logging.info(f"Panel API version detected: {detected[0]}")
+        return detected[0]
+
     async def get_all_panel_users(
             self,
             page_size: int = 100,
@@ -241,7 +491,8 @@ class PanelApiService:
                 "GET",
                 "/users",
                 params=params,
-                log_full_response=log_responses)
+                log_full_response=log_responses,
+                cacheable=False)
 
             if not response_data or response_data.get("error"):
                 logging.error(
@@ -259,16 +510,32 @@ class PanelApiService:
         logging.info(f"Fetched {len(all_users)} users from panel API.")
         return all_users
 
+    def invalidate_user(self, user_uuid: Optional[str]) -> None:
+        if user_uuid:
+            self.user_cache.pop(user_uuid)
+
     async def get_user_by_uuid(
             self,
             user_uuid: str,
-            log_response: bool = True) -> Optional[Dict[str, Any]]:
+            log_response: bool = True,
+            use_cache: bool = False) -> Optional[Dict[str, Any]]:
+        """Fetch a panel user. With use_cache=True a recent cached record may be returned;
+        only use it for display, not before writes that depend on current values."""
+        if use_cache:
+            cached = self.user_cache.get(user_uuid)
+            if cached is not None:
+                PANEL_USER_CACHE_REQUESTS.inc("hit")
+                return cached
+            PANEL_USER_CACHE_REQUESTS.inc("miss")
+
         endpoint = f"/users/{user_uuid}"
         full_response = await self._request("GET",
                                             endpoint,
                                             log_full_response=log_response)
         unwrapped = self._unwrap_response(full_response)
         if unwrapped is not None:
+            if isinstance(unwrapped, dict):
+                self.user_cache.set(user_uuid, unwrapped)
             return unwrapped
 
         return None
@@ -438,11 +705,16 @@ class PanelApiService:
             self,
             user_uuid: str,
             update_payload: Dict[str, Any],
-            log_response: bool = True) -> Optional[Dict[str, Any]]:
+            log_response: bool = True,
+            discard_queued: bool = True) -> Optional[Dict[str, Any]]:
+        if discard_queued:
+            # Queued (older) values for these fields must not be flushed after this PATCH
+            self.write_queue.discard(user_uuid, [k for k in update_payload if k != 'uuid'])
         if 'uuid' not in update_payload:
             update_payload['uuid'] = user_uuid
 
         full_response = await self._request("PATCH", "/users", json=update_payload, log_full_response=log_response)
+        self.invalidate_user(user_uuid)
         unwrapped = self._unwrap_response(full_response)
         if unwrapped is not None:
             logging.info(f"User {user_uuid} details updated on panel.")
@@ -453,6 +725,17 @@ class PanelApiService:
         )
         return None
 
+    def enqueue_user_update(self, user_uuid: str, update_payload: Dict[str, Any]) -> None:
+        """Queue a non-critical user update; merged with other pending updates and sent in the background."""
+        self.write_queue.enqueue(user_uuid, update_payload)
+
+    async def bulk_update_users(self, user_uuids: List[str],
+                                fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply the same fields to several users in one request (panels with /users/bulk/update)."""
+        return await self._request("POST", "/users/bulk/update",
+                                   json={"uuids": user_uuids, "fields": fields},
+                                   log_full_response=False)
+
     async def update_user_status_on_panel(self,
                                           user_uuid: str,
                                           enable: bool,
@@ -460,6 +743,7 @@ class PanelApiService:
         action = "enable" if enable else "disable"
         endpoint = f"/users/{user_uuid}/actions/{action}"
         response_data = await self._request("POST", endpoint, log_full_response=log_response)
+        self.invalidate_user(user_uuid)
 
         unwrapped = self._unwrap_response(response_data)
         if isinstance(unwrapped, dict):
@@ -6,14 +6,17 @@ from aiohttp import web
 from aiogram import Bot
 from aiogram.types import InlineKeyboardMarkup
 from sqlalchemy.orm import sessionmaker
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Optional, Tuple
 from config.settings import Settings
 from .panel_api_service import PanelApiService
+from .event_dedup import EventDeduplicator
+from .webhook_inbox import WebhookInbox
 from bot.middlewares.i18n import JsonI18n
 from bot.keyboards.inline.user_keyboards import get_subscribe_only_markup, get_autorenew_cancel_keyboard
 from db.dal import user_dal
 from bot.utils.date_utils import add_months
-import os
+from bot.utils.media_registry import get_media_registry
 
 EVENT_MAP = {
     "user.expires_in_72_hours": (3, "subscription_72h_notification"),
@@ -29,6 +32,10 @@ class PanelWebhookService:
         self.i18n = i18n
         self.async_session_factory = async_session_factory
         self.panel_service = panel_service
+        self.dedup = EventDeduplicator(
+            "panel", ttl_seconds=settings.PANEL_WEBHOOK_DEDUP_TTL_HOURS * 3600)
+        # Set by build_core_services
+        self.webhook_inbox: Optional[WebhookInbox] = None
 
     async def _send_message(
         self,
@@ -47,21 +54,13 @@ class PanelWebhookService:
                 image_ref = getattr(
                     self.settings, "SUBSCRIPTION_EXPIRED_IMAGE_PATH", None)
             if image_ref:
-                if os.path.exists(image_ref):
-                    from aiogram.types import FSInputFile
-                    await self.bot.send_photo(
-                        user_id,
-                        photo=FSInputFile(image_ref),
-                        caption=text,
-                        reply_markup=reply_markup,
-                    )
-                else:
-                    await self.bot.send_photo(
-                        user_id,
-                        photo=image_ref,
-                        caption=text,
-                        reply_markup=reply_markup,
-                    )
+                await get_media_registry().send_photo(
+                    self.bot,
+                    user_id,
+                    image_ref,
+                    caption=text,
+                    reply_markup=reply_markup,
+                )
             else:
                 await self.bot.send_message(
                     user_id, text, reply_markup=reply_markup
@@ -69,133 +68,103 @@ class PanelWebhookService:
         except Exception as e:
             logging.error(f"Failed to send notification to {user_id}: {e}")
 
-    async def _handle_expired_subscription(self, session, user_id: int, user_payload: dict,
-                                           lang: str, markup, first_name: str) -> bool:
-        """Handle expired subscription - auto-renew tribute users if no cancellation was received.
+    async def _auto_renew_tribute_subscriptions(self, session, user_id: int,
+                                                subscriptions: list) -> Optional[Tuple[int, datetime]]:
+        """Extend tribute subscriptions that expired without a cancellation.
 
-        Returns True if an auto-renewal was performed (and renewal message sent), False otherwise.
+        Changes are flushed but not committed; the caller commits together
+        with the event fingerprint. Returns (months, new_end_date) when a
+        renewal was applied, None otherwise.
         """
         from db.dal import subscription_dal, payment_dal
-        from datetime import datetime, timezone
-
-        try:
-            auto_renewed = False
-            # Check if user has tribute subscriptions that weren't cancelled
-            user_subs = await subscription_dal.get_active_subscriptions_for_user(session, user_id)
 
-            for sub in user_subs:
-                # Check if this subscription was marked as cancelled (from tribute cancellation webhook)
-                if sub.status_from_panel == 'CANCELLED':
-                    logging.info(
-                        f"Subscription {sub.subscription_id} for user {user_id} was cancelled, skipping auto-renewal")
-                    continue
-
-                # Check if this user has tribute payments
-                last_tribute_duration = await payment_dal.get_last_tribute_payment_duration(session, user_id)
-
-                if last_tribute_duration is not None:
-                    # This user has tribute payments, auto-renew for the same duration
+        candidates = [sub for sub in subscriptions if sub.status_from_panel != 'CANCELLED']
+        for sub in subscriptions:
+            if sub.status_from_panel == 'CANCELLED':
+                logging.info(
+                    f"Subscription {sub.subscription_id} for user {user_id} was cancelled, skipping auto-renewal")
+        if not candidates:
+            return None
+
+        last_tribute_duration = await payment_dal.get_last_tribute_payment_duration(session, user_id)
+        if last_tribute_duration is None:
+            return None
+        last_payment = await payment_dal.get_last_tribute_payment(session, user_id)
+
+        renewal: Optional[Tuple[int, datetime]] = None
+        for sub in candidates:
+            logging.info(
+                f"Auto-renewing tribute subscription for user {user_id} for {last_tribute_duration} months")
+
+            # Extend subscription by the last payment duration (calendar months)
+            new_end_date = add_months(datetime.now(timezone.utc), last_tribute_duration)
+
+            # Update local DB subscription
+            await subscription_dal.update_subscription(
+                session,
+                sub.subscription_id,
+                {
+                    'end_date': new_end_date,
+                    'status_from_panel': 'ACTIVE',
+                    'is_active': True
+                }
+            )
+            # Update panel expiry to ensure actual service access is extended
+            try:
+                panel_payload = {
+                    "uuid": sub.panel_user_uuid,
+                    "expireAt": new_end_date.isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+                    "status": "ACTIVE",
+                }
+                panel_update_resp = await self.panel_service.update_user_details_on_panel(
+                    sub.panel_user_uuid,
+                    panel_payload,
+                    log_response=True,
+                )
+                if panel_update_resp:
                     logging.info(
-                        f"Auto-renewing tribute subscription for user {user_id} for {last_tribute_duration} months")
-
-                    # Extend subscription by the last payment duration (calendar months)
-                    new_end_date = add_months(datetime.now(
-                        timezone.utc), last_tribute_duration)
-
-                    # Update local DB subscription
-                    await subscription_dal.update_subscription(
-                        session,
-                        sub.subscription_id,
-                        {
-                            'end_date': new_end_date,
-                            'status_from_panel': 'ACTIVE',
-                            'is_active': True
-                        }
+                        f"Panel expiry updated for user {user_id} (panel_uuid {sub.panel_user_uuid}) to {new_end_date}"
                     )
-                    # Update panel expiry to ensure actual service access is extended
-                    try:
-                        panel_payload = {
-                            "uuid": sub.panel_user_uuid,
-                            "expireAt": new_end_date.isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
-                            "status": "ACTIVE",
-                        }
-                        panel_update_resp = await self.panel_service.update_user_details_on_panel(
-                            sub.panel_user_uuid,
-                            panel_payload,
-                            log_response=True,
-                        )
-                        if panel_update_resp:
-                            logging.info(
-                                f"Panel expiry updated for user {user_id} (panel_uuid {sub.panel_user_uuid}) to {new_end_date}"
-                            )
-                    except Exception as e_panel:
-                        logging.error(
-                            f"Failed to update panel expiry for user {user_id} (panel_uuid {sub.panel_user_uuid}): {e_panel}")
-
-                    # Create a succeeded payment record in DB with the same amount/currency as last tribute payment
-                    try:
-                        last_payment = await payment_dal.get_last_tribute_payment(session, user_id)
-                        if last_payment and last_payment.amount and last_payment.currency:
-                            provider_payment_id = (
-                                f"tribute_auto_{user_id}_{sub.subscription_id}_"
-                                f"{new_end_date.strftime('%Y%m%d')}"
-                            )
-                            created_payment = await payment_dal.ensure_payment_with_provider_id(
-                                session,
-                                user_id=user_id,
-                                amount=float(last_payment.amount),
-                                currency=last_payment.currency,
-                                months=last_tribute_duration,
-                                description="Auto-renewal (panel webhook)",
-                                provider="tribute",
-                                provider_payment_id=provider_payment_id,
-                            )
-                            if created_payment:
-                                logging.info(
-                                    f"Auto-renew payment recorded (id={created_payment.payment_id}) for user {user_id} amount={created_payment.amount} {created_payment.currency} months={last_tribute_duration}"
-                                )
-                        else:
-                            logging.warning(
-                                f"Could not create auto-renew payment for user {user_id}: previous tribute payment not found or missing amount/currency")
-                    except Exception as e_pay:
-                        logging.error(
-                            f"Failed to create auto-renew payment record for user {user_id}: {e_pay}",
-                            exc_info=True,
-                        )
-
-                    # Send auto-renewal notification
-                    _ = lambda k, **kw: self.i18n.gettext(
-                        lang, k, **kw) if self.i18n else k
-                    auto_renewal_msg = _(
-                        "tribute_auto_renewal",
-                        default="🔄 <b>Подписка автоматически продлена</b>\n\n"
-                        "Ваша подписка Tribute была автоматически продлена на {months} мес.\n"
-                        "Новая дата окончания: {end_date}",
-                        user_name=first_name,
-                        months=last_tribute_duration,
-                        end_date=new_end_date.strftime('%Y-%m-%d')
+            except Exception as e_panel:
+                logging.error(
+                    f"Failed to update panel expiry for user {user_id} (panel_uuid {sub.panel_user_uuid}): {e_panel}")
+
+            # Create a succeeded payment record in DB with the same amount/currency as last tribute payment
+            if last_payment and last_payment.amount and last_payment.currency:
+                provider_payment_id = (
+                    f"tribute_auto_{user_id}_{sub.subscription_id}_"
+                    f"{new_end_date.strftime('%Y%m%d')}"
+                )
+                created_payment = await payment_dal.ensure_payment_with_provider_id(
+                    session,
+                    user_id=user_id,
+                    amount=float(last_payment.amount),
+                    currency=last_payment.currency,
+                    months=last_tribute_duration,
+                    description="Auto-renewal (panel webhook)",
+                    provider="tribute",
+                    provider_payment_id=provider_payment_id,
+                )
+                if created_payment:
+                    logging.info(
+                        f"Auto-renew payment recorded (id={created_payment.payment_id}) for user {user_id} amount={created_payment.amount} {created_payment.currency} months={last_tribute_duration}"
                     )
+            else:
+                logging.warning(
+                    f"Could not create auto-renew payment for user {user_id}: previous tribute payment not found or missing amount/currency")
 
-                    try:
-                        await self.bot.send_message(
-                            user_id,
-                            auto_renewal_msg,
-                            reply_markup=markup,
-                            parse_mode="HTML"
-                        )
-                        auto_renewed = True
-                    except Exception as e:
-                        logging.error(
-                            f"Failed to send auto-renewal notification to user {user_id}: {e}")
-
-            await session.commit()
-            return auto_renewed
+            renewal = (last_tribute_duration, new_end_date)
+        return renewal
 
-        except Exception as e:
-            logging.error(
-                f"Error handling expired subscription for user {user_id}: {e}")
-            await session.rollback()
-            return False
+    @staticmethod
+    def event_fingerprint(event_name: str, user_payload: dict) -> str:
+        # Redeliveries may differ in timestamps; the user, the event and the
+        # expiry it refers to identify it
+        return EventDeduplicator.fingerprint(
+            event_name,
+            user_payload.get("uuid") or user_payload.get("telegramId"),
+            user_payload.get("expireAt"),
+        )
 
     async def handle_event(self, event_name: str, user_payload: dict):
         telegram_id = user_payload.get("telegramId")
@@ -207,96 +176,101 @@ class PanelWebhookService:
         if not self.settings.SUBSCRIPTION_NOTIFICATIONS_ENABLED:
             return
 
-        async with self.async_session_factory() as session:
-            db_user = await user_dal.get_user_by_id(session, user_id)
-            lang = db_user.language_code if db_user and db_user.language_code else self.settings.DEFAULT_LANGUAGE
-            first_name = db_user.first_name or f"User {user_id}" if db_user else f"User {user_id}"
-
-        markup = get_subscribe_only_markup(lang, self.i18n)
-
-        if event_name in EVENT_MAP:
-            days_left, msg_key = EVENT_MAP[event_name]
-            if days_left == 1:
-                # Trigger auto-renew via SubscriptionService (wired in at factory)
-                try:
-                    subscription_service = getattr(
-                        self, "subscription_service", None)
-                    if subscription_service:
-                        async with self.async_session_factory() as session:
-                            from db.dal import subscription_dal
-                            sub = await subscription_dal.get_active_subscription_by_user_id(session, user_id)
-                            if sub and sub.auto_renew_enabled and sub.provider != 'tribute':
-                                try:
-                                    ok = await subscription_service.charge_subscription_renewal(session, sub)
-                                    # If initiation succeeded, suppress the 24h reminder by returning early
-                                    if ok:
-                                        await session.commit()
-                                        return
-                                    else:
-                                        await session.rollback()
-                                except Exception:
-                                    await session.rollback()
-                                    logging.exception(
-                                        "Auto-renew attempt (24h) failed")
-                except Exception:
-                    logging.exception(
-                        "Auto-renew trigger (24h) failed pre-check")
-            if days_left <= self.settings.SUBSCRIPTION_NOTIFY_DAYS_BEFORE:
-                # For 48h event, if auto-renew is enabled and not tribute, show special notice with cancel button
-                if days_left == 2:
-                    async with self.async_session_factory() as session:
-                        from db.dal import subscription_dal
-                        sub = await subscription_dal.get_active_subscription_by_user_id(session, user_id)
-                        logging.info(
-                            "48h webhook check: user_id=%s sub_found=%s auto_renew=%s provider=%s",
-                            user_id,
-                            bool(sub),
-                            getattr(sub, 'auto_renew_enabled',
-                                    None) if sub else None,
-                            getattr(sub, 'provider', None) if sub else None,
-                        )
-                        if sub and sub.auto_renew_enabled and sub.provider != 'tribute':
-                            cancel_kb = get_autorenew_cancel_keyboard(
-                                lang, self.i18n)
-                            await self._send_message(
-                                user_id,
-                                lang,
-                                "autorenew_48h_charge_tomorrow_notice",
-                                reply_markup=cancel_kb,
-                                user_name=first_name,
-                            )
-                            return
-                await self._send_message(
-                    user_id,
-                    lang,
-                    msg_key,
-                    reply_markup=markup,
-                    user_name=first_name,
-                    end_date=user_payload.get("expireAt", "")[:10],
-                )
-        elif event_name == "user.expired":
-            # Check if this is a tribute user that should be auto-renewed (regardless of notification settings)
-            auto_renewed = await self._handle_expired_subscription(session, user_id, user_payload, lang, markup, first_name)
+        fingerprint = self.event_fingerprint(event_name, user_payload)
+        if self.dedup.seen(fingerprint):
+            logging.info(f"Panel webhook {event_name} for user {user_id} already handled, skipping.")
+            return
 
-            # If auto-renewed via Tribute, suppress expiration notification. Otherwise, send it if enabled.
-            if not auto_renewed and self.settings.SUBSCRIPTION_NOTIFY_ON_EXPIRE:
-                await self._send_message(
-                    user_id,
-                    lang,
-                    "subscription_expired_notification",
-                    reply_markup=markup,
-                    user_name=first_name,
-                    end_date=user_payload.get("expireAt", "")[:10],
-                )
-        elif event_name == "user.expired_24_hours_ago" and self.settings.SUBSCRIPTION_NOTIFY_AFTER_EXPIRE:
-            await self._send_message(
-                user_id,
-                lang,
-                "subscription_expired_yesterday_notification",
-                reply_markup=markup,
-                user_name=first_name,
-                end_date=user_payload.get("expireAt", "")[:10],
-            )
+        end_date = user_payload.get("expireAt", "")[:10]
+        # At most one message per event, sent after the commit
+        outgoing: Optional[Tuple[str, Optional[InlineKeyboardMarkup], dict]] = None
+
+        async with self.async_session_factory() as session:
+            try:
+                if not await self.dedup.claim(session, fingerprint):
+                    logging.info(f"Panel webhook {event_name} for user {user_id} already handled, skipping.")
+                    return
+
+                from db.dal import subscription_dal
+                db_user = await user_dal.get_user_by_id(session, user_id)
+                subscriptions = await subscription_dal.get_active_subscriptions_for_user(session, user_id)
+                now = datetime.now(timezone.utc)
+                current_sub = next(
+                    (sub for sub in subscriptions if sub.end_date and sub.end_date > now), None)
+
+                lang = db_user.language_code if db_user and db_user.language_code else self.settings.DEFAULT_LANGUAGE
+                first_name = db_user.first_name or f"User {user_id}" if db_user else f"User {user_id}"
+                markup = get_subscribe_only_markup(lang, self.i18n)
+                auto_renew_sub = (current_sub if current_sub and current_sub.auto_renew_enabled
+                                  and current_sub.provider != 'tribute' else None)
+
+                if event_name in EVENT_MAP:
+                    days_left, msg_key = EVENT_MAP[event_name]
+                    subscription_service = getattr(self, "subscription_service", None)
+                    renewal_scheduler = getattr(self, "renewal_scheduler", None)
+                    renewal_started = False
+                    if days_left == 1 and auto_renew_sub and renewal_scheduler and renewal_scheduler.enabled:
+                        # The renewal scheduler charges due subscriptions on its own and
+                        # reports a failed charge; without a saved card it can't charge
+                        from db.dal.user_billing_dal import get_user_default_payment_method
+                        renewal_started = await get_user_default_payment_method(session, user_id) is not None
+                    elif days_left == 1 and auto_renew_sub and subscription_service:
+                        # Auto-renew via SubscriptionService (wired in at factory)
+                        try:
+                            renewal_started = await subscription_service.charge_subscription_renewal(
+                                session, auto_renew_sub)
+                        except Exception:
+                            logging.exception("Auto-renew attempt (24h) failed")
+                    # If renewal was initiated, the 24h reminder is suppressed
+                    already_notified = False
+                    if not renewal_started and days_left <= self.settings.SUBSCRIPTION_NOTIFY_DAYS_BEFORE \
+                            and current_sub:
+                        # Claim the bucket; the local expiry notifier may have sent it already
+                        already_notified = not await subscription_dal.mark_subscriptions_notified(
+                            session, [current_sub.subscription_id], now,
+                            notified_before_hours=days_left * 24)
+                        if already_notified:
+                            logging.info(
+                                f"Panel webhook {event_name}: user {user_id} already reminded in this bucket, skipping.")
+                    if not renewal_started and not already_notified \
+                            and days_left <= self.settings.SUBSCRIPTION_NOTIFY_DAYS_BEFORE:
+                        if days_left == 2 and auto_renew_sub:
+                            # Auto-renew is on: warn about tomorrow's charge and offer to cancel it
+                            outgoing = ("autorenew_48h_charge_tomorrow_notice",
+                                        get_autorenew_cancel_keyboard(lang, self.i18n),
+                                        {"user_name": first_name})
+                        else:
+                            outgoing = (msg_key, markup,
+                                        {"user_name": first_name, "end_date": end_date})
+                elif event_name == "user.expired":
+                    # Tribute users that didn't cancel are renewed (regardless of notification settings)
+                    renewal = await self._auto_renew_tribute_subscriptions(session, user_id, subscriptions)
+                    if renewal:
+                        months, new_end_date = renewal
+                        outgoing = ("tribute_auto_renewal", markup, {
+                            "default": "🔄 <b>Подписка автоматически продлена</b>\n\n"
+                                       "Ваша подписка Tribute была автоматически продлена на {months} мес.\n"
+                                       "Новая дата окончания: {end_date}",
+                            "user_name": first_name,
+                            "months": months,
+                            "end_date": new_end_date.strftime('%Y-%m-%d'),
+                        })
+                    elif self.settings.SUBSCRIPTION_NOTIFY_ON_EXPIRE:
+                        outgoing = ("subscription_expired_notification", markup,
+                                    {"user_name": first_name, "end_date": end_date})
+                elif event_name == "user.expired_24_hours_ago" and self.settings.SUBSCRIPTION_NOTIFY_AFTER_EXPIRE:
+                    outgoing = ("subscription_expired_yesterday_notification", markup,
+                                {"user_name": first_name, "end_date": end_date})
+
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+        self.dedup.remember(fingerprint)
+        if outgoing:
+            msg_key, reply_markup, kwargs = outgoing
+            await self._send_message(user_id, lang, msg_key, reply_markup=reply_markup, **kwargs)
 
     async def handle_webhook(self, raw_body: bytes, signature_header: Optional[str]) -> web.Response:
         if self.settings.PANEL_WEBHOOK_SECRET:
@@ -311,18 +285,18 @@ class PanelWebhookService:
                 return web.Response(status=403, text="invalid_signature")
 
         try:
-            payload = json.loads(raw_body.decode())
+            raw_text = raw_body.decode()
+            event_name, user_data = self._parse_event(raw_text)
         except Exception:
             return web.Response(status=400, text="bad_request")
 
-        event_name = payload.get("name") or payload.get("event")
-        user_data = payload.get("payload") or payload.get("data", {})
-        if isinstance(user_data, dict) and "user" in user_data:
-            user_data = user_data.get("user") or user_data
-
         telegram_id = user_data.get("telegramId") if isinstance(
             user_data, dict) else None
 
+        # Any user event means the panel record changed; drop the cached copy
+        if isinstance(user_data, dict):
+            self.panel_service.invalidate_user(user_data.get("uuid"))
+
         if not event_name:
             return web.Response(status=200, text="ok_no_event")
 
@@ -332,9 +306,30 @@ class PanelWebhookService:
             telegram_id if telegram_id is not None else "N/A",
         )
 
-        await self.handle_event(event_name, user_data)
+        # The panel sends no delivery id; identical bodies are the same event
+        event_id = hashlib.sha256(raw_body).hexdigest()
+        try:
+            await self.webhook_inbox.accept("panel", event_id, raw_text)
+        except Exception as e:
+            logging.error(f"Panel webhook: failed to store event {event_name}: {e}", exc_info=True)
+            return web.Response(status=500, text="inbox_unavailable")
         return web.Response(status=200, text="ok")
 
+    @staticmethod
+    def _parse_event(raw_text: str):
+        payload = json.loads(raw_text)
+        event_name = payload.get("name") or payload.get("event")
+        user_data = payload.get("payload") or payload.get("data", {})
+        if isinstance(user_data, dict) and "user" in user_data:
+            user_data = user_data.get("user") or user_data
+        return event_name, user_data
+
+    async def process_webhook_event(self, raw_payload: str) -> None:
+        """Webhook inbox handler: apply a stored panel event."""
+        event_name, user_data = self._parse_event(raw_payload)
+        if event_name and isinstance(user_data, dict):
+            await self.handle_event(event_name, user_data)
+
 
 async def panel_webhook_route(request: web.Request):
     service: PanelWebhookService = request.app["panel_webhook_service"]
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import logging
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from bot.utils.metrics import PANEL_WRITE_QUEUE_DEPTH, PANEL_WRITE_QUEUE_FLUSHED
+
+BULK_PROBE_MAX_TRANSIENT_FAILURES = 3
+
+if TYPE_CHECKING:
+    from .panel_api_service import PanelApiService
+
+
+class PanelWriteQueue:
+    """Write-behind queue for non-critical panel user updates.
+
+    `enqueue()` returns immediately. Pending updates for the same panel UUID
+    are merged (later values win), so several changes within one flush window
+    become a single PATCH. Flushes run with bounded concurrency; users that
+    receive identical payloads go through the panel bulk update endpoint when
+    it is available.
+
+    Use it only for writes nobody waits on (descriptions, re-pushing data the
+    panel is missing). Payment and bonus activations keep calling
+    `update_user_details_on_panel` directly so failures reach the caller;
+    such a direct PATCH calls `discard()` first, so queued values for the
+    same fields (e.g. an older ``expireAt``) are never sent after it.
+    """
+
+    def __init__(self, panel_service: "PanelApiService",
+                 flush_interval: float = 1.0,
+                 concurrency: int = 5,
+                 max_attempts: int = 3):
+        self.panel_service = panel_service
+        self.flush_interval = flush_interval
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._attempts: Dict[str, int] = {}
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        self._closing = False
+        # None = not probed yet; decided by the first 2xx/4xx answer, or
+        # given up after BULK_PROBE_MAX_TRANSIENT_FAILURES 5xx/network errors
+        self._bulk_supported: Optional[bool] = None
+        self._bulk_transient_failures = 0
+        # Batch being flushed, so `discard()` also reaches updates not sent yet
+        self._in_flight: Dict[str, Dict[str, Any]] = {}
+        PANEL_WRITE_QUEUE_DEPTH.set_callback(lambda: {(): len(self._pending)})
+
+    def enqueue(self, user_uuid: str, payload: Dict[str, Any]) -> None:
+        if not user_uuid or not payload:
+            return
+        fields = {k: v for k, v in payload.items() if k != "uuid"}
+        self._pending.setdefault(user_uuid, {}).update(fields)
+        self._ensure_worker()
+        self._wakeup.set()
+
+    def discard(self, user_uuid: str, field_names) -> None:
+        """Drop queued values for fields a direct update is about to overwrite."""
+        for queued in (self._pending.get(user_uuid), self._in_flight.get(user_uuid)):
+            if queued is None:
+                continue
+            for name in field_names:
+                queued.pop(name, None)
+        if user_uuid in self._pending and not self._pending[user_uuid]:
+            del self._pending[user_uuid]
+
+    def _ensure_worker(self) -> None:
+        if self._closing:
+            return
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run(), name="PanelWriteQueue")
+
+    async def _run(self) -> None:
+        while not self._closing:
+            await self._wakeup.wait()
+            # Collect more updates for the same users before sending
+            await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"Panel write queue flush failed: {e}", exc_info=True)
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        self._in_flight = batch
+        try:
+            await self._flush_batch(batch)
+        finally:
+            self._in_flight = {}
+        if self._pending:
+            self._ensure_worker()
+            self._wakeup.set()
+
+    async def _flush_batch(self, batch: Dict[str, Dict[str, Any]]) -> None:
+        groups: Dict[str, List[str]] = {}
+        payloads: Dict[str, Dict[str, Any]] = {}
+        for user_uuid, fields in batch.items():
+            group_key = json.dumps(fields, sort_keys=True, default=str)
+            groups.setdefault(group_key, []).append(user_uuid)
+            payloads[group_key] = dict(fields)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        failed: List[Tuple[str, Dict[str, Any]]] = []
+
+        async def _send_single(user_uuid: str) -> None:
+            async with semaphore:
+                # Read the live entry: a direct update may have discarded fields meanwhile
+                fields = dict(batch[user_uuid])
+                if not fields:
+                    return
+                result = await self.panel_service.update_user_details_on_panel(
+                    user_uuid, dict(fields), log_response=False, discard_queued=False)
+            if result is None:
+                failed.append((user_uuid, fields))
+            else:
+                PANEL_WRITE_QUEUE_FLUSHED.inc("single")
+
+        tasks = []
+        for group_key, user_uuids in groups.items():
+            fields = payloads[group_key]
+            if len(user_uuids) > 1 and self._bulk_supported is not False:
+                async with semaphore:
+                    # Users whose entry a direct update changed meanwhile go one by one
+                    unchanged = [u for u in user_uuids if batch[u] == fields]
+                    bulk_ok = len(unchanged) > 1 and await self._send_bulk(unchanged, fields)
+                if bulk_ok:
+                    PANEL_WRITE_QUEUE_FLUSHED.inc("bulk", amount=len(unchanged))
+                    user_uuids = [u for u in user_uuids if u not in unchanged]
+            tasks.extend(_send_single(user_uuid) for user_uuid in user_uuids)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+        for user_uuid, fields in failed:
+            attempts = self._attempts.get(user_uuid, 0) + 1
+            if attempts >= self.max_attempts or self._closing:
+                self._attempts.pop(user_uuid, None)
+                PANEL_WRITE_QUEUE_FLUSHED.inc("dropped")
+                logging.error(
+                    f"Panel write queue: giving up on update for {user_uuid} after {attempts} attempt(s): {list(fields)}")
+                continue
+            # Fields a direct update discarded during the flush are not retried
+            merged = {k: v for k, v in fields.items() if k in batch[user_uuid]}
+            # Newer updates queued meanwhile take precedence over the failed ones
+            merged.update(self._pending.get(user_uuid, {}))
+            if not merged:
+                self._attempts.pop(user_uuid, None)
+                continue
+            self._attempts[user_uuid] = attempts
+            self._pending[user_uuid] = merged
+        for user_uuid in batch:
+            if user_uuid not in self._pending:
+                self._attempts.pop(user_uuid, None)
+
+    async def _send_bulk(self, user_uuids: List[str], fields: Dict[str, Any]) -> bool:
+        response = await self.panel_service.bulk_update_users(user_uuids, fields)
+        status_code = response.get("status_code") if isinstance(response, dict) else None
+        if response is None or (response.get("error") and not (
+                isinstance(status_code, int) and 400 <= status_code < 500)):
+            # 5xx / network error: no answer about the endpoint yet
+            self._bulk_transient_failures += 1
+            if self._bulk_transient_failures >= BULK_PROBE_MAX_TRANSIENT_FAILURES:
+                logging.info("Panel write queue: bulk update keeps failing, using per-user updates.")
+                self._bulk_supported = False
+            return False
+        if response.get("error"):
+            logging.info(
+                f"Panel write queue: bulk update endpoint rejected the request ({status_code}), using per-user updates.")
+            self._bulk_supported = False
+            return False
+        self._bulk_supported = True
+        for user_uuid in user_uuids:
+            self.panel_service.invalidate_user(user_uuid)
+        return True
+
+    async def close(self) -> None:
+        """Flush what is pending and stop the worker."""
+        self._closing = True
+        if self._worker is not None and not self._worker.done():
+            # Let the worker finish its current window instead of cancelling mid-flush
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._worker, timeout=self.flush_interval + 30)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                logging.warning("Panel write queue worker did not stop in time.")
+            except Exception as e:
+                logging.error(f"Panel write queue worker failed on shutdown: {e}")
+        try:
+            await self.flush()
+        except Exception as e:
+            logging.error(f"Panel write queue final flush failed: {e}", exc_info=True)
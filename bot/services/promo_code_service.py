@@ -12,6 +12,7 @@ from db.models import PromoCode, User
 from .subscription_service import SubscriptionService
 from bot.middlewares.i18n import JsonI18n
 from .notification_service import NotificationService
+from .promo_lookup import get_promo_lookup_cache
 
 
 class PromoCodeService:
@@ -24,6 +25,19 @@ class PromoCodeService:
         self.bot = bot
         self.i18n = i18n
 
+    async def _release_claim(self, session: AsyncSession, promo_code_id: int,
+                             user_id: int) -> None:
+        """Compensate a committed claim after the subscription extension failed."""
+        try:
+            await session.rollback()
+            await promo_code_dal.release_promo_activation(session, promo_code_id, user_id)
+            await session.commit()
+        except Exception as e:
+            logging.error(
+                f"Failed to release promo code {promo_code_id} claim of user {user_id}: {e}",
+                exc_info=True)
+            await session.rollback()
+
     async def apply_promo_code(
         self,
         session: AsyncSession,
@@ -34,52 +48,67 @@ class PromoCodeService:
         _ = lambda k, **kw: self.i18n.gettext(user_lang, k, **kw)
         code_input_upper = code_input.strip().upper()
 
-        promo_data = await promo_code_dal.get_active_promo_code_by_code_str(
-            session, code_input_upper)
+        lookup_cache = get_promo_lookup_cache()
+        if lookup_cache:
+            if lookup_cache.throttle.is_blocked(user_id):
+                logging.warning(f"Promo code attempts throttled for user {user_id}")
+                return False, _("promo_code_too_many_attempts")
+            # Unknown, inactive or exhausted codes are rejected from memory
+            snapshot = await lookup_cache.lookup(session, code_input_upper)
+            if snapshot is None or not snapshot.is_usable():
+                lookup_cache.throttle.record_failure(user_id)
+                return False, _("promo_code_not_found", code=code_input_upper)
 
-        if not promo_data:
-            return False, _("promo_code_not_found", code=code_input_upper)
+        # Claims the activation and bumps the counter in one statement
+        status, promo_code_id, bonus_days = await promo_code_dal.activate_promo_code(
+            session, code_input_upper, user_id)
 
-        existing_activation = await promo_code_dal.get_user_activation_for_promo(
-            session, promo_data.promo_code_id, user_id)
-        if existing_activation:
+        if status == "unavailable":
+            if lookup_cache:
+                lookup_cache.mark_unusable(code_input_upper)
+                lookup_cache.throttle.record_failure(user_id)
+            return False, _("promo_code_not_found", code=code_input_upper)
+        if status == "already_used":
+            # The caller rolls back, which also undoes this statement's increment
             return False, _("promo_code_already_used_by_user",
                             code=code_input_upper)
 
-        bonus_days = promo_data.bonus_days
-
-        new_end_date = await self.subscription_service.extend_active_subscription_days(
-            session=session,
-            user_id=user_id,
-            bonus_days=bonus_days,
-            reason=f"promo code {code_input_upper}")
-
-        if new_end_date:
-            activation_recorded = await promo_code_dal.record_promo_activation(
-                session, promo_data.promo_code_id, user_id, payment_id=None)
-            promo_incremented = await promo_code_dal.increment_promo_code_usage(
-                session, promo_data.promo_code_id)
-
-            if activation_recorded and promo_incremented:
-                # Send notification about promo activation
-                try:
-                    notification_service = NotificationService(self.bot, self.settings, self.i18n)
-                    user = await user_dal.get_user_by_id(session, user_id)
-                    await notification_service.notify_promo_activation(
-                        user_id=user_id,
-                        promo_code=code_input_upper,
-                        bonus_days=bonus_days,
-                        username=user.username if user else None
-                    )
-                except Exception as e:
-                    logging.error(f"Failed to send promo activation notification: {e}")
-                
-                return True, new_end_date
-            else:
-
-                logging.error(
-                    f"Failed to record activation or increment usage for promo {promo_data.code} by user {user_id}"
-                )
-                return False, _("error_applying_promo_bonus")
-        else:
+        # Commit the claim now: the UPDATE row-locks the promo code, and holding
+        # it across the panel calls below would serialize every activation of
+        # a popular code behind one panel round trip
+        await session.commit()
+
+        try:
+            new_end_date = await self.subscription_service.extend_active_subscription_days(
+                session=session,
+                user_id=user_id,
+                bonus_days=bonus_days,
+                reason=f"promo code {code_input_upper}")
+        except Exception:
+            await self._release_claim(session, promo_code_id, user_id)
+            raise
+
+        if not new_end_date:
+            logging.error(
+                f"Failed to extend subscription for promo {code_input_upper} (ID: {promo_code_id}) by user {user_id}"
+            )
+            await self._release_claim(session, promo_code_id, user_id)
             return False, _("error_applying_promo_bonus")
+
+        if lookup_cache:
+            lookup_cache.record_activation(code_input_upper)
+
+        # Send notification about promo activation
+        try:
+            notification_service = NotificationService(self.bot, self.settings, self.i18n)
+            user = await user_dal.get_user_by_id(session, user_id)
+            await notification_service.notify_promo_activation(
+                user_id=user_id,
+                promo_code=code_input_upper,
+                bonus_days=bonus_days,
+                username=user.username if user else None
+            )
+        except Exception as e:
+            logging.error(f"Failed to send promo activation notification: {e}")
+
+        return True, new_end_date
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Deque, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from config.settings import Settings
+from db.dal import promo_code_dal
+from db.models import PromoCode
+from bot.utils.bloom_filter import BloomFilter
+from bot.utils.ttl_cache import TTLCache
+
+# Bloom filter is sized for this many codes beyond the current count
+BLOOM_HEADROOM = 10000
+BLOOM_ERROR_RATE = 0.001
+
+
+@dataclass
+class PromoSnapshot:
+    """Detached copy of the promo fields needed to pre-check an activation."""
+    promo_code_id: int
+    code: str
+    bonus_days: int
+    is_active: bool
+    max_activations: int
+    current_activations: int
+    valid_until: Optional[datetime]
+
+    @classmethod
+    def from_model(cls, promo: PromoCode) -> "PromoSnapshot":
+        return cls(promo.promo_code_id, promo.code, promo.bonus_days, bool(promo.is_active),
+                   promo.max_activations, promo.current_activations or 0, promo.valid_until)
+
+    def is_usable(self) -> bool:
+        return (self.is_active
+                and self.current_activations < self.max_activations
+                and (self.valid_until is None or self.valid_until > datetime.now(timezone.utc)))
+
+
+class PromoAttemptThrottle:
+    """In-memory sliding window of failed promo attempts per user."""
+
+    def __init__(self, max_attempts: int, window_seconds: float, max_users: int = 50000):
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+        self.max_users = max_users
+        self._failures: "OrderedDict[int, Deque[float]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_attempts > 0 and self.window_seconds > 0
+
+    def _recent(self, user_id: int) -> Optional[Deque[float]]:
+        failures = self._failures.get(user_id)
+        if failures is None:
+            return None
+        cutoff = time.monotonic() - self.window_seconds
+        while failures and failures[0] < cutoff:
+            failures.popleft()
+        if not failures:
+            del self._failures[user_id]
+            return None
+        return failures
+
+    def is_blocked(self, user_id: int) -> bool:
+        if not self.enabled:
+            return False
+        failures = self._recent(user_id)
+        return failures is not None and len(failures) >= self.max_attempts
+
+    def record_failure(self, user_id: int) -> None:
+        if not self.enabled:
+            return
+        failures = self._recent(user_id)
+        if failures is None:
+            failures = self._failures[user_id] = deque(maxlen=self.max_attempts)
+        failures.append(time.monotonic())
+        self._failures.move_to_end(user_id)
+        while len(self._failures) > self.max_users:
+            self._failures.popitem(last=False)
+
+
+class PromoLookupCache:
+    """Keeps promo code lookups for user input off PostgreSQL where possible.
+
+    - A Bloom filter of all existing codes rejects random guesses outright.
+      It is rebuilt every PROMO_BLOOM_REBUILD_SECONDS so codes created by
+      other bot instances show up; until the first build it is bypassed.
+    - Negative entries remember codes the database reported as unusable.
+    - Positive entries hold a short-lived snapshot of each valid code.
+
+    Admin edits, toggles and deletes call `invalidate()`; creations call
+    `add_codes()`.
+    """
+
+    def __init__(self, settings: Settings, async_session_factory: sessionmaker):
+        self.settings = settings
+        self.async_session_factory = async_session_factory
+        self.positive: TTLCache[PromoSnapshot] = TTLCache(
+            settings.PROMO_CACHE_SIZE, settings.PROMO_CACHE_TTL_SECONDS)
+        self.negative: TTLCache[bool] = TTLCache(
+            settings.PROMO_CACHE_SIZE, settings.PROMO_NEGATIVE_CACHE_TTL_SECONDS)
+        self.throttle = PromoAttemptThrottle(
+            settings.PROMO_MAX_FAILED_ATTEMPTS, settings.PROMO_FAILED_ATTEMPTS_WINDOW_SECONDS)
+        self._bloom: Optional[BloomFilter] = None
+        # Codes created while a rebuild is reading the table
+        self._added_during_rebuild: Optional[list] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._bloom_loop(), name="PromoBloomRebuild")
+
+    async def _bloom_loop(self) -> None:
+        while True:
+            try:
+                await self.rebuild_bloom()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Promo code Bloom filter rebuild failed: {e}", exc_info=True)
+            if self.settings.PROMO_BLOOM_REBUILD_SECONDS <= 0:
+                return
+            await asyncio.sleep(self.settings.PROMO_BLOOM_REBUILD_SECONDS)
+
+    async def rebuild_bloom(self) -> None:
+        self._added_during_rebuild = []
+        try:
+            async with self.async_session_factory() as session:
+                total = await promo_code_dal.get_promo_codes_count(session)
+                bloom = BloomFilter(total + BLOOM_HEADROOM, BLOOM_ERROR_RATE)
+                async for code in promo_code_dal.iter_all_promo_codes(session):
+                    bloom.add(code.upper())
+            bloom.update(self._added_during_rebuild)
+            self._bloom = bloom
+        finally:
+            self._added_during_rebuild = None
+        logging.info(f"Promo code Bloom filter built with {bloom.count} code(s).")
+
+    def is_known_missing(self, code: str) -> bool:
+        """True when the code surely cannot be activated, without a DB query."""
+        if self._bloom is not None and not self._bloom.might_contain(code):
+            return True
+        return self.negative.get(code) is not None
+
+    async def lookup(self, session: AsyncSession, code: str) -> Optional[PromoSnapshot]:
+        """Snapshot of a code (any status), or None if it does not exist."""
+        if self.is_known_missing(code):
+            return None
+        snapshot = self.positive.get(code)
+        if snapshot is not None:
+            return snapshot
+        promo = await promo_code_dal.get_promo_code_by_code(session, code)
+        if promo is None:
+            self.negative.set(code, True)
+            return None
+        snapshot = PromoSnapshot.from_model(promo)
+        if snapshot.is_usable():
+            self.positive.set(code, snapshot)
+        else:
+            self.negative.set(code, True)
+        return snapshot
+
+    def record_activation(self, code: str) -> None:
+        snapshot = self.positive.get(code)
+        if snapshot is not None:
+            snapshot.current_activations += 1
+            if not snapshot.is_usable():
+                self.mark_unusable(code)
+
+    def mark_unusable(self, code: str) -> None:
+        self.positive.pop(code)
+        self.negative.set(code, True)
+
+    def invalidate(self, code: str) -> None:
+        code = code.upper()
+        self.positive.pop(code)
+        self.negative.pop(code)
+
+    def add_codes(self, *codes: str) -> None:
+        for code in codes:
+            code = code.upper()
+            self.negative.pop(code)
+            if self._bloom is not None:
+                self._bloom.add(code)
+            if self._added_during_rebuild is not None:
+                self._added_during_rebuild.append(code)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_promo_lookup_cache: Optional[PromoLookupCache] = None
+
+
+def init_promo_lookup_cache(settings: Settings,
+                            async_session_factory: sessionmaker) -> PromoLookupCache:
+    global _promo_lookup_cache
+    _promo_lookup_cache = PromoLookupCache(settings, async_session_factory)
+    return _promo_lookup_cache
+
+
+def get_promo_lookup_cache() -> Optional[PromoLookupCache]:
+    return _promo_lookup_cache
+
+
+def invalidate_cached_promo(code: str) -> None:
+    """Drop cached lookups of a code after an admin changed or deleted it."""
+    if _promo_lookup_cache:
+        _promo_lookup_cache.invalidate(code)
+
+
+def register_new_promo_codes(*codes: str) -> None:
+    if _promo_lookup_cache:
+        _promo_lookup_cache.add_codes(*codes)
@@ -1,13 +1,14 @@
 import logging
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
 from typing import Optional, Dict, Any
 from aiogram import Bot
 from datetime import datetime, timezone, timedelta
 
 from config.settings import Settings
+from config.runtime import get_runtime_config
 from db.dal import user_dal
 from db.dal import payment_dal
+from db.dal import referral_dal
 from db.models import User
 from db.dal import subscription_dal
 from bot.middlewares.i18n import JsonI18n
@@ -93,9 +94,10 @@ class ReferralService:
                 and inviter_user_model.first_name else self.i18n.gettext(
                     default_lang_for_placeholder, "friend_placeholder"))
 
-            inviter_bonus_days = self.settings.referral_bonus_inviter.get(
+            runtime_config = get_runtime_config()
+            inviter_bonus_days = runtime_config.referral_bonus_inviter.get(
                 purchased_subscription_months)
-            referee_bonus_days = self.settings.referral_bonus_referee.get(
+            referee_bonus_days = runtime_config.referral_bonus_referee.get(
                 purchased_subscription_months)
 
             if inviter_bonus_days and inviter_bonus_days > 0:
@@ -176,7 +178,7 @@ class ReferralService:
                                     "status_from_panel":
                                     "ACTIVE_BONUS",
                                     "traffic_limit_bytes":
-                                    self.settings.user_traffic_limit_bytes,
+                                    get_runtime_config().user_traffic_limit_bytes,
                                 }
                                 try:
                                     await subscription_dal.deactivate_other_active_subscriptions(
@@ -221,6 +223,10 @@ class ReferralService:
                                         f"Failed to create new bonus subscription for inviter {inviter_user_id}: {e_create_bonus_sub}",
                                         exc_info=True)
 
+            if inviter_bonus_successfully_applied:
+                await referral_dal.bump_referral_counters(
+                    session, inviter_user_id, bonus_days=inviter_bonus_days)
+
             if referee_bonus_days and referee_bonus_days > 0:
 
                 new_end_date_referee = await self.subscription_service.extend_active_subscription_days(
@@ -260,37 +266,14 @@ class ReferralService:
         return f"https://t.me/{bot_username}?start=ref_{inviter_user_id}"
 
     async def get_referral_stats(self, session: AsyncSession, user_id: int) -> dict:
-        """Get referral statistics for a user"""
-        from db.dal import user_dal, payment_dal
-        
+        """Get referral statistics for a user from the per-inviter counters"""
         try:
-            # Count total invited users (referrals)
-            invited_count_result = await session.execute(
-                text("SELECT COUNT(*) FROM users WHERE referred_by_id = :user_id"),
-                {"user_id": user_id}
-            )
-            invited_count = invited_count_result.scalar() or 0
-            
-            # Count users who made successful payments (purchased subscription)
-            purchased_count_result = await session.execute(
-                text("""
-                    SELECT COUNT(DISTINCT u.user_id) 
-                    FROM users u 
-                    JOIN payments p ON u.user_id = p.user_id 
-                    WHERE u.referred_by_id = :user_id 
-                    AND p.status = 'succeeded'
-                """),
-                {"user_id": user_id}
-            )
-            purchased_count = purchased_count_result.scalar() or 0
-            
-            return {
-                "invited_count": invited_count,
-                "purchased_count": purchased_count
-            }
+            counters = await referral_dal.get_referral_counters(session, user_id)
         except Exception as e:
             logging.error(f"Error getting referral stats for user {user_id}: {e}")
-            return {
-                "invited_count": 0,
-                "purchased_count": 0
-            }
+            counters = dict(referral_dal.EMPTY_COUNTERS)
+        return {
+            "invited_count": counters["invited"],
+            "purchased_count": counters["purchased"],
+            "bonus_days_earned": counters["bonus_days_earned"],
+        }
@@ -0,0 +1,291 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from config.settings import Settings
+from bot.middlewares.i18n import JsonI18n
+from bot.keyboards.inline.user_keyboards import get_subscribe_only_markup
+from bot.services.notification_service import NotificationService
+from bot.services.subscription_service import SubscriptionService
+from bot.utils.bounded_executor import BoundedExecutor
+from bot.utils.message_queue import get_queue_manager
+from db.dal import renewal_attempt_dal, user_dal
+from db.dal.renewal_attempt_dal import (
+    STATUS_DECLINED,
+    STATUS_FAILED,
+    STATUS_INITIATED,
+    STATUS_SUCCEEDED,
+)
+
+# Charges without a final status after this long are checked with YooKassa
+UNRESOLVED_CHECK_AFTER = timedelta(minutes=15)
+# YooKassa keeps an idempotence key for 24 hours; after that a replay could charge again
+IDEMPOTENCE_KEY_TTL = timedelta(hours=24)
+# create_renewal_payment outcomes where nothing was charged or attempted
+NOT_ATTEMPTED_OUTCOMES = ("skipped", "no_payment_method")
+
+
+def _attempt_status(outcome: str, response: Optional[dict]) -> Optional[str]:
+    """Attempt status for a create_renewal_payment outcome; None while it is unknown."""
+    if outcome == "initiated":
+        return STATUS_SUCCEEDED if response.get("status") == "succeeded" else STATUS_INITIATED
+    if outcome == "declined":
+        return STATUS_DECLINED
+    if outcome == "unknown":
+        return None
+    return STATUS_FAILED
+
+
+class RenewalScheduler:
+    """Periodically charges auto-renew subscriptions that are about to end.
+
+    Each run locks due subscriptions of users with a saved card with
+    ``FOR UPDATE SKIP LOCKED`` (so several bot instances never charge the
+    same one), records an attempt row per charge and commits before calling
+    YooKassa. The attempt's idempotence key is derived from the
+    subscription, its current end date and the attempt number. A charge
+    that was interrupted or got no answer stays "charging" and is replayed
+    with the same key, which returns the original payment instead of
+    charging twice.
+
+    A declined or failed attempt is retried after the next delay from
+    AUTORENEW_RETRY_DELAYS_HOURS; once the delays are used up the
+    subscription is left to expire. The user is told about every declined
+    or failed charge, so they can renew by hand before the subscription
+    ends. The subscription itself is extended by
+    the YooKassa ``payment.succeeded`` webhook, which moves ``end_date`` and
+    so starts a fresh series of attempts for the next period.
+    """
+
+    def __init__(self, bot: Bot, settings: Settings, i18n: JsonI18n,
+                 async_session_factory: sessionmaker,
+                 subscription_service: SubscriptionService):
+        self.bot = bot
+        self.settings = settings
+        self.i18n = i18n
+        self.async_session_factory = async_session_factory
+        self.subscription_service = subscription_service
+        self._task: Optional[asyncio.Task] = None
+        self._stop = asyncio.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return (self.settings.AUTORENEW_SCHEDULER_INTERVAL_SECONDS > 0
+                and self.settings.YOOKASSA_AUTOPAYMENTS_ENABLED)
+
+    def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        self._stop.clear()
+        self._task = asyncio.create_task(self._loop(), name="RenewalScheduler")
+        logging.info(
+            f"Renewal scheduler started (every {self.settings.AUTORENEW_SCHEDULER_INTERVAL_SECONDS}s).")
+
+    async def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                await self.run_once()
+            except Exception as e:
+                logging.error(f"Renewal scheduler run failed: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._stop.wait(),
+                                       timeout=self.settings.AUTORENEW_SCHEDULER_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_once(self) -> Dict[str, int]:
+        report: Counter = Counter()
+        now = datetime.now(timezone.utc)
+        await self._resolve_pending(now, report)
+        charges = await self._claim_due(now, report)
+
+        executor = BoundedExecutor(self.settings.AUTORENEW_CONCURRENCY, name="Renewal charges")
+        for attempt_id, subscription_id, idempotence_key, attempt_no in charges:
+            await executor.submit(
+                self._charge(attempt_id, subscription_id, idempotence_key, attempt_no, report),
+                f"Renewal charge for subscription {subscription_id}")
+        errors = await executor.drain()
+        report["failed"] += len(errors)
+
+        summary = {key: report[key] for key in
+                   ("checked", "initiated", "succeeded", "declined", "failed", "exhausted")}
+        if any(summary[key] for key in summary if key != "checked"):
+            logging.info(f"Renewal scheduler run: {summary}")
+            try:
+                await NotificationService(self.bot, self.settings, self.i18n).notify_autorenew_run(summary)
+            except Exception as e:
+                logging.error(f"Failed to send renewal scheduler report: {e}")
+        return summary
+
+    async def _claim_due(self, now: datetime, report: Counter) -> List[Tuple[int, int, str, int]]:
+        """Create attempt rows for due subscriptions; returns what to charge."""
+        due_from = now - timedelta(hours=self.settings.AUTORENEW_GRACE_HOURS)
+        due_until = now + timedelta(hours=self.settings.AUTORENEW_WINDOW_HOURS)
+        charges: List[Tuple[int, int, str, int]] = []
+
+        async with self.async_session_factory() as session:
+            due = await renewal_attempt_dal.lock_due_subscriptions(
+                session, due_from, due_until, now, self.settings.autorenew_retry_delays_hours,
+                self.settings.AUTORENEW_BATCH_SIZE)
+            report["checked"] += len(due)
+            for sub, attempts_made in due:
+                attempt_no = attempts_made + 1
+                idempotence_key = (
+                    f"autorenew-{sub.subscription_id}-{int(sub.end_date.timestamp())}-{attempt_no}")
+                attempt = await renewal_attempt_dal.create_attempt(
+                    session, sub.subscription_id, sub.end_date, attempt_no, idempotence_key)
+                charges.append((attempt.attempt_id, sub.subscription_id, idempotence_key, attempt_no))
+            await session.commit()
+        return charges
+
+    async def _charge(self, attempt_id: int, subscription_id: int, idempotence_key: str,
+                      attempt_no: int, report: Counter) -> None:
+        async with self.async_session_factory() as session:
+            sub = await renewal_attempt_dal.get_subscription(session, subscription_id)
+            if sub is None:
+                await renewal_attempt_dal.update_attempt(
+                    session, attempt_id, status=STATUS_FAILED, error="subscription not found")
+                await session.commit()
+                return
+            try:
+                outcome, response = await self.subscription_service.create_renewal_payment(
+                    session, sub, idempotence_key=idempotence_key)
+            except Exception as e:
+                # A payment may have been created; _resolve_pending replays the key
+                outcome, response = "unknown", None
+                logging.error(f"Renewal charge for subscription {subscription_id} raised: {e}", exc_info=True)
+
+            if outcome in NOT_ATTEMPTED_OUTCOMES:
+                # Card removed or auto-renew turned off since the claim: nothing was charged
+                await renewal_attempt_dal.delete_attempt(session, attempt_id)
+                await session.commit()
+                return
+            status = _attempt_status(outcome, response)
+            if status is None:
+                logging.warning(
+                    f"Renewal charge for subscription {subscription_id} has no answer; "
+                    f"it will be replayed with key {idempotence_key}.")
+                return
+            if status in (STATUS_INITIATED, STATUS_SUCCEEDED):
+                report["initiated"] += 1
+            else:
+                report["declined" if status == STATUS_DECLINED else "failed"] += 1
+            is_last = attempt_no > len(self.settings.autorenew_retry_delays_hours)
+            if status in (STATUS_DECLINED, STATUS_FAILED) and is_last:
+                report["exhausted"] += 1
+                logging.warning(
+                    f"Auto-renew for subscription {subscription_id} (user {sub.user_id}) gave up after the last retry.")
+
+            payment_id = response.get("id") if isinstance(response, dict) else None
+            await renewal_attempt_dal.update_attempt(
+                session, attempt_id, status=status, yookassa_payment_id=payment_id,
+                error=None if status in (STATUS_INITIATED, STATUS_SUCCEEDED) else outcome)
+            await session.commit()
+            if status in (STATUS_DECLINED, STATUS_FAILED):
+                await self._notify_charge_failed(session, sub.user_id, sub.end_date, attempt_no)
+
+    async def _replay_charge(self, session: AsyncSession, attempt, now: datetime) -> Optional[str]:
+        """Repeat an unanswered charge with its idempotence key; returns the new status if settled."""
+        if attempt.created_at < now - IDEMPOTENCE_KEY_TTL:
+            # The key has expired, a replay could create a second payment
+            logging.warning(
+                f"Renewal attempt {attempt.attempt_id} stayed unresolved past the idempotence key lifetime.")
+            await renewal_attempt_dal.update_attempt(
+                session, attempt.attempt_id, status=STATUS_FAILED, error="unresolved")
+            return None
+        sub = await renewal_attempt_dal.get_subscription(session, attempt.subscription_id)
+        if sub is None:
+            await renewal_attempt_dal.update_attempt(
+                session, attempt.attempt_id, status=STATUS_FAILED, error="subscription not found")
+            return None
+        try:
+            outcome, response = await self.subscription_service.create_renewal_payment(
+                session, sub, idempotence_key=attempt.idempotence_key)
+        except Exception as e:
+            logging.error(f"Replaying renewal attempt {attempt.attempt_id} raised: {e}", exc_info=True)
+            return None
+        if outcome in NOT_ATTEMPTED_OUTCOMES:
+            await renewal_attempt_dal.update_attempt(
+                session, attempt.attempt_id, status=STATUS_FAILED, error=outcome)
+            return None
+        status = _attempt_status(outcome, response)
+        if status is None:
+            return None
+        await renewal_attempt_dal.update_attempt(
+            session, attempt.attempt_id, status=status,
+            yookassa_payment_id=response.get("id") if isinstance(response, dict) else None)
+        return status
+
+    async def _resolve_pending(self, now: datetime, report: Counter) -> None:
+        """Settle attempts whose webhook never arrived, or whose charge got no answer."""
+        yookassa_service = getattr(self.subscription_service, "yookassa_service", None)
+        declined: List[Tuple[int, int]] = []
+        async with self.async_session_factory() as session:
+            attempts = await renewal_attempt_dal.get_unresolved_attempts(
+                session, now - UNRESOLVED_CHECK_AFTER)
+            for attempt in attempts:
+                if not attempt.yookassa_payment_id:
+                    # No answer from YooKassa: repeat the call with the same
+                    # idempotence key, which yields the original payment if any
+                    status = await self._replay_charge(session, attempt, now)
+                    if status in (STATUS_DECLINED, STATUS_FAILED):
+                        declined.append((attempt.subscription_id, attempt.attempt_no))
+                    continue
+                if not yookassa_service:
+                    continue
+                info = await yookassa_service.get_payment_info(attempt.yookassa_payment_id)
+                if not info:
+                    continue
+                if info.get("status") == "succeeded":
+                    await renewal_attempt_dal.update_attempt(
+                        session, attempt.attempt_id, status=STATUS_SUCCEEDED)
+                    report["succeeded"] += 1
+                elif info.get("status") == "canceled":
+                    await renewal_attempt_dal.update_attempt(
+                        session, attempt.attempt_id, status=STATUS_DECLINED, error="canceled")
+                    report["declined"] += 1
+                    declined.append((attempt.subscription_id, attempt.attempt_no))
+            await session.commit()
+            for subscription_id, attempt_no in declined:
+                sub = await renewal_attempt_dal.get_subscription(session, subscription_id)
+                if sub is not None:
+                    await self._notify_charge_failed(session, sub.user_id, sub.end_date, attempt_no)
+
+    async def _notify_charge_failed(self, session: AsyncSession, user_id: int,
+                                    end_date: datetime, attempt_no: int) -> None:
+        """Tell the user a renewal charge did not go through and whether it will be retried."""
+        delays = self.settings.autorenew_retry_delays_hours
+        db_user = await user_dal.get_user_by_id(session, user_id)
+        if db_user and db_user.is_banned:
+            return
+        lang = db_user.language_code if db_user and db_user.language_code else self.settings.DEFAULT_LANGUAGE
+        end_date_str = end_date.strftime("%Y-%m-%d")
+        if attempt_no <= len(delays):
+            text = self.i18n.gettext(lang, "autorenew_charge_failed_retry",
+                                     end_date=end_date_str, hours=f"{delays[attempt_no - 1]:g}")
+        else:
+            text = self.i18n.gettext(lang, "autorenew_charge_failed_final", end_date=end_date_str)
+        markup = get_subscribe_only_markup(lang, self.i18n)
+        queue_manager = get_queue_manager()
+        try:
+            if queue_manager is not None:
+                await queue_manager.send_message(user_id, text=text, reply_markup=markup)
+            else:
+                await self.bot.send_message(user_id, text, reply_markup=markup)
+        except Exception as e:
+            logging.error(f"Failed to notify user {user_id} about a failed auto-renew charge: {e}")
+
+    async def close(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=30)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                self._task.cancel()
+            self._task = None
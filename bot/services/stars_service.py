@@ -13,7 +13,7 @@ from .referral_service import ReferralService
 from bot.middlewares.i18n import JsonI18n
 from .notification_service import NotificationService
 from bot.keyboards.inline.user_keyboards import get_connect_and_main_keyboard
-import os
+from bot.utils.media_registry import get_media_registry
 
 
 class StarsService:
@@ -192,23 +192,14 @@ class StarsService:
         try:
             image_ref = self.settings.PAYMENT_SUCCESS_IMAGE_PATH
             if image_ref:
-                if os.path.exists(image_ref):
-                    from aiogram.types import FSInputFile
-                    await self.bot.send_photo(
-                        message.from_user.id,
-                        photo=FSInputFile(image_ref),
-                        caption=success_msg,
-                        reply_markup=markup,
-                        parse_mode="HTML",
-                    )
-                else:
-                    await self.bot.send_photo(
-                        message.from_user.id,
-                        photo=image_ref,
-                        caption=success_msg,
-                        reply_markup=markup,
-                        parse_mode="HTML",
-                    )
+                await get_media_registry().send_photo(
+                    self.bot,
+                    message.from_user.id,
+                    image_ref,
+                    caption=success_msg,
+                    reply_markup=markup,
+                    parse_mode="HTML",
+                )
             else:
                 await self.bot.send_message(
                     message.from_user.id,
@@ -11,6 +11,7 @@ from bot.utils.date_utils import add_months
 from db.models import User, Subscription
 
 from config.settings import Settings
+from config.runtime import get_runtime_config
 from .panel_api_service import PanelApiService
 
 
@@ -56,14 +57,15 @@ class SubscriptionService:
             return False
 
     async def _notify_admin_panel_user_creation_failed(self, user_id: int):
-        if not self.bot or not self.i18n or not self.settings.ADMIN_IDS:
+        admin_ids = get_runtime_config().admin_ids_ordered
+        if not self.bot or not self.i18n or not admin_ids:
             return
         admin_lang = self.settings.DEFAULT_LANGUAGE
 
         def _adm(key: str, **kw):
             return self.i18n.gettext(admin_lang, key, **kw)
         msg = _adm("admin_panel_user_creation_failed", user_id=user_id)
-        for admin_id in self.settings.ADMIN_IDS:
+        for admin_id in admin_ids:
             try:
                 await self.bot.send_message(admin_id, msg)
             except Exception as e:
@@ -127,8 +129,8 @@ class SubscriptionService:
                             (db_user.first_name or "") if db_user else "",
                             (db_user.last_name or "") if db_user else "",
                         ]),
-                        specific_squad_uuids=self.settings.parsed_user_squad_uuids,
-                        default_traffic_limit_bytes=self.settings.user_traffic_limit_bytes,
+                        specific_squad_uuids=get_runtime_config().user_squad_uuid_list,
+                        default_traffic_limit_bytes=get_runtime_config().user_traffic_limit_bytes,
                         default_traffic_limit_strategy=self.settings.USER_TRAFFIC_STRATEGY,
                     )
                     if (
@@ -156,8 +158,8 @@ class SubscriptionService:
                         (db_user.first_name or "") if db_user else "",
                         (db_user.last_name or "") if db_user else "",
                     ]),
-                    specific_squad_uuids=self.settings.parsed_user_squad_uuids,
-                    default_traffic_limit_bytes=self.settings.user_traffic_limit_bytes,
+                    specific_squad_uuids=get_runtime_config().user_squad_uuid_list,
+                    default_traffic_limit_bytes=get_runtime_config().user_traffic_limit_bytes,
                     default_traffic_limit_strategy=self.settings.USER_TRAFFIC_STRATEGY,
                 )
                 if (
@@ -362,7 +364,7 @@ class SubscriptionService:
             "duration_months": 0,
             "is_active": True,
             "status_from_panel": "TRIAL",
-            "traffic_limit_bytes": self.settings.trial_traffic_limit_bytes,
+            "traffic_limit_bytes": get_runtime_config().trial_traffic_limit_bytes,
         }
         try:
             await subscription_dal.upsert_subscription(session, trial_sub_data)
@@ -382,16 +384,15 @@ class SubscriptionService:
             panel_user_uuid=panel_user_uuid,
             expire_at=end_date,
             status="ACTIVE",
-            traffic_limit_bytes=self.settings.trial_traffic_limit_bytes,
+            traffic_limit_bytes=get_runtime_config().trial_traffic_limit_bytes,
         )
         # Assign default trial squad if configured
         try:
-            if getattr(self.settings, "trial_squad_uuid", None):
-                panel_update_payload["activeInternalSquads"] = [
-                    self.settings.trial_squad_uuid  # type: ignore
-                ]
+            trial_squad_uuid = get_runtime_config().trial_squad_uuid
+            if trial_squad_uuid:
+                panel_update_payload["activeInternalSquads"] = [trial_squad_uuid]
                 logging.info(
-                    f"Assigning trial squad for user {user_id}: {self.settings.trial_squad_uuid}"
+                    f"Assigning trial squad for user {user_id}: {trial_squad_uuid}"
                 )
         except Exception:
             # Non-fatal; continue without squad
@@ -527,7 +528,7 @@ class SubscriptionService:
             "duration_months": months,
             "is_active": True,
             "status_from_panel": "ACTIVE",
-            "traffic_limit_bytes": self.settings.user_traffic_limit_bytes,
+            "traffic_limit_bytes": get_runtime_config().user_traffic_limit_bytes,
             "provider": provider,
             "skip_notifications": provider == "tribute" and self.settings.TRIBUTE_SKIP_NOTIFICATIONS,
             "auto_renew_enabled": True,
@@ -547,11 +548,11 @@ class SubscriptionService:
             panel_user_uuid=panel_user_uuid,
             expire_at=final_end_date,
             status="ACTIVE",
-            traffic_limit_bytes=self.settings.user_traffic_limit_bytes,
+            traffic_limit_bytes=get_runtime_config().user_traffic_limit_bytes,
         )
         # Assign squad based on subscription months if configured in env
         try:
-            squad_uuid = self.settings.months_to_squad_uuid.get(months)
+            squad_uuid = get_runtime_config().months_to_squad_uuid.get(months)
             if squad_uuid:
                 # Override activeInternalSquads specifically for this user
                 panel_update_payload["activeInternalSquads"] = [squad_uuid]
@@ -632,8 +633,9 @@ class SubscriptionService:
             new_end_date_obj = start_date + timedelta(days=bonus_days)
 
             # For promo code activations, use the configured user traffic limit
-            traffic_limit = self.settings.user_traffic_limit_bytes if "promo code" in reason.lower(
-            ) else self.settings.trial_traffic_limit_bytes
+            runtime_config = get_runtime_config()
+            traffic_limit = runtime_config.user_traffic_limit_bytes if "promo code" in reason.lower(
+            ) else runtime_config.trial_traffic_limit_bytes
 
             bonus_sub_payload = {
                 "user_id": user_id,
@@ -670,7 +672,7 @@ class SubscriptionService:
             panel_update_payload = self._build_panel_update_payload(
                 expire_at=new_end_date_obj,
                 traffic_limit_bytes=(
-                    self.settings.user_traffic_limit_bytes if "promo code" in reason.lower() else None
+                    get_runtime_config().user_traffic_limit_bytes if "promo code" in reason.lower() else None
                 ),
                 include_uuid=False,
             )
@@ -711,7 +713,8 @@ class SubscriptionService:
         local_active_sub = await subscription_dal.get_active_subscription_by_user_id(
             session, user_id, panel_user_uuid
         )
-        panel_user_data = await self.panel_service.get_user_by_uuid(panel_user_uuid)
+        panel_user_data = await self.panel_service.get_user_by_uuid(
+            panel_user_uuid, use_cache=True)
 
         if not panel_user_data:
             logging.warning(
@@ -778,17 +781,15 @@ class SubscriptionService:
                     session, local_active_sub.subscription_id, update_payload_local
                 )
                 # Если локальная дата стала новее панели, попытаться подтянуть панель вверх
+                # Queued: merged with the push below into a single PATCH, not awaited
                 if best_end_date and panel_expire_dt and best_end_date > panel_expire_dt:
-                    try:
-                        await self.panel_service.update_user_details_on_panel(
-                            panel_user_uuid,
-                            self._build_panel_update_payload(
-                                expire_at=best_end_date,
-                                include_uuid=False,
-                            ),
-                        )
-                    except Exception:
-                        pass
+                    self.panel_service.enqueue_user_update(
+                        panel_user_uuid,
+                        self._build_panel_update_payload(
+                            expire_at=best_end_date,
+                            include_uuid=False,
+                        ),
+                    )
 
             # Гарантированно подтягиваем панель, если локальная активная подписка больше/новее
             # либо статус на панели не ACTIVE, даже если локальные поля не менялись
@@ -800,7 +801,7 @@ class SubscriptionService:
                         or panel_status != "ACTIVE"
                     )
                     if needs_push_to_panel:
-                        await self.panel_service.update_user_details_on_panel(
+                        self.panel_service.enqueue_user_update(
                             panel_user_uuid,
                             self._build_panel_update_payload(
                                 expire_at=best_end_date,
@@ -873,21 +874,41 @@ class SubscriptionService:
         sub: Subscription,
     ) -> bool:
         """Attempt to charge user using saved payment method. Return True on initiated/handled, False on failure."""
+        outcome, _ = await self.create_renewal_payment(session, sub)
+        return outcome in ("skipped", "initiated")
+
+    async def create_renewal_payment(
+        self,
+        session: AsyncSession,
+        sub: Subscription,
+        idempotence_key: Optional[str] = None,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Create a YooKassa charge on the user's saved payment method.
+
+        Returns (outcome, response) where outcome is "skipped" (nothing to
+        charge: auto-renew off, autopayments disabled or tribute),
+        "no_payment_method" (no saved card, nothing was charged),
+        "initiated" (payment created), "declined" (YooKassa canceled it),
+        "unknown" (the API call got no answer, a payment may exist) or
+        "failed" (YooKassa unavailable, no price or an unexpected answer).
+        The same `idempotence_key` always maps to the same YooKassa payment,
+        so an "unknown" charge can be repeated with it safely.
+        """
         if not sub.auto_renew_enabled:
-            return True
+            return "skipped", None
         # If autopayments are disabled globally, skip charging attempts
         if not getattr(self.settings, 'YOOKASSA_AUTOPAYMENTS_ENABLED', False):
-            return True
+            return "skipped", None
         if sub.provider == "tribute":
             # Tribute is paid externally; we do not auto-charge here
-            return True
+            return "skipped", None
 
         from db.dal.user_billing_dal import get_user_default_payment_method
         default_pm = await get_user_default_payment_method(session, sub.user_id)
         if not default_pm:
             logging.info(
                 f"Auto-renew skipped: no saved payment method for user {sub.user_id}")
-            return False
+            return "no_payment_method", None
 
         try:
             from .yookassa_service import YooKassaService  # local import to avoid cycles
@@ -897,13 +918,13 @@ class SubscriptionService:
             yk = None  # type: ignore
         if not yk or not getattr(yk, 'configured', False):
             logging.warning("YooKassa unavailable for auto-renew")
-            return False
+            return "failed", None
 
         months = sub.duration_months or 1
-        amount = self.settings.subscription_options.get(months)
+        amount = get_runtime_config().subscription_options.get(months)
         if not amount:
             logging.error(f"Auto-renew price missing for {months} months")
-            return False
+            return "failed", None
 
         metadata = {
             "user_id": str(sub.user_id),
@@ -918,13 +939,22 @@ class SubscriptionService:
             payment_method_id=default_pm.provider_payment_method_id,
             save_payment_method=False,
             capture=True,
+            idempotence_key=idempotence_key,
         )
-        if not resp or resp.get("status") not in {"pending", "waiting_for_capture", "succeeded"}:
+        if resp and resp.get("status") == "canceled":
+            logging.warning(
+                f"Auto-renew payment declined for user {sub.user_id} payment_id={resp.get('id')}")
+            return "declined", resp
+        if resp is None:
+            logging.error(
+                f"Auto-renew create_payment got no answer for user {sub.user_id} (key {idempotence_key})")
+            return "unknown", None
+        if resp.get("status") not in {"pending", "waiting_for_capture", "succeeded"}:
             logging.error(f"Auto-renew create_payment failed: {resp}")
-            return False
+            return "failed", resp
         logging.info(
             f"Auto-renew initiated for user {sub.user_id} payment_id={resp.get('id')}")
-        return True
+        return "initiated", resp
 
     async def update_last_notification_sent(
         self, session: AsyncSession, user_id: int, subscription_end_date: datetime
@@ -968,6 +998,7 @@ class SubscriptionService:
         if traffic_limit_bytes is not None:
             payload["trafficLimitBytes"] = traffic_limit_bytes
             payload["trafficLimitStrategy"] = self.settings.USER_TRAFFIC_STRATEGY
-        if self.settings.parsed_user_squad_uuids:
-            payload["activeInternalSquads"] = self.settings.parsed_user_squad_uuids
+        user_squad_uuids = get_runtime_config().user_squad_uuid_list
+        if user_squad_uuids:
+            payload["activeInternalSquads"] = user_squad_uuids
         return payload
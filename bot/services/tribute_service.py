@@ -18,10 +18,11 @@ from bot.middlewares.i18n import JsonI18n
 from bot.services.subscription_service import SubscriptionService
 from bot.services.panel_api_service import PanelApiService
 from bot.services.referral_service import ReferralService
+from bot.services.webhook_inbox import WebhookInbox
 from .notification_service import NotificationService
 from bot.keyboards.inline.user_keyboards import get_connect_and_main_keyboard
 from db.dal import payment_dal, user_dal
-import os
+from bot.utils.media_registry import get_media_registry
 
 
 def convert_period_to_months(period: Optional[str]) -> int:
@@ -62,14 +63,15 @@ class TributeService:
         self.panel_service = panel_service
         self.subscription_service = subscription_service
         self.referral_service = referral_service
+        # Set by build_core_services
+        self.webhook_inbox: Optional[WebhookInbox] = None
 
     async def handle_webhook(self, raw_body: bytes, signature_header: Optional[str]) -> web.Response:
+        """Verify the request and store it in the webhook inbox.
+
+        The event itself is applied later by `process_webhook_event`.
+        """
         settings = self.settings
-        bot = self.bot
-        i18n = self.i18n
-        async_session_factory = self.async_session_factory
-        subscription_service = self.subscription_service
-        referral_service = self.referral_service
 
         def ok(data: Optional[dict] = None) -> web.Response:
             payload = {"status": "ok"}
@@ -92,7 +94,8 @@ class TributeService:
                 return web.json_response({"status": "error", "reason": "invalid_signature"}, status=403)
 
         try:
-            payload = json.loads(raw_body.decode())
+            raw_text = raw_body.decode()
+            payload = json.loads(raw_text)
         except Exception:
             return bad_request("invalid_json")
 
@@ -104,16 +107,42 @@ class TributeService:
             json.dumps(payload, ensure_ascii=False),
         )
 
+        event_name = payload.get("name")
+        data = payload.get("payload", {})
+        if not data.get("telegram_user_id"):
+            # Permanent format issue — acknowledge to avoid retries
+            return ignored("missing_telegram_user_id")
+
+        explicit_event_id = (
+            data.get("event_id") or data.get("payment_id")
+            or data.get("purchase_id") or data.get("invoice_id")
+        )
+        event_id = f"{event_name}:{explicit_event_id or hashlib.sha256(raw_body).hexdigest()}"
+        try:
+            await self.webhook_inbox.accept("tribute", event_id, raw_text)
+        except Exception as e:
+            logging.error(f"Tribute webhook: failed to store event {event_id}: {e}", exc_info=True)
+            return web.json_response({"status": "error", "reason": "inbox_unavailable"}, status=500)
+        # Acknowledge to Tribute that webhook was received and accepted
+        return ok({"event": event_name or "unknown"})
+
+    async def process_webhook_event(self, raw_payload: str) -> None:
+        """Webhook inbox handler: apply a stored Tribute event."""
+        settings = self.settings
+        bot = self.bot
+        i18n = self.i18n
+        async_session_factory = self.async_session_factory
+        subscription_service = self.subscription_service
+        referral_service = self.referral_service
+
+        raw_body = raw_payload.encode()
+        payload = json.loads(raw_payload)
+
         # Tribute webhook spec: only two events are sent
         # name: new_subscription | cancelled_subscription
         event_name = payload.get("name")
         data = payload.get("payload", {})
-
-        # Mandatory routing fields
         user_id = data.get("telegram_user_id")
-        if not user_id:
-            # Permanent format issue — acknowledge to avoid retries
-            return ignored("missing_telegram_user_id")
 
         period_val = data.get("period")
         months = convert_period_to_months(period_val)
@@ -227,23 +256,14 @@ class TributeService:
                     try:
                         image_ref = settings.PAYMENT_SUCCESS_IMAGE_PATH
                         if image_ref:
-                            if os.path.exists(image_ref):
-                                from aiogram.types import FSInputFile
-                                await bot.send_photo(
-                                    int(user_id),
-                                    photo=FSInputFile(image_ref),
-                                    caption=success_msg,
-                                    reply_markup=markup,
-                                    parse_mode="HTML",
-                                )
-                            else:
-                                await bot.send_photo(
-                                    int(user_id),
-                                    photo=image_ref,
-                                    caption=success_msg,
-                                    reply_markup=markup,
-                                    parse_mode="HTML",
-                                )
+                            await get_media_registry().send_photo(
+                                bot,
+                                int(user_id),
+                                image_ref,
+                                caption=success_msg,
+                                reply_markup=markup,
+                                parse_mode="HTML",
+                            )
                         else:
                             # Use user's DB language in success messages prepared above
                             await bot.send_message(
@@ -278,8 +298,6 @@ class TributeService:
 
             else:
                 await session.commit()
-        # Acknowledge to Tribute that webhook was received and processed/accepted
-        return ok({"event": event_name or "unknown"})
 
     async def _handle_tribute_cancellation(self, session, user_id: int, bot: Bot, i18n: JsonI18n):
         """Handle tribute subscription cancellation - set subscription to 1 day grace period"""
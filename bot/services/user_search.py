@@ -0,0 +1,68 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.dal import user_dal
+from db.models import User
+
+# Payment primary keys are INTEGER
+MAX_PAYMENT_DB_ID = 2 ** 31 - 1
+UUID_PREFIX_REGEX = re.compile(r"^[0-9a-f]{4,8}(-[0-9a-f]{0,4}){0,3}(-[0-9a-f]{0,12})?$")
+PROVIDER_PAYMENT_ID_REGEX = re.compile(r"^[0-9A-Za-z_\-:.]{8,128}$")
+MAX_QUERY_LENGTH = 64
+
+
+@dataclass
+class UserSearchPage:
+    query: str
+    page: int
+    page_size: int
+    total: int = 0
+    results: List[Tuple[User, float]] = field(default_factory=list)
+
+    @property
+    def has_next(self) -> bool:
+        return (self.page + 1) * self.page_size < self.total
+
+
+class UserSearchService:
+    """Admin user search by id, @username, name fragment, panel UUID prefix or payment id.
+
+    The query text is split into every key it could be (a number may be a
+    Telegram id or a payment id, a hex fragment may be a UUID prefix or a
+    name) and `user_dal.search_users` resolves all of them in one ranked
+    query.
+    """
+
+    @staticmethod
+    def parse_query(query: str) -> Dict[str, Any]:
+        query = query.strip()[:MAX_QUERY_LENGTH]
+        keys: Dict[str, Any] = {}
+        if not query:
+            return keys
+        if query.isdigit():
+            keys["user_id"] = int(query)
+            if int(query) <= MAX_PAYMENT_DB_ID:
+                keys["payment_id"] = int(query)
+        if PROVIDER_PAYMENT_ID_REGEX.match(query) and not query.isdigit():
+            keys["provider_payment_id"] = query
+        lowered = query.lower()
+        if UUID_PREFIX_REGEX.match(lowered):
+            keys["uuid_prefix"] = lowered
+        name = query[1:] if query.startswith("@") else query
+        if name and not name.isdigit():
+            keys["name"] = name
+        return keys
+
+    async def search(self, session: AsyncSession, query: str, *,
+                     page: int = 0, page_size: int = 10) -> UserSearchPage:
+        page = max(0, page)
+        result = UserSearchPage(query=query, page=page, page_size=page_size)
+        keys = self.parse_query(query)
+        if not keys:
+            return result
+        result.results, result.total = await user_dal.search_users(
+            session, **keys, offset=page * page_size, limit=page_size)
+        return result
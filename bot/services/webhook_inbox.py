@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import sessionmaker
+
+from db.dal import webhook_inbox_dal
+from bot.utils.metrics import WEBHOOK_INBOX_PROCESSED, WEBHOOK_INBOX_RECEIVED
+
+WebhookHandler = Callable[[str], Awaitable[None]]
+
+
+class PermanentWebhookError(Exception):
+    """Raised by a handler when retrying the event cannot help (malformed payload etc.)."""
+
+
+class WebhookInbox:
+    """Durable inbox for provider webhooks.
+
+    Routes verify the request, call `accept()` and answer 200 right away; the
+    raw event is stored in ``webhook_inbox`` keyed by (provider, event id), so
+    redelivered events are dropped at insert time. Worker tasks claim due
+    events with ``FOR UPDATE SKIP LOCKED`` and run the handler registered for
+    the provider. A handler that raises is retried with exponential backoff;
+    after `max_attempts` the event is moved to the ``dead`` state, where
+    admins can inspect and requeue it (/webhook_dead).
+    """
+
+    def __init__(self, async_session_factory: sessionmaker,
+                 workers: int = 4,
+                 max_attempts: int = 8,
+                 retry_base_seconds: float = 10.0,
+                 retry_max_seconds: float = 1800.0,
+                 poll_seconds: float = 5.0,
+                 lock_seconds: float = 300.0,
+                 retention_days: int = 14):
+        self.async_session_factory = async_session_factory
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.poll_seconds = poll_seconds
+        self.lock_seconds = lock_seconds
+        self.retention_days = retention_days
+        self._handlers: Dict[str, WebhookHandler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._cleanup_task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._closing = False
+
+    def register_handler(self, provider: str, handler: WebhookHandler) -> None:
+        self._handlers[provider] = handler
+
+    async def accept(self, provider: str, event_id: str, payload: str) -> bool:
+        """Persist an incoming event. Returns False for a duplicate delivery.
+
+        Errors propagate so the route can answer 5xx and the provider retries.
+        """
+        async with self.async_session_factory() as session:
+            stored = await webhook_inbox_dal.insert_event(session, provider, event_id, payload)
+            await session.commit()
+        WEBHOOK_INBOX_RECEIVED.inc(provider, "stored" if stored else "duplicate")
+        if stored:
+            self._wakeup.set()
+        else:
+            logging.info(f"Webhook inbox: duplicate {provider} event {event_id} ignored.")
+        return stored
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        for index in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"WebhookInboxWorker-{index}"))
+        if self.retention_days > 0:
+            self._cleanup_task = asyncio.create_task(self._cleanup_loop(), name="WebhookInboxCleanup")
+        logging.info(f"Webhook inbox started with {self.workers} worker(s).")
+
+    def _retry_at(self, attempts: int) -> Optional[datetime]:
+        if attempts >= self.max_attempts:
+            return None
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * (2 ** (attempts - 1)))
+        delay *= random.uniform(0.8, 1.2)
+        return datetime.now(timezone.utc) + timedelta(seconds=delay)
+
+    async def _worker(self) -> None:
+        while not self._closing:
+            try:
+                processed = await self._process_next()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Webhook inbox worker error: {e}", exc_info=True)
+                processed = False
+            if processed:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _process_next(self) -> bool:
+        async with self.async_session_factory() as session:
+            events = await webhook_inbox_dal.claim_due_events(session, 1, self.lock_seconds)
+            await session.commit()
+            if not events:
+                return False
+            event = events[0]
+            event_pk, provider, event_id = event.event_pk, event.provider, event.event_id
+            payload, attempts = event.payload, event.attempts
+
+        handler = self._handlers.get(provider)
+        error: Optional[str] = None
+        permanent = False
+        if handler is None:
+            error, permanent = f"No handler registered for provider '{provider}'", True
+        else:
+            try:
+                await asyncio.wait_for(handler(payload), timeout=self.lock_seconds)
+            except PermanentWebhookError as e:
+                error, permanent = str(e) or e.__class__.__name__, True
+            except asyncio.TimeoutError:
+                error = f"Handler timed out after {self.lock_seconds}s"
+            except Exception as e:
+                error = f"{e.__class__.__name__}: {e}"
+                logging.error(f"Webhook inbox: {provider} event {event_id} failed: {e}", exc_info=True)
+
+        async with self.async_session_factory() as session:
+            if error is None:
+                await webhook_inbox_dal.mark_done(session, event_pk)
+                WEBHOOK_INBOX_PROCESSED.inc(provider, "done")
+            else:
+                retry_at = None if permanent else self._retry_at(attempts + 1)
+                await webhook_inbox_dal.mark_failed(session, event_pk, error, retry_at)
+                if retry_at is None:
+                    WEBHOOK_INBOX_PROCESSED.inc(provider, "dead")
+                    logging.error(
+                        f"Webhook inbox: {provider} event {event_id} moved to dead-letter after "
+                        f"{attempts + 1} attempt(s): {error}")
+                else:
+                    WEBHOOK_INBOX_PROCESSED.inc(provider, "retry")
+                    logging.warning(
+                        f"Webhook inbox: {provider} event {event_id} will be retried at "
+                        f"{retry_at.isoformat()} (attempt {attempts + 1}/{self.max_attempts}).")
+            await session.commit()
+        return True
+
+    async def _cleanup_loop(self) -> None:
+        while not self._closing:
+            try:
+                cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+                async with self.async_session_factory() as session:
+                    deleted = await webhook_inbox_dal.delete_done_before(session, cutoff)
+                    await session.commit()
+                if deleted:
+                    logging.info(f"Webhook inbox: removed {deleted} processed event(s) older than {self.retention_days} day(s).")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Webhook inbox cleanup failed: {e}", exc_info=True)
+            await asyncio.sleep(3600)
+
+    async def close(self, timeout: float = 30.0) -> None:
+        """Stop the workers, letting events already being handled finish.
+
+        Anything still running after `timeout` is cancelled; its row stays
+        locked and is picked up again once `lock_seconds` pass.
+        """
+        self._closing = True
+        self._wakeup.set()
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            self._cleanup_task = None
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks.clear()
@@ -65,7 +65,8 @@ class YooKassaService:
             save_payment_method: bool = False,
             payment_method_id: Optional[str] = None,
             capture: bool = True,
-            bind_only: bool = False) -> Optional[Dict[str, Any]]:
+            bind_only: bool = False,
+            idempotence_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
         if not self.configured:
             logging.error("YooKassa is not configured. Cannot create payment.")
             return None
@@ -148,7 +149,8 @@ class YooKassaService:
 
             builder.set_receipt(receipt_data_dict)
 
-            idempotence_key = str(uuid.uuid4())
+            # Callers retrying the same charge pass a stable key so YooKassa returns the original payment
+            idempotence_key = idempotence_key or str(uuid.uuid4())
             payment_request = builder.build()
 
             logging.info(
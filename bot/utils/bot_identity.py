@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.types import User
+
+# Username changes are rare and only done through BotFather; refreshing a few
+# times a day is enough to pick them up without a restart.
+DEFAULT_REFRESH_INTERVAL_SECONDS = 6 * 60 * 60
+# Minimum delay between synchronous retries while the identity is still unknown
+UNRESOLVED_RETRY_SECONDS = 60
+
+
+class BotIdentityProvider:
+    """Caches the bot's own `User` object so handlers never call `get_me()`.
+
+    Populated once at startup via `refresh()`. Reads are served from memory;
+    when the cached value is older than `refresh_interval` a background refresh
+    is scheduled and the current value is still returned, so hot paths make no
+    Telegram API calls.
+    """
+
+    def __init__(self, bot: Bot,
+                 refresh_interval: float = DEFAULT_REFRESH_INTERVAL_SECONDS):
+        self.bot = bot
+        self.refresh_interval = refresh_interval
+        self._me: Optional[User] = None
+        self._refreshed_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def me(self) -> Optional[User]:
+        self._maybe_schedule_refresh()
+        return self._me
+
+    @property
+    def username(self) -> Optional[str]:
+        me = self.me
+        return me.username if me else None
+
+    async def refresh(self) -> Optional[User]:
+        async with self._lock:
+            try:
+                self._me = await self.bot.get_me()
+                logging.info(f"Bot identity resolved: @{self._me.username} (id {self._me.id})")
+            except Exception as e:
+                logging.error(f"Failed to refresh bot identity, keeping cached value: {e}")
+            # Also stamp failures so an API outage doesn't trigger a refresh per read
+            self._refreshed_at = time.monotonic()
+        return self._me
+
+    async def get_username(self) -> Optional[str]:
+        """Cached username; only calls the API if startup resolution never succeeded."""
+        if self._me is None and (
+                self._refreshed_at is None
+                or time.monotonic() - self._refreshed_at >= UNRESOLVED_RETRY_SECONDS):
+            await self.refresh()
+        return self.username
+
+    def _maybe_schedule_refresh(self) -> None:
+        if self._refreshed_at is None:
+            return
+        if time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        try:
+            self._refresh_task = asyncio.get_running_loop().create_task(self.refresh())
+        except RuntimeError:
+            # No running loop (e.g. called from a sync context); try again on next read
+            pass
+
+
+_bot_identity: Optional[BotIdentityProvider] = None
+
+
+def init_bot_identity(bot: Bot) -> BotIdentityProvider:
+    """Initialize global bot identity provider"""
+    global _bot_identity
+    _bot_identity = BotIdentityProvider(bot)
+    return _bot_identity
+
+
+def get_bot_identity() -> Optional[BotIdentityProvider]:
+    """Get global bot identity provider instance"""
+    return _bot_identity
+
+
+async def get_bot_username() -> Optional[str]:
+    """Cached bot username, or None if the provider isn't initialized or resolution failed."""
+    if _bot_identity is None:
+        return None
+    return await _bot_identity.get_username()
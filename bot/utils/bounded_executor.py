@@ -0,0 +1,46 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Set
+
+
+class BoundedExecutor:
+    """Runs side-effect coroutines in the background with a concurrency cap.
+
+    `submit()` waits only while all slots are busy, so the caller keeps doing
+    its own work (e.g. DB updates) while up to `concurrency` requests are in
+    flight. `drain()` waits for everything submitted and returns the collected
+    error messages instead of raising on the first failure.
+    """
+
+    def __init__(self, concurrency: int, name: str = "executor"):
+        self.name = name
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._tasks: Set[asyncio.Task] = set()
+        self.errors: List[str] = []
+        self.submitted = 0
+
+    async def submit(self, coro: Awaitable[Any], description: str,
+                     is_failure: Optional[Callable[[Any], bool]] = None) -> None:
+        """Schedule `coro`; `is_failure(result)` marks non-raising failures (e.g. a None API result)."""
+        await self._semaphore.acquire()
+        self.submitted += 1
+        task = asyncio.create_task(self._run(coro, description, is_failure))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, coro: Awaitable[Any], description: str,
+                   is_failure: Optional[Callable[[Any], bool]]) -> None:
+        try:
+            result = await coro
+            if is_failure is not None and is_failure(result):
+                self.errors.append(f"{description}: request failed")
+        except Exception as e:
+            self.errors.append(f"{description}: {e}")
+            logging.warning(f"{self.name}: {description} failed: {e}")
+        finally:
+            self._semaphore.release()
+
+    async def drain(self) -> List[str]:
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        return list(self.errors)
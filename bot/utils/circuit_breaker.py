@@ -0,0 +1,71 @@
+import logging
+import time
+from typing import Optional
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for an upstream dependency.
+
+    After `failure_threshold` failures in a row the breaker opens and
+    `allow_request()` returns False for `reset_timeout` seconds. Then a single
+    probe request is let through (half-open): success closes the breaker,
+    failure opens it for another `reset_timeout`.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5,
+                 reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        if self.state == STATE_CLOSED:
+            return True
+        if self.state == STATE_OPEN:
+            if time.monotonic() - (self._opened_at or 0) < self.reset_timeout:
+                return False
+            self.state = STATE_HALF_OPEN
+            self._probe_in_flight = False
+            logging.info(f"Circuit breaker '{self.name}' half-open, probing upstream.")
+        # Half-open: let exactly one probe through
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def release_probe(self) -> None:
+        """Give up the half-open probe slot without an outcome (cancelled or crashed call)."""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        if self.state != STATE_CLOSED:
+            logging.info(f"Circuit breaker '{self.name}' closed, upstream recovered.")
+        self.state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._consecutive_failures += 1
+        if self.state == STATE_HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            if self.state != STATE_OPEN:
+                logging.warning(
+                    f"Circuit breaker '{self.name}' opened after {self._consecutive_failures} "
+                    f"consecutive failure(s); failing fast for {self.reset_timeout}s.")
+            self.state = STATE_OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    @property
+    def retry_after(self) -> float:
+        if self.state != STATE_OPEN or self._opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
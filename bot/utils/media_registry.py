@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Optional, Tuple, Union
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+from config.settings import get_settings
+
+# Parts of Telegram error texts that mean the cached file id itself is invalid
+FILE_ID_ERROR_MARKERS = ("wrong file identifier", "wrong remote file identifier",
+                         "file reference", "file_reference")
+
+
+class MediaRegistry:
+    """Uploads local images once and sends them by Telegram `file_id` afterwards.
+
+    File ids are stored in a small JSON file keyed by bot id and the SHA-256 of
+    the file contents, so replacing an image (same path, new content) triggers
+    a fresh upload. URLs and existing file ids are passed through unchanged.
+    """
+
+    def __init__(self, store_path: str):
+        self.store_path = store_path
+        self._file_ids: Dict[str, str] = self._load()
+        # path -> (mtime, size, sha256); avoids hashing the file on every send
+        self._hashes: Dict[str, Tuple[float, int, str]] = {}
+        self._upload_locks: Dict[str, asyncio.Lock] = {}
+
+    def _load(self) -> Dict[str, str]:
+        if not os.path.exists(self.store_path):
+            return {}
+        try:
+            with open(self.store_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {str(k): str(v) for k, v in data.items()}
+        except Exception as e:
+            logging.warning(f"Media registry: failed to read {self.store_path}, starting empty: {e}")
+            return {}
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.store_path)
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.store_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._file_ids, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.store_path)
+        except OSError as e:
+            # Not fatal: the file id stays cached in memory for this process
+            logging.warning(f"Media registry: failed to persist {self.store_path}: {e}")
+
+    def _content_hash(self, path: str) -> str:
+        stat = os.stat(path)
+        cached = self._hashes.get(path)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+        self._hashes[path] = (stat.st_mtime, stat.st_size, content_hash)
+        return content_hash
+
+    def _forget(self, key: str) -> None:
+        if self._file_ids.pop(key, None) is not None:
+            self._save()
+
+    async def send_photo(self, bot: Bot, chat_id: Union[int, str], image_ref: str,
+                         **kwargs) -> Message:
+        """Send `image_ref` (local path, URL or file id) as a photo.
+
+        Extra keyword arguments go to `Bot.send_photo`.
+        """
+        if not os.path.exists(image_ref):
+            return await bot.send_photo(chat_id, photo=image_ref, **kwargs)
+
+        key = f"{bot.id}:{self._content_hash(image_ref)}"
+        file_id = self._file_ids.get(key)
+        if file_id:
+            try:
+                return await bot.send_photo(chat_id, photo=file_id, **kwargs)
+            except TelegramBadRequest as e:
+                # File ids can be invalidated (e.g. the file was removed on Telegram's side);
+                # other errors (chat, caption, markup) would fail the upload just the same
+                if not any(marker in str(e).lower() for marker in FILE_ID_ERROR_MARKERS):
+                    raise
+                logging.warning(f"Media registry: cached file_id for {image_ref} rejected, re-uploading: {e}")
+                self._forget(key)
+
+        lock = self._upload_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another sender may have uploaded this file while we waited
+            file_id = self._file_ids.get(key)
+            if file_id:
+                return await bot.send_photo(chat_id, photo=file_id, **kwargs)
+
+            message = await bot.send_photo(chat_id, photo=FSInputFile(image_ref), **kwargs)
+            if message.photo:
+                self._file_ids[key] = message.photo[-1].file_id
+                self._save()
+                logging.info(f"Media registry: uploaded {image_ref}, file_id cached.")
+            return message
+
+
+_media_registry: Optional[MediaRegistry] = None
+
+
+def get_media_registry() -> MediaRegistry:
+    global _media_registry
+    if _media_registry is None:
+        _media_registry = MediaRegistry(get_settings().MEDIA_FILE_ID_STORE_PATH)
+    return _media_registry
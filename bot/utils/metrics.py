@@ -0,0 +1,315 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+SYNC_BUCKETS: Tuple[float, ...] = (
+    1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 3600.0
+)
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str],
+                   extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape_label_value(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labelvalues: Sequence[object]) -> Tuple[str, ...]:
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name} expects labels {self.labelnames}, got {labelvalues}")
+        return tuple(str(v) for v in labelvalues)
+
+    def _header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter. Label values are passed positionally."""
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: object, amount: float = 1.0) -> None:
+        key = self._key(labelvalues)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for key, value in self._values.items():
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Gauge that is either set explicitly or sampled from a callback at scrape time.
+
+    The callback returns a mapping of label value tuples to values, which lets
+    one callback expose several series (e.g. one per queue).
+    """
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def set(self, value: float, *labelvalues: object) -> None:
+        self._values[self._key(labelvalues)] = float(value)
+
+    def set_callback(
+            self, callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]]) -> None:
+        self._callback = callback
+
+    def render(self) -> List[str]:
+        values = dict(self._values)
+        if self._callback is not None:
+            try:
+                values.update(self._callback() or {})
+            except Exception:
+                # A broken sampler must never break the whole scrape
+                pass
+        lines = self._header()
+        for key, value in values.items():
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed buckets.
+
+    Observations only do a bisect and two list increments; cumulative sums are
+    computed at render time.
+    """
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        # series -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, *labelvalues: object) -> None:
+        key = self._key(labelvalues)
+        series = self._series.get(key)
+        if series is None:
+            series = [[0] * (len(self.buckets) + 1), 0.0]
+            self._series[key] = series
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    @contextmanager
+    def time(self, *labelvalues: object) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labelvalues)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for key, (counts, total_sum) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key,
+                                        ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            base_labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{base_labels} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{base_labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str,
+                labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str,
+              labelnames: Sequence[str] = (), callback=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))  # type: ignore[return-value]
+
+    def histogram(self, name: str, documentation: str,
+                  labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# --- Bot updates ---
+UPDATE_DURATION = registry.histogram(
+    "bot_update_duration_seconds",
+    "Time spent processing a Telegram update, by update type.",
+    ("update_type", ))
+HANDLER_DURATION = registry.histogram(
+    "bot_handler_duration_seconds",
+    "Time spent inside a matched handler, by update type and handler.",
+    ("update_type", "handler"))
+UPDATE_ERRORS = registry.counter(
+    "bot_update_errors_total",
+    "Updates whose processing raised an exception, by update type.",
+    ("update_type", ))
+
+# --- i18n ---
+I18N_MISSING_KEYS = registry.counter(
+    "i18n_missing_keys_total",
+    "Translation lookups for keys missing from the catalogs, by requested language.",
+    ("lang", ))
+
+# --- Keyboards ---
+KEYBOARD_CACHE_REQUESTS = registry.counter(
+    "keyboard_cache_requests_total",
+    "Keyboard builder calls by keyboard and cache result (hit, miss, bypass).",
+    ("keyboard", "result"))
+
+# --- Message queue (sampled from MessageQueueManager.get_queue_stats) ---
+QUEUE_DEPTH = registry.gauge(
+    "bot_message_queue_depth", "Messages waiting in the queue.", ("queue", ))
+QUEUE_RECENT_SENDS = registry.gauge(
+    "bot_message_queue_sends_last_minute",
+    "Messages sent by the queue during the last 60 seconds.", ("queue", ))
+QUEUE_PROCESSING = registry.gauge(
+    "bot_message_queue_processing",
+    "1 if the queue worker is currently running.", ("queue", ))
+
+# --- Panel API ---
+PANEL_REQUEST_DURATION = registry.histogram(
+    "panel_api_request_duration_seconds",
+    "Panel API request latency, by method and endpoint.",
+    ("method", "endpoint"))
+PANEL_REQUEST_ERRORS = registry.counter(
+    "panel_api_request_errors_total",
+    "Failed panel API requests, by method, endpoint and status code.",
+    ("method", "endpoint", "status_code"))
+PANEL_REQUEST_RETRIES = registry.counter(
+    "panel_api_request_retries_total",
+    "Panel API requests retried after a transient failure, by method and endpoint.",
+    ("method", "endpoint"))
+PANEL_CIRCUIT_OPEN = registry.gauge(
+    "panel_api_circuit_open",
+    "1 while the panel API circuit breaker is open or half-open.")
+PANEL_USER_CACHE_REQUESTS = registry.counter(
+    "panel_user_cache_requests_total",
+    "Cached panel user lookups by result (hit, miss).",
+    ("result", ))
+PANEL_WRITE_QUEUE_DEPTH = registry.gauge(
+    "panel_write_queue_pending_users",
+    "Panel users with updates waiting in the write-behind queue.")
+PANEL_WRITE_QUEUE_FLUSHED = registry.counter(
+    "panel_write_queue_updates_total",
+    "Queued panel user updates by outcome (single, bulk, dropped).",
+    ("result", ))
+PANEL_SHORT_CIRCUITED = registry.counter(
+    "panel_api_short_circuited_total",
+    "Panel API requests answered without calling the panel, by result (stale_cache, rejected).",
+    ("result", ))
+
+# --- Webhooks ---
+WEBHOOK_DURATION = registry.histogram(
+    "webhook_processing_duration_seconds",
+    "Time spent handling an incoming webhook, by provider and response status.",
+    ("provider", "status"))
+WEBHOOK_INBOX_RECEIVED = registry.counter(
+    "webhook_inbox_received_total",
+    "Webhook events accepted into the inbox, by provider and result (stored, duplicate).",
+    ("provider", "result"))
+WEBHOOK_INBOX_PROCESSED = registry.counter(
+    "webhook_inbox_processed_total",
+    "Inbox events handled by the workers, by provider and outcome (done, retry, dead).",
+    ("provider", "result"))
+WEBHOOK_EVENT_DUPLICATES = registry.counter(
+    "webhook_event_duplicates_total",
+    "Webhook events skipped as already handled, by provider and where the fingerprint was found (memory, db).",
+    ("provider", "source"))
+
+# --- Database pool ---
+DB_POOL_CHECKOUTS = registry.counter(
+    "db_pool_checkouts_total", "Connections checked out from the pool.")
+DB_POOL_CONNECTS = registry.counter(
+    "db_pool_connections_created_total", "New DBAPI connections opened by the pool.")
+DB_POOL_CHECKOUT_WAIT = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a connection from the pool.",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+DB_POOL_SLOW_CHECKOUTS = registry.counter(
+    "db_pool_slow_checkouts_total",
+    "Pool checkouts that waited longer than DB_POOL_SLOW_CHECKOUT_SECONDS.")
+DB_POOL_SATURATION = registry.gauge(
+    "db_pool_saturation_ratio",
+    "Checked out connections divided by pool size plus max overflow.")
+DB_POOL_STATUS = registry.gauge(
+    "db_pool_connections",
+    "Pool connection counts sampled at scrape time (size, checked_out, overflow, checked_in).",
+    ("state", ))
+
+# --- Panel sync ---
+SYNC_DURATION = registry.histogram(
+    "panel_sync_duration_seconds",
+    "Duration of a full panel synchronization run, by result status.",
+    ("status", ), buckets=SYNC_BUCKETS)
+
+
+def render_latest() -> str:
+    return registry.render()
+
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
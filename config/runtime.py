@@ -0,0 +1,128 @@
+import logging
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Callable, FrozenSet, List, Mapping, Optional, Tuple
+
+from dotenv import dotenv_values
+from pydantic import ValidationError
+
+from config.settings import Settings, get_settings
+
+
+@dataclass(frozen=True)
+class RuntimeConfig:
+    """Immutable snapshot of the settings values read on hot paths.
+
+    Built once from `Settings` so admin checks and price/squad lookups don't
+    re-parse strings on every access. A reload builds a new snapshot and swaps
+    the module-level reference in one assignment; readers always see either
+    the old or the new snapshot, never a mix.
+    """
+    version: int
+    settings: Settings
+    admin_ids: FrozenSet[int]
+    admin_ids_ordered: Tuple[int, ...]
+    primary_admin_id: Optional[int]
+    subscription_options: Mapping[int, float]
+    stars_subscription_options: Mapping[int, int]
+    tribute_payment_links: Mapping[int, str]
+    months_to_squad_uuid: Mapping[int, str]
+    user_squad_uuids: Optional[Tuple[str, ...]]
+    trial_squad_uuid: Optional[str]
+    referral_bonus_inviter: Mapping[int, int]
+    referral_bonus_referee: Mapping[int, int]
+    user_traffic_limit_bytes: int
+    trial_traffic_limit_bytes: int
+
+    @classmethod
+    def from_settings(cls, settings: Settings, version: int = 1) -> "RuntimeConfig":
+        admin_ids_ordered = tuple(dict.fromkeys(settings.ADMIN_IDS))
+        squads = settings.parsed_user_squad_uuids
+        return cls(
+            version=version,
+            settings=settings,
+            admin_ids=frozenset(admin_ids_ordered),
+            admin_ids_ordered=admin_ids_ordered,
+            primary_admin_id=admin_ids_ordered[0] if admin_ids_ordered else None,
+            subscription_options=MappingProxyType(dict(settings.subscription_options)),
+            stars_subscription_options=MappingProxyType(dict(settings.stars_subscription_options)),
+            tribute_payment_links=MappingProxyType(dict(settings.tribute_payment_links)),
+            months_to_squad_uuid=MappingProxyType(dict(settings.months_to_squad_uuid)),
+            user_squad_uuids=tuple(squads) if squads else None,
+            trial_squad_uuid=settings.trial_squad_uuid,
+            referral_bonus_inviter=MappingProxyType(dict(settings.referral_bonus_inviter)),
+            referral_bonus_referee=MappingProxyType(dict(settings.referral_bonus_referee)),
+            user_traffic_limit_bytes=settings.user_traffic_limit_bytes,
+            trial_traffic_limit_bytes=settings.trial_traffic_limit_bytes,
+        )
+
+    def is_admin(self, user_id: Optional[int]) -> bool:
+        return user_id in self.admin_ids
+
+    @property
+    def user_squad_uuid_list(self) -> Optional[List[str]]:
+        """Squad UUIDs as a fresh list, for building panel payloads."""
+        return list(self.user_squad_uuids) if self.user_squad_uuids else None
+
+
+_runtime_config: Optional[RuntimeConfig] = None
+_reload_lock = threading.Lock()
+_reload_listeners: List[Callable[[RuntimeConfig], None]] = []
+
+
+def get_runtime_config() -> RuntimeConfig:
+    global _runtime_config
+    if _runtime_config is None:
+        _runtime_config = RuntimeConfig.from_settings(get_settings())
+    return _runtime_config
+
+
+def add_reload_listener(listener: Callable[[RuntimeConfig], None]) -> None:
+    """Register a callback invoked with the new snapshot after every successful reload."""
+    _reload_listeners.append(listener)
+
+
+def _load_fresh_settings(env_file: Optional[str]) -> Settings:
+    # Values from the env file are passed explicitly so they win over the
+    # process environment, which still holds the values from startup.
+    overrides = {}
+    if env_file:
+        overrides = {k: v for k, v in dotenv_values(env_file).items() if v is not None}
+    return Settings(**overrides)
+
+
+def reload_runtime_config(env_file: Optional[str] = None) -> Tuple[bool, str]:
+    """Re-read settings and atomically swap the runtime snapshot.
+
+    Returns (success, message). On validation errors the current snapshot is
+    kept.
+    """
+    global _runtime_config
+    with _reload_lock:
+        current = get_runtime_config()
+        if env_file is None:
+            env_file = current.settings.RUNTIME_CONFIG_ENV_FILE
+        try:
+            fresh_settings = _load_fresh_settings(env_file)
+        except ValidationError as e:
+            logging.error(f"Runtime config reload failed, keeping version {current.version}: {e}")
+            return False, str(e)
+        except OSError as e:
+            logging.error(f"Runtime config reload failed reading {env_file}: {e}")
+            return False, str(e)
+
+        new_config = RuntimeConfig.from_settings(fresh_settings, version=current.version + 1)
+        _runtime_config = new_config
+
+    logging.info(
+        f"Runtime config reloaded: version {new_config.version}, "
+        f"{len(new_config.admin_ids)} admin(s), "
+        f"{len(new_config.subscription_options)} price option(s)."
+    )
+    for listener in list(_reload_listeners):
+        try:
+            listener(new_config)
+        except Exception as e:
+            logging.error(f"Runtime config reload listener {listener!r} failed: {e}", exc_info=True)
+    return True, f"version {new_config.version}"
@@ -6,6 +6,9 @@ from . import panel_sync_dal
 from . import message_log_dal
 from . import user_billing_dal
 from . import ad_dal
+from . import webhook_inbox_dal
+from . import renewal_attempt_dal
+from . import referral_dal
 
 __all__ = (
     "user_dal",
@@ -16,6 +19,9 @@ __all__ = (
     "message_log_dal",
     "user_billing_dal",
     "ad_dal",
+    "webhook_inbox_dal",
+    "renewal_attempt_dal",
+    "referral_dal",
 )
 
 
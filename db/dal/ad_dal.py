@@ -3,9 +3,12 @@ from typing import Optional, List, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from sqlalchemy import update, delete, func, and_
+from sqlalchemy import update, delete, func, and_, distinct
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from ..models import AdCampaign, AdAttribution, Payment
+from ..models import AdCampaign, AdAttribution, AdCampaignCounters, Payment
+
+EMPTY_STATS = {"starts": 0, "trials": 0, "payers": 0, "revenue": 0.0}
 
 
 async def create_campaign(
@@ -19,6 +22,8 @@ async def create_campaign(
     session.add(campaign)
     await session.flush()
     await session.refresh(campaign)
+    session.add(AdCampaignCounters(ad_campaign_id=campaign.ad_campaign_id))
+    await session.flush()
     logging.info(
         f"AdCampaign created id={campaign.ad_campaign_id}, source={source}, start={start_param}, cost={cost}"
     )
@@ -64,6 +69,7 @@ async def ensure_attribution(session: AsyncSession, *, user_id: int, campaign_id
     session.add(attrib)
     await session.flush()
     await session.refresh(attrib)
+    await bump_campaign_counters(session, campaign_id, starts=1)
     logging.info(f"AdAttribution created for user {user_id} -> campaign {campaign_id}")
     return attrib
 
@@ -79,52 +85,103 @@ async def mark_trial_activated(session: AsyncSession, user_id: int) -> bool:
         update(AdAttribution)
         .where(and_(AdAttribution.user_id == user_id, AdAttribution.trial_activated_at.is_(None)))
         .values(trial_activated_at=func.now())
+        .returning(AdAttribution.ad_campaign_id)
     )
-    result = await session.execute(stmt)
-    return result.rowcount > 0
-
-
-async def get_campaign_stats(session: AsyncSession, campaign_id: int) -> Dict[str, Any]:
-    # Starts (attributed users)
-    starts_stmt = select(func.count(AdAttribution.user_id)).where(
-        AdAttribution.ad_campaign_id == campaign_id
-    )
-    starts = (await session.execute(starts_stmt)).scalar() or 0
-
-    # Trials
-    trials_stmt = select(func.count(AdAttribution.user_id)).where(
-        and_(AdAttribution.ad_campaign_id == campaign_id, AdAttribution.trial_activated_at.is_not(None))
-    )
-    trials = (await session.execute(trials_stmt)).scalar() or 0
-
-    # Payers (unique users with succeeded payments)
-    payers_stmt = select(func.count(func.distinct(Payment.user_id))).select_from(Payment).where(
-        and_(
+    campaign_id = (await session.execute(stmt)).scalar_one_or_none()
+    if campaign_id is None:
+        return False
+    await bump_campaign_counters(session, campaign_id, trials=1)
+    return True
+
+
+async def bump_campaign_counters(session: AsyncSession, campaign_id: int, *,
+                                 starts: int = 0, trials: int = 0, payers: int = 0,
+                                 revenue: float = 0.0) -> None:
+    """Add deltas to a campaign's counters row, creating it if missing."""
+    insert_stmt = pg_insert(AdCampaignCounters).values(
+        ad_campaign_id=campaign_id, starts=starts, trials=trials,
+        payers=payers, revenue=float(revenue))
+    counters = AdCampaignCounters.__table__.c
+    await session.execute(insert_stmt.on_conflict_do_update(
+        index_elements=[AdCampaignCounters.ad_campaign_id],
+        set_={
+            "starts": counters.starts + insert_stmt.excluded.starts,
+            "trials": counters.trials + insert_stmt.excluded.trials,
+            "payers": counters.payers + insert_stmt.excluded.payers,
+            "revenue": counters.revenue + insert_stmt.excluded.revenue,
+            "updated_at": func.now(),
+        },
+    ))
+
+
+async def record_succeeded_payment(session: AsyncSession, user_id: int,
+                                   payment_id: int, amount: float) -> None:
+    """Count a payment that just became succeeded towards the user's campaign, if any."""
+    campaign_id = (await session.execute(
+        select(AdAttribution.ad_campaign_id).where(AdAttribution.user_id == user_id)
+    )).scalar_one_or_none()
+    if campaign_id is None:
+        return
+    has_earlier = (await session.execute(
+        select(Payment.payment_id).where(
+            Payment.user_id == user_id,
             Payment.status == "succeeded",
-            Payment.user_id.in_(
-                select(AdAttribution.user_id).where(AdAttribution.ad_campaign_id == campaign_id)
-            ),
+            Payment.payment_id != payment_id,
+        ).limit(1)
+    )).first() is not None
+    await bump_campaign_counters(session, campaign_id,
+                                 payers=0 if has_earlier else 1,
+                                 revenue=float(amount or 0.0))
+
+
+async def get_campaigns_stats(session: AsyncSession, campaign_ids: List[int], *,
+                              use_counters: bool = False) -> Dict[int, Dict[str, Any]]:
+    """Stats for several campaigns in one query, keyed by campaign id.
+
+    Computed with a single GROUP BY over ad_attributions LEFT JOIN payments,
+    or read from ad_campaign_counters when `use_counters` is set.
+    """
+    if not campaign_ids:
+        return {}
+    if use_counters:
+        stmt = select(
+            AdCampaignCounters.ad_campaign_id,
+            AdCampaignCounters.starts,
+            AdCampaignCounters.trials,
+            AdCampaignCounters.payers,
+            AdCampaignCounters.revenue,
+        ).where(AdCampaignCounters.ad_campaign_id.in_(campaign_ids))
+    else:
+        stmt = (
+            select(
+                AdAttribution.ad_campaign_id,
+                func.count(distinct(AdAttribution.user_id)),
+                func.count(distinct(AdAttribution.user_id)).filter(
+                    AdAttribution.trial_activated_at.is_not(None)),
+                func.count(distinct(Payment.user_id)),
+                func.coalesce(func.sum(Payment.amount), 0.0),
+            )
+            .select_from(AdAttribution)
+            .outerjoin(Payment, and_(Payment.user_id == AdAttribution.user_id,
+                                     Payment.status == "succeeded"))
+            .where(AdAttribution.ad_campaign_id.in_(campaign_ids))
+            .group_by(AdAttribution.ad_campaign_id)
         )
-    )
-    payers = (await session.execute(payers_stmt)).scalar() or 0
+    stats = {campaign_id: dict(EMPTY_STATS) for campaign_id in campaign_ids}
+    for campaign_id, starts, trials, payers, revenue in (await session.execute(stmt)).all():
+        stats[campaign_id] = {
+            "starts": int(starts or 0),
+            "trials": int(trials or 0),
+            "payers": int(payers or 0),
+            "revenue": float(revenue or 0.0),
+        }
+    return stats
 
-    # Revenue sum
-    revenue_stmt = select(func.coalesce(func.sum(Payment.amount), 0.0)).select_from(Payment).where(
-        and_(
-            Payment.status == "succeeded",
-            Payment.user_id.in_(
-                select(AdAttribution.user_id).where(AdAttribution.ad_campaign_id == campaign_id)
-            ),
-        )
-    )
-    revenue = float((await session.execute(revenue_stmt)).scalar() or 0.0)
 
-    return {
-        "starts": int(starts),
-        "trials": int(trials),
-        "payers": int(payers),
-        "revenue": revenue,
-    }
+async def get_campaign_stats(session: AsyncSession, campaign_id: int, *,
+                             use_counters: bool = False) -> Dict[str, Any]:
+    stats = await get_campaigns_stats(session, [campaign_id], use_counters=use_counters)
+    return stats[campaign_id]
 
 
 async def count_campaigns(session: AsyncSession, *, only_active: bool = False) -> int:
@@ -145,20 +202,21 @@ async def list_campaigns_paged(
     return result.scalars().all()
 
 
-async def get_totals(session: AsyncSession) -> Dict[str, float]:
+async def get_totals(session: AsyncSession, *, use_counters: bool = False) -> Dict[str, float]:
     # Total cost across all campaigns
-    total_cost_stmt = select(func.coalesce(func.sum(AdCampaign.cost), 0.0))
-    total_cost = float((await session.execute(total_cost_stmt)).scalar() or 0.0)
-
-    # Total revenue from all attributed users (unique users counted across all campaigns)
-    revenue_stmt = select(func.coalesce(func.sum(Payment.amount), 0.0)).select_from(Payment).where(
-        and_(
-            Payment.status == "succeeded",
-            Payment.user_id.in_(select(AdAttribution.user_id)),
+    total_cost = select(func.coalesce(func.sum(AdCampaign.cost), 0.0)).scalar_subquery()
+
+    # Total revenue from all attributed users (each user has one attribution)
+    if use_counters:
+        total_revenue = select(func.coalesce(func.sum(AdCampaignCounters.revenue), 0.0)).scalar_subquery()
+    else:
+        total_revenue = (
+            select(func.coalesce(func.sum(Payment.amount), 0.0))
+            .select_from(AdAttribution)
+            .join(Payment, and_(Payment.user_id == AdAttribution.user_id,
+                                Payment.status == "succeeded"))
+            .scalar_subquery()
         )
-    )
-    total_revenue = float((await session.execute(revenue_stmt)).scalar() or 0.0)
-
-    return {"cost": total_cost, "revenue": total_revenue}
-
 
+    cost, revenue = (await session.execute(select(total_cost, total_revenue))).one()
+    return {"cost": float(cost or 0.0), "revenue": float(revenue or 0.0)}
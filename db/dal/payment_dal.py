@@ -6,6 +6,8 @@ from sqlalchemy import update, func, and_
 from sqlalchemy.orm import selectinload
 
 from db.models import Payment, User
+from . import ad_dal
+from . import referral_dal
 
 
 async def create_payment_record(session: AsyncSession,
@@ -32,6 +34,11 @@ async def create_payment_record(session: AsyncSession,
     session.add(new_payment)
     await session.flush()
     await session.refresh(new_payment)
+    if new_payment.status == "succeeded":
+        await ad_dal.record_succeeded_payment(
+            session, new_payment.user_id, new_payment.payment_id, new_payment.amount)
+        await referral_dal.record_succeeded_payment(
+            session, new_payment.user_id, new_payment.payment_id)
     logging.info(
         f"Payment record {new_payment.payment_id} created for user {new_payment.user_id}"
     )
@@ -95,12 +102,18 @@ async def update_payment_status_by_db_id(
         yk_payment_id: Optional[str] = None) -> Optional[Payment]:
     payment = await get_payment_by_db_id(session, payment_db_id)
     if payment:
+        became_succeeded = new_status == "succeeded" and payment.status != "succeeded"
         payment.status = new_status
         payment.updated_at = func.now()
         if yk_payment_id and payment.yookassa_payment_id is None:
             payment.yookassa_payment_id = yk_payment_id
         await session.flush()
         await session.refresh(payment)
+        if became_succeeded:
+            await ad_dal.record_succeeded_payment(
+                session, payment.user_id, payment.payment_id, payment.amount)
+            await referral_dal.record_succeeded_payment(
+                session, payment.user_id, payment.payment_id)
         logging.info(
             f"Payment record {payment.payment_id} status updated to {new_status}."
         )
@@ -160,11 +173,17 @@ async def update_provider_payment_and_status(
         provider_payment_id: str, new_status: str) -> Optional[Payment]:
     payment = await get_payment_by_db_id(session, payment_db_id)
     if payment:
+        became_succeeded = new_status == "succeeded" and payment.status != "succeeded"
         payment.status = new_status
         payment.provider_payment_id = provider_payment_id
         payment.updated_at = func.now()
         await session.flush()
         await session.refresh(payment)
+        if became_succeeded:
+            await ad_dal.record_succeeded_payment(
+                session, payment.user_id, payment.payment_id, payment.amount)
+            await referral_dal.record_succeeded_payment(
+                session, payment.user_id, payment.payment_id)
         logging.info(
             f"Payment record {payment.payment_id} updated with provider id {provider_payment_id} and status {new_status}."
         )
@@ -1,8 +1,9 @@
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update, func, and_, or_
+from sqlalchemy import update, delete, func, and_, or_, exists, literal, true
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from datetime import datetime, timezone
 
 from db.models import PromoCode, PromoCodeActivation, User, Payment
@@ -20,6 +21,25 @@ async def create_promo_code(session: AsyncSession,
     return new_promo
 
 
+async def insert_promo_codes_skip_existing(
+        session: AsyncSession, promo_rows: List[Dict[str, Any]]) -> List[str]:
+    """Insert many promo codes in one statement; returns the codes actually inserted.
+
+    Rows whose code already exists are skipped (``ON CONFLICT (code) DO
+    NOTHING``), so the caller can top up the missing ones with new candidates.
+    """
+    if not promo_rows:
+        return []
+    stmt = (
+        pg_insert(PromoCode)
+        .values(promo_rows)
+        .on_conflict_do_nothing(index_elements=[PromoCode.code])
+        .returning(PromoCode.code)
+    )
+    result = await session.execute(stmt)
+    return [row[0] for row in result]
+
+
 async def get_promo_code_by_id(session: AsyncSession,
                                promo_code_id: int) -> Optional[PromoCode]:
     return await session.get(PromoCode, promo_code_id)
@@ -72,6 +92,15 @@ async def get_promo_codes_count(session: AsyncSession) -> int:
     return result.scalar_one()
 
 
+async def iter_all_promo_codes(session: AsyncSession,
+                               batch_size: int = 5000) -> AsyncIterator[str]:
+    """Stream every promo code string (any status) without loading the rows."""
+    result = await session.stream_scalars(
+        select(PromoCode.code).execution_options(yield_per=batch_size))
+    async for code in result:
+        yield code
+
+
 async def get_promo_activations_by_code_id(session: AsyncSession, promo_code_id: int, limit: Optional[int] = None, offset: int = 0) -> List[PromoCodeActivation]:
     """Get activation history for a specific promo code with optional pagination."""
     stmt = (select(PromoCodeActivation)
@@ -119,19 +148,109 @@ async def delete_promo_code(session: AsyncSession, promo_id: int) -> Optional[Pr
 
 async def increment_promo_code_usage(
         session: AsyncSession, promo_code_id: int) -> Optional[PromoCode]:
+    # Conditional UPDATE: the row lock serializes concurrent increments and the
+    # limit is re-checked against the latest value, so it cannot overshoot
+    result = await session.execute(
+        update(PromoCode)
+        .where(PromoCode.promo_code_id == promo_code_id,
+               PromoCode.current_activations < PromoCode.max_activations)
+        .values(current_activations=PromoCode.current_activations + 1)
+        .returning(PromoCode.promo_code_id))
+    if result.first() is None:
+        logging.warning(
+            f"Promo code ID {promo_code_id} not found or already reached max activations."
+        )
+        return None
     promo = await get_promo_code_by_id(session, promo_code_id)
     if promo:
-        if promo.current_activations < promo.max_activations:
-            promo.current_activations += 1
-            await session.flush()
-            await session.refresh(promo)
-            return promo
-        else:
-            logging.warning(
-                f"Promo code {promo.code} (ID: {promo_code_id}) already reached max activations."
-            )
-            return None
-    return None
+        await session.refresh(promo)
+    return promo
+
+
+async def activate_promo_code(
+        session: AsyncSession, code_str: str,
+        user_id: int) -> Tuple[str, Optional[int], Optional[int]]:
+    """Claim one activation of a promo code for a user in a single statement.
+
+    Increments ``current_activations`` only while it is below
+    ``max_activations`` and inserts the activation row in the same statement
+    (``ON CONFLICT DO NOTHING`` on uq_promo_user_activation). Returns
+    ``(status, promo_code_id, bonus_days)`` where status is ``"activated"``,
+    ``"already_used"`` or ``"unavailable"`` (unknown, inactive, expired or
+    exhausted). On ``"already_used"`` the counter was incremented by this
+    statement, so the caller must roll the transaction back.
+
+    The UPDATE row-locks the promo code until the transaction ends, so
+    commit the claim before any slow work (panel calls) and undo it with
+    `release_promo_activation` if that work fails.
+    """
+    now = datetime.now(timezone.utc)
+    claimed = (
+        update(PromoCode)
+        .where(
+            PromoCode.code == code_str.upper(),
+            PromoCode.is_active == True,
+            PromoCode.current_activations < PromoCode.max_activations,
+            or_(PromoCode.valid_until == None, PromoCode.valid_until > now),
+            ~exists().where(PromoCodeActivation.promo_code_id == PromoCode.promo_code_id,
+                            PromoCodeActivation.user_id == user_id),
+        )
+        .values(current_activations=PromoCode.current_activations + 1)
+        .returning(PromoCode.promo_code_id, PromoCode.bonus_days)
+        .cte("claimed")
+    )
+    inserted = (
+        pg_insert(PromoCodeActivation)
+        .from_select(
+            ["promo_code_id", "user_id", "activated_at"],
+            select(claimed.c.promo_code_id, literal(user_id), literal(now)))
+        .on_conflict_do_nothing(constraint="uq_promo_user_activation")
+        .returning(PromoCodeActivation.activation_id)
+        .cte("inserted")
+    )
+    stmt = (
+        select(claimed.c.promo_code_id, claimed.c.bonus_days, inserted.c.activation_id)
+        .select_from(claimed.outerjoin(inserted, true()))
+    )
+    row = (await session.execute(stmt)).first()
+    if row is None:
+        # Nothing was changed; tell an earlier activation apart from an unusable code
+        promo = await get_promo_code_by_code(session, code_str)
+        if promo and await get_user_activation_for_promo(session, promo.promo_code_id, user_id):
+            return "already_used", promo.promo_code_id, promo.bonus_days
+        return "unavailable", None, None
+    if row.activation_id is None:
+        # A concurrent request of the same user inserted the activation first
+        return "already_used", row.promo_code_id, row.bonus_days
+    logging.info(
+        f"Promo code {row.promo_code_id} activated by user {user_id}. Activation ID: {row.activation_id}"
+    )
+    return "activated", row.promo_code_id, row.bonus_days
+
+
+async def release_promo_activation(session: AsyncSession, promo_code_id: int,
+                                   user_id: int) -> bool:
+    """Undo a committed `activate_promo_code` claim: delete the activation row
+    and give the activation back, in one statement. Returns False if there was
+    nothing to release."""
+    removed = (
+        delete(PromoCodeActivation)
+        .where(PromoCodeActivation.promo_code_id == promo_code_id,
+               PromoCodeActivation.user_id == user_id)
+        .returning(PromoCodeActivation.promo_code_id)
+        .cte("removed")
+    )
+    stmt = (
+        update(PromoCode)
+        .where(PromoCode.promo_code_id.in_(select(removed.c.promo_code_id)),
+               PromoCode.current_activations > 0)
+        .values(current_activations=PromoCode.current_activations - 1)
+        .returning(PromoCode.promo_code_id)
+    )
+    released = (await session.execute(stmt)).first() is not None
+    if released:
+        logging.info(f"Promo code {promo_code_id} activation by user {user_id} released.")
+    return released
 
 
 async def get_user_activation_for_promo(
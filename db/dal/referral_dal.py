@@ -0,0 +1,155 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..models import Payment, ReferralCounters, User
+
+EMPTY_COUNTERS: Dict[str, int] = {"invited": 0, "purchased": 0, "bonus_days_earned": 0}
+
+# Referee aggregates the counters are derived from; bonus days have no
+# source table, so repairs keep the stored value.
+_DERIVED_COUNTERS_SQL = """
+    SELECT u.referred_by_id AS inviter_id,
+           COUNT(*) AS invited,
+           COUNT(*) FILTER (WHERE EXISTS (
+               SELECT 1 FROM payments p
+               WHERE p.user_id = u.user_id AND p.status = 'succeeded'
+           )) AS purchased
+    FROM users u
+    WHERE u.referred_by_id IS NOT NULL
+    GROUP BY u.referred_by_id
+"""
+
+
+async def bump_referral_counters(session: AsyncSession, inviter_id: int, *,
+                                 invited: int = 0, purchased: int = 0,
+                                 bonus_days: int = 0) -> None:
+    """Add deltas to an inviter's counters row, creating it if missing."""
+    insert_stmt = pg_insert(ReferralCounters).values(
+        inviter_id=inviter_id, invited=invited, purchased=purchased,
+        bonus_days_earned=bonus_days)
+    counters = ReferralCounters.__table__.c
+    await session.execute(insert_stmt.on_conflict_do_update(
+        index_elements=[ReferralCounters.inviter_id],
+        set_={
+            "invited": counters.invited + insert_stmt.excluded.invited,
+            "purchased": counters.purchased + insert_stmt.excluded.purchased,
+            "bonus_days_earned": counters.bonus_days_earned + insert_stmt.excluded.bonus_days_earned,
+            "updated_at": func.now(),
+        },
+    ))
+
+
+async def _has_succeeded_payment(session: AsyncSession, user_id: int,
+                                 exclude_payment_id: Optional[int] = None) -> bool:
+    stmt = select(Payment.payment_id).where(
+        Payment.user_id == user_id, Payment.status == "succeeded")
+    if exclude_payment_id is not None:
+        stmt = stmt.where(Payment.payment_id != exclude_payment_id)
+    return (await session.execute(stmt.limit(1))).first() is not None
+
+
+async def record_referee_attached(session: AsyncSession, referee_id: int,
+                                  inviter_id: int) -> None:
+    """Count a user who was just attributed to an inviter."""
+    purchased = 1 if await _has_succeeded_payment(session, referee_id) else 0
+    await bump_referral_counters(session, inviter_id, invited=1, purchased=purchased)
+
+
+async def record_referee_detached(session: AsyncSession, referee_id: int,
+                                  inviter_id: int) -> None:
+    """Reverse `record_referee_attached` when a user's inviter is replaced or cleared."""
+    purchased = 1 if await _has_succeeded_payment(session, referee_id) else 0
+    await bump_referral_counters(session, inviter_id, invited=-1, purchased=-purchased)
+
+
+async def record_succeeded_payment(session: AsyncSession, user_id: int,
+                                   payment_id: int) -> None:
+    """Count the referee's first succeeded payment towards their inviter."""
+    inviter_id = (await session.execute(
+        select(User.referred_by_id).where(User.user_id == user_id)
+    )).scalar_one_or_none()
+    if inviter_id is None:
+        return
+    if await _has_succeeded_payment(session, user_id, exclude_payment_id=payment_id):
+        return
+    await bump_referral_counters(session, inviter_id, purchased=1)
+
+
+async def get_referral_counters(session: AsyncSession, inviter_id: int) -> Dict[str, int]:
+    row = (await session.execute(
+        select(ReferralCounters.invited, ReferralCounters.purchased,
+               ReferralCounters.bonus_days_earned)
+        .where(ReferralCounters.inviter_id == inviter_id)
+    )).first()
+    if row is None:
+        return dict(EMPTY_COUNTERS)
+    return {"invited": row[0], "purchased": row[1], "bonus_days_earned": row[2]}
+
+
+async def get_top_referrers(session: AsyncSession, limit: int = 10) -> List[Dict[str, Any]]:
+    """Inviters ordered by paying referees, then by invited users."""
+    stmt = (
+        select(ReferralCounters, User.username, User.first_name)
+        .join(User, User.user_id == ReferralCounters.inviter_id)
+        .where(ReferralCounters.invited > 0)
+        .order_by(ReferralCounters.purchased.desc(), ReferralCounters.invited.desc())
+        .limit(limit)
+    )
+    return [
+        {
+            "user_id": counters.inviter_id,
+            "username": username,
+            "first_name": first_name,
+            "invited": counters.invited,
+            "purchased": counters.purchased,
+            "bonus_days_earned": counters.bonus_days_earned,
+        }
+        for counters, username, first_name in (await session.execute(stmt)).all()
+    ]
+
+
+async def find_counter_drift(session: AsyncSession) -> List[Dict[str, int]]:
+    """Inviters whose stored invited/purchased differ from the users and payments tables."""
+    result = await session.execute(text(f"""
+        SELECT COALESCE(d.inviter_id, c.inviter_id),
+               COALESCE(c.invited, 0), COALESCE(d.invited, 0),
+               COALESCE(c.purchased, 0), COALESCE(d.purchased, 0)
+        FROM ({_DERIVED_COUNTERS_SQL}) d
+        FULL JOIN referral_counters c ON c.inviter_id = d.inviter_id
+        WHERE COALESCE(c.invited, 0) <> COALESCE(d.invited, 0)
+           OR COALESCE(c.purchased, 0) <> COALESCE(d.purchased, 0)
+        ORDER BY 1
+    """))
+    return [
+        {"inviter_id": row[0], "invited": row[1], "expected_invited": row[2],
+         "purchased": row[3], "expected_purchased": row[4]}
+        for row in result.all()
+    ]
+
+
+async def rebuild_referral_counters(session: AsyncSession) -> int:
+    """Recompute invited/purchased for every inviter; returns the number of rows changed."""
+    upserted = await session.execute(text(f"""
+        INSERT INTO referral_counters (inviter_id, invited, purchased)
+        SELECT inviter_id, invited, purchased FROM ({_DERIVED_COUNTERS_SQL}) d
+        ON CONFLICT (inviter_id) DO UPDATE
+        SET invited = EXCLUDED.invited, purchased = EXCLUDED.purchased, updated_at = now()
+        WHERE referral_counters.invited <> EXCLUDED.invited
+           OR referral_counters.purchased <> EXCLUDED.purchased
+        RETURNING inviter_id
+    """))
+    changed = len(upserted.all())
+    zeroed = await session.execute(text("""
+        UPDATE referral_counters c
+        SET invited = 0, purchased = 0, updated_at = now()
+        WHERE (c.invited <> 0 OR c.purchased <> 0)
+          AND NOT EXISTS (SELECT 1 FROM users u WHERE u.referred_by_id = c.inviter_id)
+    """))
+    changed += zeroed.rowcount or 0
+    logging.info(f"Referral counters rebuilt: {changed} row(s) changed.")
+    return changed
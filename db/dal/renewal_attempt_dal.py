@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, delete, exists, func, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..models import Subscription, SubscriptionRenewalAttempt, UserPaymentMethod
+
+STATUS_CHARGING = "charging"
+STATUS_INITIATED = "initiated"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_DECLINED = "declined"
+STATUS_FAILED = "failed"
+
+# Attempts in these states block a new charge for the same period
+BLOCKING_STATUSES = (STATUS_CHARGING, STATUS_INITIATED, STATUS_SUCCEEDED)
+
+
+async def lock_due_subscriptions(session: AsyncSession, due_from: datetime,
+                                 due_until: datetime, now: datetime,
+                                 retry_delays_hours: Sequence[float],
+                                 limit: int) -> List[Tuple[Subscription, int]]:
+    """Lock subscriptions that are due for a renewal charge now.
+
+    Returns (subscription, attempts made for its current end date). Only
+    auto-renew subscriptions ending in [due_from, due_until] whose user has
+    a default YooKassa method are considered, and the attempt checks run
+    before the LIMIT: no attempt for this period may be in flight or have
+    succeeded, retries must be left, and the last attempt must be at least
+    its retry delay old. Rows locked by another scheduler instance are
+    skipped rather than waited on.
+    """
+    attempts = (
+        select(
+            SubscriptionRenewalAttempt.subscription_id,
+            SubscriptionRenewalAttempt.period_end,
+            func.count().label("made"),
+            func.count().filter(
+                SubscriptionRenewalAttempt.status.in_(BLOCKING_STATUSES)).label("blocking"),
+            func.max(func.coalesce(SubscriptionRenewalAttempt.updated_at,
+                                   SubscriptionRenewalAttempt.created_at)).label("last_at"),
+        )
+        .where(SubscriptionRenewalAttempt.period_end >= due_from)
+        .group_by(SubscriptionRenewalAttempt.subscription_id,
+                  SubscriptionRenewalAttempt.period_end)
+        .subquery()
+    )
+    made = func.coalesce(attempts.c.made, 0)
+    eligible = [made == 0]
+    if retry_delays_hours:
+        retry_after = case(
+            *[(attempts.c.made == attempt_no, now - timedelta(hours=delay))
+              for attempt_no, delay in enumerate(retry_delays_hours, start=1)])
+        eligible.append(attempts.c.last_at <= retry_after)
+    has_saved_method = exists().where(
+        UserPaymentMethod.user_id == Subscription.user_id,
+        UserPaymentMethod.provider == "yookassa",
+        UserPaymentMethod.is_default == True,
+    )
+    stmt = (
+        select(Subscription, made)
+        .outerjoin(attempts, (attempts.c.subscription_id == Subscription.subscription_id)
+                   & (attempts.c.period_end == Subscription.end_date))
+        .where(
+            Subscription.is_active == True,
+            Subscription.auto_renew_enabled == True,
+            Subscription.end_date >= due_from,
+            Subscription.end_date <= due_until,
+            or_(Subscription.provider.is_(None), Subscription.provider != "tribute"),
+            has_saved_method,
+            func.coalesce(attempts.c.blocking, 0) == 0,
+            made <= len(retry_delays_hours),
+            or_(*eligible),
+        )
+        .order_by(Subscription.end_date)
+        .limit(limit)
+        .with_for_update(of=Subscription, skip_locked=True)
+    )
+    return [(sub, attempts_made) for sub, attempts_made in (await session.execute(stmt)).all()]
+
+
+async def create_attempt(session: AsyncSession, subscription_id: int, period_end: datetime,
+                         attempt_no: int, idempotence_key: str) -> SubscriptionRenewalAttempt:
+    attempt = SubscriptionRenewalAttempt(
+        subscription_id=subscription_id,
+        period_end=period_end,
+        attempt_no=attempt_no,
+        status=STATUS_CHARGING,
+        idempotence_key=idempotence_key,
+    )
+    session.add(attempt)
+    await session.flush()
+    return attempt
+
+
+async def delete_attempt(session: AsyncSession, attempt_id: int) -> None:
+    await session.execute(
+        delete(SubscriptionRenewalAttempt)
+        .where(SubscriptionRenewalAttempt.attempt_id == attempt_id))
+
+
+async def update_attempt(session: AsyncSession, attempt_id: int, **values: Any) -> None:
+    await session.execute(
+        update(SubscriptionRenewalAttempt)
+        .where(SubscriptionRenewalAttempt.attempt_id == attempt_id)
+        .values(**values))
+
+
+async def get_unresolved_attempts(session: AsyncSession, created_before: datetime,
+                                  limit: int = 100) -> List[SubscriptionRenewalAttempt]:
+    """Attempts whose charge outcome is still unknown (no webhook arrived yet)."""
+    stmt = (
+        select(SubscriptionRenewalAttempt)
+        .where(
+            SubscriptionRenewalAttempt.status.in_((STATUS_CHARGING, STATUS_INITIATED)),
+            SubscriptionRenewalAttempt.created_at < created_before,
+        )
+        .order_by(SubscriptionRenewalAttempt.created_at)
+        .limit(limit)
+    )
+    return list((await session.execute(stmt)).scalars().all())
+
+
+async def get_subscription(session: AsyncSession, subscription_id: int) -> Optional[Subscription]:
+    return await session.get(Subscription, subscription_id)
@@ -1,8 +1,8 @@
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update, delete, func, and_, or_
+from sqlalchemy import update, delete, func, and_, or_, tuple_
 from sqlalchemy.orm import selectinload
 from datetime import datetime, timezone, timedelta
 
@@ -192,26 +192,81 @@ async def has_any_subscription_for_user(session: AsyncSession,
     return result.scalar_one_or_none() is not None
 
 
+def _not_notified_in_bucket(notified_before_hours: int):
+    """No reminder sent within `notified_before_hours` of the end date (the current bucket)."""
+    return or_(Subscription.last_notification_sent == None,
+               Subscription.last_notification_sent < (
+                   Subscription.end_date - timedelta(hours=notified_before_hours)))
+
+
 async def get_subscriptions_near_expiration(
-        session: AsyncSession, days_threshold: int) -> List[Subscription]:
+        session: AsyncSession,
+        days_threshold: int,
+        *,
+        window_from: Optional[datetime] = None,
+        notified_before_hours: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        limit: Optional[int] = None) -> List[Subscription]:
+    """Active, notifiable subscriptions ending within `days_threshold` days.
+
+    By default a subscription is skipped if it was notified today. With
+    `notified_before_hours` it is skipped if it was notified within that many
+    hours of its end date, i.e. in the current reminder bucket. `after` and
+    `limit` page through the result by (end_date, subscription_id).
+    """
     now_utc = datetime.now(timezone.utc)
     threshold_date = now_utc + timedelta(days=days_threshold)
 
+    if notified_before_hours is None:
+        not_notified = or_(Subscription.last_notification_sent == None,
+                           func.date(Subscription.last_notification_sent) < func.date(now_utc))
+    else:
+        not_notified = _not_notified_in_bucket(notified_before_hours)
+
     stmt = (select(Subscription).join(Subscription.user).where(
         Subscription.is_active == True,
         Subscription.skip_notifications == False,
-        Subscription.end_date > now_utc,
+        Subscription.end_date > (window_from or now_utc),
         Subscription.end_date <= threshold_date,
-        or_(
-            Subscription.last_notification_sent == None,
-            func.date(Subscription.last_notification_sent)
-            < func.date(now_utc))).order_by(
-                Subscription.end_date.asc()).options(
+        not_notified).order_by(
+                Subscription.end_date.asc(),
+                Subscription.subscription_id.asc()).options(
                     selectinload(Subscription.user)))
+    if after is not None:
+        stmt = stmt.where(
+            tuple_(Subscription.end_date, Subscription.subscription_id) > tuple_(*after))
+    if limit is not None:
+        stmt = stmt.limit(limit)
     result = await session.execute(stmt)
     return result.scalars().all()
 
 
+async def mark_subscriptions_notified(session: AsyncSession,
+                                      subscription_ids: List[int],
+                                      notification_time: datetime,
+                                      *,
+                                      notified_before_hours: Optional[int] = None) -> List[int]:
+    """Set last_notification_sent; returns the ids that were updated.
+
+    With `notified_before_hours` only subscriptions not yet notified in the
+    current bucket are updated (same predicate as
+    `get_subscriptions_near_expiration`). The row lock makes this a claim:
+    of two concurrent senders (local notifier, panel webhook) only one gets
+    the id back.
+    """
+    if not subscription_ids:
+        return []
+    stmt = (update(Subscription)
+            .where(Subscription.subscription_id.in_(subscription_ids))
+            .values(last_notification_sent=notification_time)
+            .returning(Subscription.subscription_id)
+            .execution_options(synchronize_session="fetch"))
+    if notified_before_hours is not None:
+        stmt = stmt.where(_not_notified_in_bucket(notified_before_hours))
+    result = await session.execute(stmt)
+    return [row[0] for row in result.all()]
+
+
 async def update_subscription_notification_time(
         session: AsyncSession, subscription_id: int,
         notification_time: datetime) -> Optional[Subscription]:
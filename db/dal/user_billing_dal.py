@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Set, Sequence
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 from sqlalchemy.sql import func
@@ -122,6 +122,18 @@ async def get_user_default_payment_method(session: AsyncSession, user_id: int, p
     return result.scalar_one_or_none()
 
 
+async def get_users_with_default_payment_method(session: AsyncSession, user_ids: Sequence[int], provider: str = "yookassa") -> Set[int]:
+    if not user_ids:
+        return set()
+    stmt = select(UserPaymentMethod.user_id).where(
+        UserPaymentMethod.user_id.in_(list(user_ids)),
+        UserPaymentMethod.provider == provider,
+        UserPaymentMethod.is_default == True,
+    )
+    result = await session.execute(stmt)
+    return set(result.scalars().all())
+
+
 async def set_user_default_payment_method(session: AsyncSession, user_id: int, method_id: int) -> bool:
     methods = await list_user_payment_methods(session, user_id)
     if not any(m.method_id == method_id for m in methods):
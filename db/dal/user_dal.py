@@ -3,11 +3,12 @@ from typing import Optional, List, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from sqlalchemy import update, delete, func, and_
+from sqlalchemy import update, delete, func, and_, or_, case, literal, union_all
 from datetime import datetime, timezone
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from ..models import User, Subscription
+from ..models import User, Subscription, Payment
+from . import referral_dal
 
 
 async def get_user_by_id(session: AsyncSession, user_id: int) -> Optional[User]:
@@ -60,6 +61,9 @@ async def create_user(session: AsyncSession, user_data: Dict[str, Any]) -> Tuple
     user = await get_user_by_id(session, user_id)
 
     if created and user is not None:
+        if user.referred_by_id:
+            await referral_dal.record_referee_attached(
+                session, user.user_id, user.referred_by_id)
         logging.info(
             f"New user {user.user_id} created in DAL. Referred by: {user.referred_by_id or 'N/A'}."
         )
@@ -71,15 +75,112 @@ async def create_user(session: AsyncSession, user_data: Dict[str, Any]) -> Tuple
     return user, created
 
 
+# Ranking of search candidates; trigram matches score up to SCORE_NAME_MATCH
+SCORE_EXACT_ID = 1.0
+SCORE_EXACT_USERNAME = 0.98
+SCORE_PAYMENT = 0.95
+SCORE_UUID_PREFIX = 0.9
+SCORE_NAME_MATCH = 0.8
+SCORE_USERNAME_PREFIX = 0.5
+
+
+async def search_users(
+    session: AsyncSession,
+    *,
+    user_id: Optional[int] = None,
+    payment_id: Optional[int] = None,
+    provider_payment_id: Optional[str] = None,
+    uuid_prefix: Optional[str] = None,
+    name: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 10,
+) -> Tuple[List[Tuple[User, float]], int]:
+    """Ranked admin search over several keys in a single query.
+
+    Each given key contributes a candidate set (exact id, payment id,
+    provider payment id, panel UUID prefix, trigram match on lowercased
+    username / first name, or a username prefix for names shorter than a
+    trigram). A user matched by several keys keeps its best score.
+    Returns one page of (user, score) and the total number of matches.
+    """
+    candidates = []
+    if user_id is not None:
+        candidates.append(select(User.user_id.label("user_id"), literal(SCORE_EXACT_ID).label("score"))
+                          .where(User.user_id == user_id))
+    if payment_id is not None:
+        candidates.append(select(Payment.user_id, literal(SCORE_PAYMENT))
+                          .where(Payment.payment_id == payment_id))
+    if provider_payment_id:
+        candidates.append(select(Payment.user_id, literal(SCORE_PAYMENT)).where(
+            or_(Payment.yookassa_payment_id == provider_payment_id,
+                Payment.provider_payment_id == provider_payment_id)))
+    if uuid_prefix:
+        candidates.append(select(User.user_id, literal(SCORE_UUID_PREFIX))
+                          .where(User.panel_user_uuid.startswith(uuid_prefix, autoescape=True)))
+    if name:
+        name = name.lower()
+        username_lower = func.lower(User.username)
+        first_name_lower = func.lower(User.first_name)
+        if len(name) >= 3:
+            # Served by the pg_trgm GIN indexes on lower(username) / lower(first_name)
+            similarity = func.greatest(func.coalesce(func.similarity(username_lower, name), 0),
+                                       func.coalesce(func.similarity(first_name_lower, name), 0))
+            candidates.append(select(
+                User.user_id,
+                case((username_lower == name, SCORE_EXACT_USERNAME),
+                     else_=SCORE_NAME_MATCH * similarity),
+            ).where(or_(
+                username_lower.op("%")(name),
+                first_name_lower.op("%")(name),
+                username_lower.contains(name, autoescape=True),
+                first_name_lower.contains(name, autoescape=True),
+            )))
+        else:
+            candidates.append(select(
+                User.user_id,
+                case((username_lower == name, SCORE_EXACT_USERNAME), else_=SCORE_USERNAME_PREFIX),
+            ).where(username_lower.startswith(name, autoescape=True)))
+    if not candidates:
+        return [], 0
+
+    matched = union_all(*candidates).subquery("matched")
+    ranked = (
+        select(matched.c.user_id, func.max(matched.c.score).label("score"))
+        .group_by(matched.c.user_id)
+        .subquery("ranked")
+    )
+    stmt = (
+        select(User, ranked.c.score, func.count().over().label("total"))
+        .join(ranked, ranked.c.user_id == User.user_id)
+        .order_by(ranked.c.score.desc(), User.user_id.desc())
+        .offset(max(0, offset))
+        .limit(max(1, limit))
+    )
+    rows = (await session.execute(stmt)).all()
+    if not rows:
+        if offset > 0:
+            # Page past the end: the window count is only known from a non-empty page
+            return [], int((await session.execute(
+                select(func.count()).select_from(ranked))).scalar() or 0)
+        return [], 0
+    return [(user, float(score or 0.0)) for user, score, _ in rows], int(rows[0][2])
+
+
 async def update_user(
     session: AsyncSession, user_id: int, update_data: Dict[str, Any]
 ) -> Optional[User]:
     user = await get_user_by_id(session, user_id)
     if user:
+        previous_referrer = user.referred_by_id
         for key, value in update_data.items():
             setattr(user, key, value)
         await session.flush()
         await session.refresh(user)
+        if user.referred_by_id != previous_referrer:
+            if previous_referrer:
+                await referral_dal.record_referee_detached(session, user.user_id, previous_referrer)
+            if user.referred_by_id:
+                await referral_dal.record_referee_attached(session, user.user_id, user.referred_by_id)
     return user
 
 
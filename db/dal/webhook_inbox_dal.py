@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import and_, delete, func, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..models import WebhookEventFingerprint, WebhookInboxEvent
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_DONE = "done"
+STATUS_DEAD = "dead"
+
+
+async def insert_event(session: AsyncSession, provider: str, event_id: str,
+                       payload: str) -> bool:
+    """Store a received webhook. Returns False when the event is a duplicate."""
+    stmt = (
+        pg_insert(WebhookInboxEvent)
+        .values(provider=provider, event_id=event_id, payload=payload,
+                status=STATUS_PENDING, attempts=0,
+                next_attempt_at=datetime.now(timezone.utc))
+        .on_conflict_do_nothing(constraint="uq_webhook_inbox_provider_event")
+        .returning(WebhookInboxEvent.event_pk)
+    )
+    result = await session.execute(stmt)
+    return result.first() is not None
+
+
+async def claim_due_events(session: AsyncSession, limit: int,
+                           lock_seconds: float) -> List[WebhookInboxEvent]:
+    """Lock up to `limit` due events for this worker.
+
+    Rows left in `processing` by a crashed worker become claimable again once
+    `locked_until` passes. `SKIP LOCKED` lets several workers (or bot
+    instances) claim disjoint batches.
+    """
+    now = datetime.now(timezone.utc)
+    stmt = (
+        select(WebhookInboxEvent)
+        .where(
+            or_(
+                and_(WebhookInboxEvent.status == STATUS_PENDING,
+                     WebhookInboxEvent.next_attempt_at <= now),
+                and_(WebhookInboxEvent.status == STATUS_PROCESSING,
+                     WebhookInboxEvent.locked_until < now),
+            )
+        )
+        .order_by(WebhookInboxEvent.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    events = list((await session.execute(stmt)).scalars().all())
+    locked_until = now + timedelta(seconds=lock_seconds)
+    for event in events:
+        event.status = STATUS_PROCESSING
+        event.locked_until = locked_until
+    await session.flush()
+    return events
+
+
+async def mark_done(session: AsyncSession, event_pk: int) -> None:
+    await session.execute(
+        update(WebhookInboxEvent)
+        .where(WebhookInboxEvent.event_pk == event_pk)
+        .values(status=STATUS_DONE, locked_until=None, last_error=None,
+                attempts=WebhookInboxEvent.attempts + 1,
+                processed_at=datetime.now(timezone.utc)))
+
+
+async def mark_failed(session: AsyncSession, event_pk: int, error: str,
+                      retry_at: Optional[datetime]) -> None:
+    """Schedule a retry at `retry_at`, or move the event to dead-letter when it is None."""
+    values = {
+        "attempts": WebhookInboxEvent.attempts + 1,
+        "locked_until": None,
+        "last_error": error[:2000],
+    }
+    if retry_at is None:
+        values.update(status=STATUS_DEAD, processed_at=datetime.now(timezone.utc))
+    else:
+        values.update(status=STATUS_PENDING, next_attempt_at=retry_at)
+    await session.execute(
+        update(WebhookInboxEvent)
+        .where(WebhookInboxEvent.event_pk == event_pk)
+        .values(**values))
+
+
+async def get_dead_events(session: AsyncSession, limit: int = 20,
+                          offset: int = 0) -> List[WebhookInboxEvent]:
+    stmt = (
+        select(WebhookInboxEvent)
+        .where(WebhookInboxEvent.status == STATUS_DEAD)
+        .order_by(WebhookInboxEvent.created_at.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    return list((await session.execute(stmt)).scalars().all())
+
+
+async def count_by_status(session: AsyncSession) -> dict:
+    stmt = (
+        select(WebhookInboxEvent.status, func.count())
+        .group_by(WebhookInboxEvent.status)
+    )
+    return {status: count for status, count in (await session.execute(stmt)).all()}
+
+
+async def requeue_dead_event(session: AsyncSession, event_pk: int) -> bool:
+    result = await session.execute(
+        update(WebhookInboxEvent)
+        .where(WebhookInboxEvent.event_pk == event_pk,
+               WebhookInboxEvent.status == STATUS_DEAD)
+        .values(status=STATUS_PENDING, attempts=0, processed_at=None,
+                next_attempt_at=datetime.now(timezone.utc)))
+    return result.rowcount > 0
+
+
+async def delete_done_before(session: AsyncSession, cutoff: datetime) -> int:
+    result = await session.execute(
+        delete(WebhookInboxEvent)
+        .where(WebhookInboxEvent.status == STATUS_DONE,
+               WebhookInboxEvent.processed_at < cutoff))
+    return result.rowcount or 0
+
+
+async def claim_fingerprint(session: AsyncSession, fingerprint: str,
+                            ttl_seconds: float) -> bool:
+    """Record an event fingerprint in the current transaction.
+
+    Returns False when a live (unexpired) record already exists. The claim
+    only becomes visible to others on commit, so a rolled back attempt can
+    be retried; a concurrent claim of the same fingerprint waits on the row
+    lock and then sees it as taken.
+    """
+    now = datetime.now(timezone.utc)
+    insert_stmt = pg_insert(WebhookEventFingerprint).values(
+        fingerprint=fingerprint,
+        expires_at=now + timedelta(seconds=ttl_seconds),
+        created_at=now,
+    )
+    stmt = (
+        insert_stmt.on_conflict_do_update(
+            index_elements=[WebhookEventFingerprint.fingerprint],
+            set_={"expires_at": insert_stmt.excluded.expires_at,
+                  "created_at": insert_stmt.excluded.created_at},
+            where=WebhookEventFingerprint.expires_at <= now,
+        )
+        .returning(WebhookEventFingerprint.fingerprint)
+    )
+    result = await session.execute(stmt)
+    return result.first() is not None
+
+
+async def delete_expired_fingerprints(session: AsyncSession) -> int:
+    result = await session.execute(
+        delete(WebhookEventFingerprint)
+        .where(WebhookEventFingerprint.expires_at <= datetime.now(timezone.utc)))
+    return result.rowcount or 0
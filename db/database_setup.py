@@ -1,12 +1,134 @@
 import logging
+import time
+from contextvars import ContextVar
+from typing import List, Optional
+from uuid import uuid4
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 
 from config.settings import Settings
-from .models import Base
-from .migrator import run_simple_migrations
+from .migrator import run_migrations, get_pending_migrations
+from bot.utils.metrics import (
+    DB_POOL_CHECKOUTS,
+    DB_POOL_CONNECTS,
+    DB_POOL_STATUS,
+    DB_POOL_CHECKOUT_WAIT,
+    DB_POOL_SLOW_CHECKOUTS,
+    DB_POOL_SATURATION,
+)
 
 async_engine = None
+replica_async_engine = None
+
+# Seconds spent opening new connections during the current checkout
+_checkout_connect_time: ContextVar[Optional[List[float]]] = ContextVar(
+    "checkout_connect_time", default=None)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait for a connection.
+
+    QueuePool._do_get retries by calling itself, so only the outermost call
+    is timed, and time spent opening a new connection is not counted as
+    waiting (it shows up in DB_POOL_CONNECTS instead).
+    """
+
+    slow_checkout_threshold: float = 0.5
+
+    def _do_get(self):
+        if _checkout_connect_time.get() is not None:
+            return super()._do_get()
+        connect_time = [0.0]
+        token = _checkout_connect_time.set(connect_time)
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        finally:
+            _checkout_connect_time.reset(token)
+        waited = max(0.0, time.perf_counter() - started - connect_time[0])
+        DB_POOL_CHECKOUT_WAIT.observe(waited)
+        if waited > self.slow_checkout_threshold:
+            DB_POOL_SLOW_CHECKOUTS.inc()
+            logging.warning(
+                f"DB pool: waited {waited:.3f}s for a connection "
+                f"(checked out: {self.checkedout()}, size: {self.size()}, overflow: {self.overflow()})"
+            )
+        return connection
+
+    def _create_connection(self):
+        connect_time = _checkout_connect_time.get()
+        started = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            if connect_time is not None:
+                connect_time[0] += time.perf_counter() - started
+
+
+def _build_engine_options(settings: Settings, database_url: str):
+    """Return (url, kwargs) for create_async_engine based on pool/PgBouncer settings."""
+    url = make_url(database_url)
+    connect_args = {}
+    if settings.DB_PGBOUNCER_MODE:
+        # Transaction pooling may hand us a different backend per transaction,
+        # so neither asyncpg nor SQLAlchemy may keep named prepared statements.
+        url = url.update_query_dict({"prepared_statement_cache_size": "0"})
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    else:
+        url = url.update_query_dict(
+            {"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)})
+        connect_args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+
+    InstrumentedQueuePool.slow_checkout_threshold = settings.DB_POOL_SLOW_CHECKOUT_SECONDS
+    options = dict(
+        echo=False,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+    return url, options
+
+
+def _instrument_pool(engine) -> None:
+    """Hook pool events into the metrics registry and sample pool state at scrape time."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.inc()
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        DB_POOL_CONNECTS.inc()
+
+    def _sample_pool():
+        pool = engine.pool
+        stats = {}
+        for state, method in (("size", "size"), ("checked_out", "checkedout"),
+                              ("overflow", "overflow"), ("checked_in", "checkedin")):
+            getter = getattr(pool, method, None)
+            if callable(getter):
+                stats[(state, )] = getter()
+        return stats
+
+    def _sample_saturation():
+        pool = engine.pool
+        capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+        if capacity <= 0:
+            return {}
+        return {(): pool.checkedout() / capacity}
+
+    DB_POOL_STATUS.set_callback(_sample_pool)
+    DB_POOL_SATURATION.set_callback(_sample_saturation)
 
 
 def init_db_connection(settings: Settings) -> sessionmaker:
@@ -16,11 +138,14 @@ def init_db_connection(settings: Settings) -> sessionmaker:
         logging.info(
             f"Attempting to create SQLAlchemy engine with URL: {settings.DATABASE_URL}"
         )
-        async_engine = create_async_engine(
-            settings.DATABASE_URL,
-            echo=False,
-            pool_pre_ping=True,
+        engine_url, engine_options = _build_engine_options(settings, settings.DATABASE_URL)
+        async_engine = create_async_engine(engine_url, **engine_options)
+        logging.info(
+            f"DB pool: size={settings.DB_POOL_SIZE}, max_overflow={settings.DB_MAX_OVERFLOW}, "
+            f"timeout={settings.DB_POOL_TIMEOUT}s, recycle={settings.DB_POOL_RECYCLE}s, "
+            f"pre_ping={settings.DB_POOL_PRE_PING}, pgbouncer_mode={settings.DB_PGBOUNCER_MODE}"
         )
+        _instrument_pool(async_engine)
 
     local_async_session_factory = async_sessionmaker(
         bind=async_engine,
@@ -35,6 +160,28 @@ def init_db_connection(settings: Settings) -> sessionmaker:
     return local_async_session_factory
 
 
+def init_replica_db_connection(settings: Settings) -> Optional[sessionmaker]:
+    """Create the read replica engine and session factory, or return None if no replica is configured."""
+    global replica_async_engine
+
+    replica_url = settings.database_replica_url
+    if not replica_url:
+        return None
+
+    if replica_async_engine is None:
+        engine_url, engine_options = _build_engine_options(settings, replica_url)
+        replica_async_engine = create_async_engine(engine_url, **engine_options)
+        logging.info(f"SQLAlchemy read replica engine configured for host {engine_url.host}.")
+
+    return async_sessionmaker(
+        bind=replica_async_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+
+
 async def get_async_session(session_factory: sessionmaker) -> AsyncSession:
 
     if session_factory is None:
@@ -61,10 +208,16 @@ async def init_db(settings: Settings, session_factory: sessionmaker):
             "async_engine is not initialized. Call init_db_connection and get session_factory first."
         )
 
-    async with async_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        # Run lightweight, idempotent migrations to add any missing columns
-        await conn.run_sync(run_simple_migrations)
+    if settings.DB_AUTO_MIGRATE:
+        await run_migrations(async_engine)
+    else:
+        pending = await get_pending_migrations(async_engine)
+        if pending:
+            pending_names = ", ".join(f"{m.version:04d}_{m.name}" for m in pending)
+            logging.warning(
+                f"DB_AUTO_MIGRATE is disabled and {len(pending)} migration(s) are pending: "
+                f"{pending_names}. Run `python -m db.migrator upgrade`."
+            )
     logging.info(
         "PostgreSQL database initialized/checked successfully using SQLAlchemy."
     )
@@ -1,11 +1,69 @@
+"""Versioned schema migrations.
+
+Applied versions are recorded in ``schema_migrations`` so a boot with an
+up-to-date schema costs a single query instead of inspecting every table.
+Migrations run at startup (see ``init_db``) or from the command line:
+
+    python -m db.migrator upgrade   # apply pending migrations
+    python -m db.migrator status    # list applied / pending versions
+
+Add new migrations to the end of ``MIGRATIONS`` with the next version number.
+Never edit a migration that has already been released.
+"""
+import argparse
+import asyncio
 import logging
-from typing import Set
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Set, Tuple
 
 from sqlalchemy import inspect, text
 from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
 
 from .models import Base
 
+# Serializes migration runs when several bot instances start at once
+MIGRATIONS_ADVISORY_LOCK_KEY = 734520193
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """Index built with CREATE INDEX CONCURRENTLY (no write lock on the table)."""
+    name: str
+    table: str
+    columns: Tuple[str, ...]
+    where: Optional[str] = None
+    using: Optional[str] = None
+    unique: bool = False
+
+    def create_sql(self) -> str:
+        unique = "UNIQUE " if self.unique else ""
+        using = f" USING {self.using}" if self.using else ""
+        where = f" WHERE {self.where}" if self.where else ""
+        return (f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {self.name} "
+                f"ON {self.table}{using} ({', '.join(self.columns)}){where}")
+
+
+@dataclass(frozen=True)
+class Migration:
+    """A single schema version.
+
+    ``run_sync`` and ``statements`` run inside one transaction together with
+    recording the version. ``concurrent_indexes`` must run outside a
+    transaction, so a migration uses either the transactional parts or
+    concurrent indexes, never both.
+    """
+    version: int
+    name: str
+    run_sync: Optional[Callable[[Connection], None]] = None
+    statements: Tuple[str, ...] = ()
+    concurrent_indexes: Tuple[IndexSpec, ...] = field(default_factory=tuple)
+
+    def __post_init__(self):
+        if self.concurrent_indexes and (self.run_sync or self.statements):
+            raise ValueError(
+                f"Migration {self.version} mixes concurrent indexes with transactional steps")
+
 
 def _add_missing_columns(connection: Connection) -> None:
     inspector = inspect(connection)
@@ -52,15 +110,272 @@ def _add_missing_columns(connection: Connection) -> None:
             connection.execute(text(ddl))
 
 
-def run_simple_migrations(connection: Connection) -> None:
-    """
-    Run lightweight, idempotent migrations:
-    - Ensure missing columns are added to existing tables to match models in db/models.py
-    Note: Table creation is handled separately via Base.metadata.create_all.
+def _create_tables(*table_names: str) -> Callable[[Connection], None]:
+    """Create the given model tables (with their indexes) if they don't exist."""
+
+    def run(connection: Connection) -> None:
+        for table_name in table_names:
+            Base.metadata.tables[table_name].create(connection, checkfirst=True)
+
+    return run
+
+
+def _bootstrap_schema(connection: Connection) -> None:
+    """Version 1: create tables and bring databases that predate versioning up to date.
+
+    Earlier releases synchronized columns on every boot; this runs that logic
+    one last time. Later schema changes must ship as their own migrations.
     """
+    Base.metadata.create_all(connection)
+    _add_missing_columns(connection)
+
+
+MIGRATIONS: Tuple[Migration, ...] = (
+    Migration(version=1, name="bootstrap_schema", run_sync=_bootstrap_schema),
+    Migration(
+        version=2,
+        name="hot_path_composite_indexes",
+        concurrent_indexes=(
+            IndexSpec("ix_payments_status_created_at", "payments",
+                      ("status", "created_at")),
+            IndexSpec("ix_subscriptions_user_active_end", "subscriptions",
+                      ("user_id", "is_active", "end_date")),
+            IndexSpec("ix_message_logs_target_user_timestamp", "message_logs",
+                      ("target_user_id", "timestamp")),
+        ),
+    ),
+    Migration(
+        version=3,
+        name="partial_hot_query_indexes",
+        concurrent_indexes=(
+            IndexSpec("ix_subscriptions_active_user_end_desc", "subscriptions",
+                      ("user_id", "end_date DESC"), where="is_active = true"),
+            IndexSpec("ix_subscriptions_notifiable_end_date", "subscriptions",
+                      ("end_date", ),
+                      where="is_active = true AND skip_notifications = false"),
+            IndexSpec("ix_users_referred_by_id", "users", ("referred_by_id", ),
+                      where="referred_by_id IS NOT NULL"),
+            IndexSpec("ix_payments_tribute_succeeded_user_created", "payments",
+                      ("user_id", "created_at DESC"),
+                      where="provider = 'tribute' AND status = 'succeeded'"),
+            IndexSpec("ix_payments_succeeded_user", "payments", ("user_id", ),
+                      where="status = 'succeeded'"),
+        ),
+    ),
+    Migration(version=4, name="webhook_inbox",
+              run_sync=_create_tables("webhook_inbox")),
+    Migration(version=5, name="webhook_event_fingerprints",
+              run_sync=_create_tables("webhook_event_fingerprints")),
+    Migration(version=6, name="subscription_renewal_attempts",
+              run_sync=_create_tables("subscription_renewal_attempts")),
+    Migration(
+        version=7,
+        name="auto_renew_due_index",
+        concurrent_indexes=(
+            IndexSpec("ix_subscriptions_auto_renew_end_date", "subscriptions",
+                      ("end_date", ),
+                      where="is_active = true AND auto_renew_enabled = true"),
+        ),
+    ),
+    Migration(
+        version=8,
+        name="ad_campaign_counters",
+        run_sync=_create_tables("ad_campaign_counters"),
+        statements=(
+            # Backfill from the same grouping ad_dal.get_campaigns_stats uses
+            """
+            INSERT INTO ad_campaign_counters (ad_campaign_id, starts, trials, payers, revenue)
+            SELECT c.ad_campaign_id,
+                   COALESCE(s.starts, 0), COALESCE(s.trials, 0),
+                   COALESCE(s.payers, 0), COALESCE(s.revenue, 0)
+            FROM ad_campaigns c
+            LEFT JOIN (
+                SELECT a.ad_campaign_id,
+                       COUNT(DISTINCT a.user_id) AS starts,
+                       COUNT(DISTINCT a.user_id) FILTER (WHERE a.trial_activated_at IS NOT NULL) AS trials,
+                       COUNT(DISTINCT p.user_id) AS payers,
+                       SUM(p.amount) AS revenue
+                FROM ad_attributions a
+                LEFT JOIN payments p ON p.user_id = a.user_id AND p.status = 'succeeded'
+                GROUP BY a.ad_campaign_id
+            ) s ON s.ad_campaign_id = c.ad_campaign_id
+            ON CONFLICT (ad_campaign_id) DO NOTHING
+            """,
+        ),
+    ),
+    Migration(
+        version=9,
+        name="referral_counters",
+        run_sync=_create_tables("referral_counters"),
+        statements=(
+            # Backfill from the aggregates referral_dal.rebuild_referral_counters uses;
+            # bonus days granted before this migration are not recorded anywhere
+            """
+            INSERT INTO referral_counters (inviter_id, invited, purchased)
+            SELECT u.referred_by_id,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE EXISTS (
+                       SELECT 1 FROM payments p
+                       WHERE p.user_id = u.user_id AND p.status = 'succeeded'
+                   ))
+            FROM users u
+            WHERE u.referred_by_id IS NOT NULL
+            GROUP BY u.referred_by_id
+            ON CONFLICT (inviter_id) DO NOTHING
+            """,
+        ),
+    ),
+    Migration(
+        version=10,
+        name="pg_trgm_extension",
+        # Trusted extension since PostgreSQL 13: the database owner can create it
+        statements=("CREATE EXTENSION IF NOT EXISTS pg_trgm", ),
+    ),
+    Migration(
+        version=11,
+        name="user_search_indexes",
+        concurrent_indexes=(
+            IndexSpec("ix_users_username_trgm", "users",
+                      ("lower(username) gin_trgm_ops", ), using="gin"),
+            IndexSpec("ix_users_first_name_trgm", "users",
+                      ("lower(first_name) gin_trgm_ops", ), using="gin"),
+            # Equality and short prefixes on lower(username)
+            IndexSpec("ix_users_username_lower_pattern", "users",
+                      ("lower(username) text_pattern_ops", )),
+            IndexSpec("ix_users_panel_uuid_pattern", "users",
+                      ("panel_user_uuid text_pattern_ops", ),
+                      where="panel_user_uuid IS NOT NULL"),
+        ),
+    ),
+    Migration(
+        version=12,
+        name="drop_redundant_subscription_user_index",
+        # ix_subscriptions_active_user_end_desc serves the same per-user lookups
+        statements=("DROP INDEX IF EXISTS ix_subscriptions_user_active_end", ),
+    ),
+)
+
+
+async def _ensure_version_table(conn: AsyncConnection) -> None:
+    await conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """))
+
+
+async def _applied_versions(conn: AsyncConnection) -> Set[int]:
+    result = await conn.execute(text("SELECT version FROM schema_migrations"))
+    return {row[0] for row in result}
+
+
+async def _record_version(conn: AsyncConnection, migration: Migration) -> None:
+    await conn.execute(
+        text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name) "
+             "ON CONFLICT (version) DO NOTHING"),
+        {"version": migration.version, "name": migration.name},
+    )
+
+
+async def _create_index_concurrently(conn: AsyncConnection, index: IndexSpec) -> None:
+    # A failed concurrent build leaves an INVALID index behind that
+    # IF NOT EXISTS would silently keep; drop it and build again.
+    invalid = await conn.execute(
+        text("SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+             "WHERE c.relname = :name AND NOT i.indisvalid"),
+        {"name": index.name},
+    )
+    if invalid.first() is not None:
+        logging.warning(f"Migrator: dropping invalid index {index.name} before rebuilding it")
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"))
+    logging.info(f"Migrator: creating index {index.name} on {index.table} concurrently")
+    await conn.execute(text(index.create_sql()))
+
+
+async def _apply_migration(engine: AsyncEngine, autocommit_conn: AsyncConnection,
+                           migration: Migration) -> None:
+    logging.info(f"Migrator: applying {migration.version:04d}_{migration.name}")
+    if migration.concurrent_indexes:
+        for index in migration.concurrent_indexes:
+            await _create_index_concurrently(autocommit_conn, index)
+        await _record_version(autocommit_conn, migration)
+        return
+
+    async with engine.begin() as tx_conn:
+        if migration.run_sync:
+            await tx_conn.run_sync(migration.run_sync)
+        for statement in migration.statements:
+            await tx_conn.execute(text(statement))
+        await _record_version(tx_conn, migration)
+
+
+async def get_pending_migrations(engine: AsyncEngine) -> List[Migration]:
+    async with engine.connect() as conn:
+        autocommit_conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await _ensure_version_table(autocommit_conn)
+        applied = await _applied_versions(autocommit_conn)
+    return [m for m in MIGRATIONS if m.version not in applied]
+
+
+async def run_migrations(engine: AsyncEngine) -> int:
+    """Apply all pending migrations in version order. Returns the number applied."""
+    applied_count = 0
+    async with engine.connect() as conn:
+        autocommit_conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await autocommit_conn.execute(text("SELECT pg_advisory_lock(:key)"),
+                                      {"key": MIGRATIONS_ADVISORY_LOCK_KEY})
+        try:
+            await _ensure_version_table(autocommit_conn)
+            applied = await _applied_versions(autocommit_conn)
+            for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+                if migration.version in applied:
+                    continue
+                try:
+                    await _apply_migration(engine, autocommit_conn, migration)
+                except Exception as e:
+                    logging.error(
+                        f"Migrator: migration {migration.version:04d}_{migration.name} failed: {e}",
+                        exc_info=True)
+                    raise
+                applied_count += 1
+        finally:
+            await autocommit_conn.execute(text("SELECT pg_advisory_unlock(:key)"),
+                                          {"key": MIGRATIONS_ADVISORY_LOCK_KEY})
+    if applied_count:
+        logging.info(f"Migrator: applied {applied_count} migration(s).")
+    else:
+        logging.info("Migrator: schema is up to date.")
+    return applied_count
+
+
+async def _cli(command: str) -> None:
+    from dotenv import load_dotenv
+    from config.settings import get_settings
+    from . import database_setup
+
+    load_dotenv()
+    settings = get_settings()
+    database_setup.init_db_connection(settings)
+    engine = database_setup.async_engine
     try:
-        _add_missing_columns(connection)
-        logging.info("Migrator: schema synchronized (columns added as needed).")
-    except Exception as e:
-        logging.error(f"Migrator: failed to run simple migrations: {e}", exc_info=True)
-        raise
+        if command == "status":
+            pending = {m.version for m in await get_pending_migrations(engine)}
+            for migration in MIGRATIONS:
+                state = "pending" if migration.version in pending else "applied"
+                print(f"{migration.version:04d}_{migration.name}: {state}")
+        else:
+            await run_migrations(engine)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Database schema migrations")
+    parser.add_argument("command", nargs="?", default="upgrade",
+                        choices=("upgrade", "status"))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(_cli(args.command))
@@ -1,7 +1,7 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Float, ForeignKey, UniqueConstraint, Text, BigInteger
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Float, ForeignKey, UniqueConstraint, Text, BigInteger, Index
 from sqlalchemy.orm import relationship, DeclarativeBase
 from sqlalchemy.ext.asyncio import AsyncAttrs
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from datetime import datetime
 
 
@@ -45,6 +45,14 @@ class User(Base):
         back_populates="target_user",
         cascade="all, delete-orphan")
 
+    # The admin search indexes (pg_trgm GIN and text_pattern_ops on
+    # username / first_name / panel_user_uuid) exist only in migration 11,
+    # since create_all would run before the pg_trgm extension is created.
+    __table_args__ = (
+        Index("ix_users_referred_by_id", "referred_by_id",
+              postgresql_where=text("referred_by_id IS NOT NULL")),
+    )
+
     def __repr__(self):
         return f"<User(user_id={self.user_id}, username='{self.username}')>"
 
@@ -76,6 +84,18 @@ class Subscription(Base):
 
     user = relationship("User", back_populates="subscriptions")
 
+    __table_args__ = (
+        # get_active_subscription_by_user_id: user_id = ? AND is_active ORDER BY end_date DESC
+        Index("ix_subscriptions_active_user_end_desc", "user_id", end_date.desc(),
+              postgresql_where=text("is_active = true")),
+        # get_subscriptions_near_expiration: end_date range over notifiable active subs
+        Index("ix_subscriptions_notifiable_end_date", "end_date",
+              postgresql_where=text("is_active = true AND skip_notifications = false")),
+        # Renewal scheduler: subscriptions due for an auto-renew charge
+        Index("ix_subscriptions_auto_renew_end_date", "end_date",
+              postgresql_where=text("is_active = true AND auto_renew_enabled = true")),
+    )
+
     def __repr__(self):
         return f"<Subscription(id={self.subscription_id}, user_id={self.user_id}, panel_uuid='{self.panel_user_uuid}', ends='{self.end_date}')>"
 
@@ -112,6 +132,16 @@ class Payment(Base):
     promo_code_used = relationship("PromoCode",
                                    back_populates="payments_where_used")
 
+    __table_args__ = (
+        Index("ix_payments_status_created_at", "status", "created_at"),
+        # get_last_tribute_payment(_duration): latest succeeded Tribute payment per user
+        Index("ix_payments_tribute_succeeded_user_created", "user_id", created_at.desc(),
+              postgresql_where=text("provider = 'tribute' AND status = 'succeeded'")),
+        # Referral purchase counts and per-user succeeded payment lookups
+        Index("ix_payments_succeeded_user", "user_id",
+              postgresql_where=text("status = 'succeeded'")),
+    )
+
 
 class UserBilling(Base):
     __tablename__ = "user_billing"
@@ -215,6 +245,10 @@ class MessageLog(Base):
                                foreign_keys=[target_user_id],
                                back_populates="message_logs_targeted")
 
+    __table_args__ = (
+        Index("ix_message_logs_target_user_timestamp", "target_user_id", "timestamp"),
+    )
+
 
 class PanelSyncStatus(Base):
     __tablename__ = "panel_sync_status"
@@ -259,3 +293,95 @@ class AdAttribution(Base):
 
     user = relationship("User")
     campaign = relationship("AdCampaign", back_populates="attributions")
+
+
+class AdCampaignCounters(Base):
+    """Per-campaign stats maintained incrementally (see ad_dal.bump_campaign_counters)."""
+    __tablename__ = "ad_campaign_counters"
+
+    ad_campaign_id = Column(Integer, ForeignKey("ad_campaigns.ad_campaign_id", ondelete="CASCADE"),
+                            primary_key=True)
+    starts = Column(Integer, nullable=False, default=0, server_default="0")
+    trials = Column(Integer, nullable=False, default=0, server_default="0")
+    payers = Column(Integer, nullable=False, default=0, server_default="0")
+    revenue = Column(Float, nullable=False, default=0.0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class ReferralCounters(Base):
+    """Per-inviter referral stats maintained incrementally (see referral_dal)."""
+    __tablename__ = "referral_counters"
+
+    inviter_id = Column(BigInteger, ForeignKey("users.user_id", ondelete="CASCADE"),
+                        primary_key=True)
+    invited = Column(Integer, nullable=False, default=0, server_default="0")
+    purchased = Column(Integer, nullable=False, default=0, server_default="0")
+    bonus_days_earned = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Serves the admin leaderboard (ORDER BY purchased DESC, invited DESC)
+        Index("ix_referral_counters_leaderboard", "purchased", "invited"),
+    )
+
+
+class WebhookInboxEvent(Base):
+    __tablename__ = "webhook_inbox"
+
+    event_pk = Column(BigInteger, primary_key=True, autoincrement=True)
+    provider = Column(String, nullable=False)
+    event_id = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)
+    # pending -> processing -> done, or back to pending with a later next_attempt_at; dead after max attempts
+    status = Column(String, nullable=False, default="pending", server_default="pending")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("provider", "event_id", name="uq_webhook_inbox_provider_event"),
+        Index("ix_webhook_inbox_due", "next_attempt_at",
+              postgresql_where=text("status IN ('pending', 'processing')")),
+        Index("ix_webhook_inbox_dead", "created_at",
+              postgresql_where=text("status = 'dead'")),
+    )
+
+    def __repr__(self):
+        return f"<WebhookInboxEvent(pk={self.event_pk}, provider='{self.provider}', event_id='{self.event_id}', status='{self.status}')>"
+
+
+class WebhookEventFingerprint(Base):
+    __tablename__ = "webhook_event_fingerprints"
+
+    fingerprint = Column(String(64), primary_key=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class SubscriptionRenewalAttempt(Base):
+    __tablename__ = "subscription_renewal_attempts"
+
+    attempt_id = Column(Integer, primary_key=True, autoincrement=True)
+    subscription_id = Column(Integer, ForeignKey("subscriptions.subscription_id"), nullable=False)
+    # end_date of the subscription when the attempt was made; a successful
+    # renewal moves end_date and starts a fresh series of attempts
+    period_end = Column(DateTime(timezone=True), nullable=False)
+    attempt_no = Column(Integer, nullable=False)
+    # charging -> initiated -> succeeded | declined; failed when no charge could be created
+    status = Column(String, nullable=False, default="charging")
+    idempotence_key = Column(String, nullable=False, unique=True)
+    yookassa_payment_id = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("subscription_id", "period_end", "attempt_no",
+                         name="uq_renewal_attempt_period_no"),
+        Index("ix_renewal_attempts_subscription_period", "subscription_id", "period_end"),
+        Index("ix_renewal_attempts_initiated", "created_at",
+              postgresql_where=text("status IN ('charging', 'initiated')")),
+    )
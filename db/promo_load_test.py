@@ -0,0 +1,119 @@
+"""Hammer promo_code_dal.activate_promo_code and check the activation limit holds.
+
+    python -m db.promo_load_test                     # 500 users racing for 100 activations
+    python -m db.promo_load_test --users 2000 --limit 50 --repeat 3 --concurrency 80
+    python -m db.promo_load_test --release-every 4  # every 4th claim fails and is released
+
+Creates a throwaway promo code and users with ids from TEST_USER_ID_BASE,
+fires the activations concurrently (each in its own session, like separate
+bot updates; ``--repeat`` sends every user several times to cover double
+taps), then compares ``current_activations`` with the activation rows.
+Like PromoCodeService, a claim is committed before the (simulated) bonus
+step; with ``--release-every`` some of those steps fail and the claim is
+undone with ``release_promo_activation``.
+Everything it created is deleted at the end. Use a staging database.
+"""
+import argparse
+import asyncio
+import logging
+import secrets
+import sys
+import time
+from collections import Counter
+
+from sqlalchemy import delete, func, select
+
+from .models import PromoCode, PromoCodeActivation, User
+
+TEST_USER_ID_BASE = 9_000_000_000_000
+
+
+async def _activate(session_factory, semaphore: asyncio.Semaphore, code: str, user_id: int,
+                    release: bool) -> str:
+    from .dal import promo_code_dal
+
+    async with semaphore, session_factory() as session:
+        status, promo_code_id, _ = await promo_code_dal.activate_promo_code(session, code, user_id)
+        if status != "activated":
+            await session.rollback()
+            return status
+        await session.commit()
+        if not release:
+            return status
+        # Bonus step failed: compensate the committed claim
+        await promo_code_dal.release_promo_activation(session, promo_code_id, user_id)
+        await session.commit()
+        return "released"
+
+
+async def _run(users: int, limit: int, repeat: int, concurrency: int, release_every: int) -> bool:
+    from dotenv import load_dotenv
+    from config.settings import get_settings
+    from . import database_setup
+
+    load_dotenv()
+    session_factory = database_setup.init_db_connection(get_settings())
+    engine = database_setup.async_engine
+    code = f"LOADTEST{secrets.token_hex(4).upper()}"
+    user_ids = [TEST_USER_ID_BASE + index for index in range(users)]
+    try:
+        async with session_factory() as session:
+            session.add_all(User(user_id=user_id, first_name="promo load test") for user_id in user_ids)
+            promo = PromoCode(code=code, bonus_days=1, max_activations=limit,
+                              current_activations=0, is_active=True, created_by_admin_id=0)
+            session.add(promo)
+            await session.commit()
+            promo_code_id = promo.promo_code_id
+
+        attempts = [user_id for user_id in user_ids for _ in range(repeat)]
+        semaphore = asyncio.Semaphore(concurrency)
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(_activate(session_factory, semaphore, code, user_id,
+                        release_every > 0 and index % release_every == release_every - 1)
+              for index, user_id in enumerate(attempts)),
+            return_exceptions=True)
+        elapsed = time.perf_counter() - started
+
+        outcomes = Counter(r if isinstance(r, str) else type(r).__name__ for r in results)
+        async with session_factory() as session:
+            counter = (await session.execute(
+                select(PromoCode.current_activations)
+                .where(PromoCode.promo_code_id == promo_code_id))).scalar_one()
+            rows = (await session.execute(
+                select(func.count(), func.count(func.distinct(PromoCodeActivation.user_id)))
+                .where(PromoCodeActivation.promo_code_id == promo_code_id))).one()
+
+        expected = min(limit, users)
+        print(f"{len(attempts)} activations in {elapsed:.2f}s ({len(attempts) / elapsed:.0f}/s)")
+        print(f"outcomes: {dict(outcomes)}")
+        print(f"current_activations={counter} activation rows={rows[0]} "
+              f"distinct users={rows[1]} limit={limit}")
+        ok = counter == rows[0] == rows[1] <= limit
+        if not release_every:
+            ok = ok and counter == outcomes["activated"] == expected
+        print("OK" if ok else "FAIL: activation limit overshot or counter out of sync")
+        return ok
+    finally:
+        async with session_factory() as session:
+            await session.execute(delete(PromoCodeActivation).where(
+                PromoCodeActivation.user_id.in_(user_ids)))
+            await session.execute(delete(PromoCode).where(PromoCode.code == code))
+            await session.execute(delete(User).where(User.user_id.in_(user_ids)))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent promo activation load test")
+    parser.add_argument("--users", type=int, default=500, help="Distinct users racing for the code")
+    parser.add_argument("--limit", type=int, default=100, help="max_activations of the test code")
+    parser.add_argument("--repeat", type=int, default=2, help="Activations sent per user")
+    parser.add_argument("--concurrency", type=int, default=50,
+                        help="Activations in flight at once (keep within the DB pool size)")
+    parser.add_argument("--release-every", type=int, default=0,
+                        help="Release every Nth committed claim, as after a failed bonus step")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(0 if asyncio.run(_run(args.users, args.limit, max(1, args.repeat), max(1, args.concurrency),
+                              max(0, args.release_every))) else 1)
@@ -0,0 +1,145 @@
+"""Print query plans for the hot query shapes covered by the index migrations.
+
+    python -m db.query_plans             # plans with the current indexes
+    python -m db.query_plans --compare   # also plans with the hot-path indexes hidden
+
+``--compare`` drops the indexes inside a transaction that is always rolled
+back, which takes an ACCESS EXCLUSIVE lock on the affected tables while it
+runs. Use it on a staging copy, not on a busy primary.
+"""
+import argparse
+import asyncio
+import logging
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from .migrator import MIGRATIONS
+
+# (title, SQL mirroring the DAL statement, sample parameter query)
+HOT_QUERIES: Tuple[Tuple[str, str, str], ...] = (
+    (
+        "subscription_dal.get_active_subscription_by_user_id",
+        "SELECT * FROM subscriptions WHERE user_id = :user_id AND is_active = true "
+        "AND end_date > now() ORDER BY end_date DESC",
+        "SELECT user_id FROM subscriptions ORDER BY subscription_id DESC LIMIT 1",
+    ),
+    (
+        "subscription_dal.get_subscriptions_near_expiration",
+        "SELECT s.* FROM subscriptions s JOIN users u ON u.user_id = s.user_id "
+        "WHERE s.is_active = true AND s.skip_notifications = false "
+        "AND s.end_date > now() AND s.end_date <= now() + interval '3 days' "
+        "AND (s.last_notification_sent IS NULL OR date(s.last_notification_sent) < current_date) "
+        "ORDER BY s.end_date ASC",
+        "SELECT 0",
+    ),
+    (
+        "subscription_dal.get_subscriptions_near_expiration (expiry notifier page)",
+        "SELECT s.* FROM subscriptions s JOIN users u ON u.user_id = s.user_id "
+        "WHERE s.is_active = true AND s.skip_notifications = false "
+        "AND s.end_date > now() + interval '1 day' AND s.end_date <= now() + interval '2 days' "
+        "AND (s.last_notification_sent IS NULL "
+        "OR s.last_notification_sent < s.end_date - interval '48 hours') "
+        "AND (s.end_date, s.subscription_id) > (now(), 0) "
+        "ORDER BY s.end_date ASC, s.subscription_id ASC LIMIT 500",
+        "SELECT 0",
+    ),
+    (
+        "referral_dal.get_referral_counters",
+        "SELECT invited, purchased, bonus_days_earned FROM referral_counters "
+        "WHERE inviter_id = :user_id",
+        "SELECT referred_by_id FROM users WHERE referred_by_id IS NOT NULL LIMIT 1",
+    ),
+    (
+        "referral_dal.get_top_referrers",
+        "SELECT c.*, u.username, u.first_name FROM referral_counters c "
+        "JOIN users u ON u.user_id = c.inviter_id WHERE c.invited > 0 "
+        "ORDER BY c.purchased DESC, c.invited DESC LIMIT 15",
+        "SELECT 0",
+    ),
+    (
+        "user_dal.search_users (name)",
+        "SELECT u.user_id FROM users u "
+        "WHERE lower(u.username) % 'alex' OR lower(u.first_name) % 'alex' "
+        "OR lower(u.username) LIKE '%alex%' OR lower(u.first_name) LIKE '%alex%'",
+        "SELECT 0",
+    ),
+    (
+        "user_dal.search_users (panel UUID prefix)",
+        "SELECT user_id FROM users WHERE panel_user_uuid LIKE '3f2a%'",
+        "SELECT 0",
+    ),
+    (
+        "payment_dal.get_last_tribute_payment",
+        "SELECT * FROM payments WHERE user_id = :user_id AND provider = 'tribute' "
+        "AND status = 'succeeded' ORDER BY created_at DESC LIMIT 1",
+        "SELECT user_id FROM payments WHERE provider = 'tribute' LIMIT 1",
+    ),
+    (
+        "payment_dal.get_recent_payment_logs_with_user",
+        "SELECT * FROM payments WHERE status = 'succeeded' ORDER BY created_at DESC LIMIT 20",
+        "SELECT 0",
+    ),
+)
+
+
+def _hot_path_index_names() -> List[str]:
+    return [index.name for m in MIGRATIONS for index in m.concurrent_indexes]
+
+
+async def _sample_user_id(conn: AsyncConnection, sample_sql: str) -> int:
+    value = (await conn.execute(text(sample_sql))).scalar()
+    return int(value or 0)
+
+
+async def _collect_plans(conn: AsyncConnection) -> Dict[str, str]:
+    plans: Dict[str, str] = {}
+    for title, sql, sample_sql in HOT_QUERIES:
+        params = {}
+        if ":user_id" in sql:
+            params["user_id"] = await _sample_user_id(conn, sample_sql)
+        result = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params)
+        plans[title] = "\n".join(row[0] for row in result)
+    return plans
+
+
+def _print_plans(header: str, plans: Dict[str, str]) -> None:
+    print(f"===== {header} =====")
+    for title, plan in plans.items():
+        print(f"--- {title}")
+        print(plan)
+        print()
+
+
+async def _run(compare: bool) -> None:
+    from dotenv import load_dotenv
+    from config.settings import get_settings
+    from . import database_setup
+
+    load_dotenv()
+    database_setup.init_db_connection(get_settings())
+    engine = database_setup.async_engine
+    try:
+        if compare:
+            async with engine.connect() as conn:
+                tx = await conn.begin()
+                try:
+                    for index_name in _hot_path_index_names():
+                        await conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+                    _print_plans("without hot-path indexes", await _collect_plans(conn))
+                finally:
+                    await tx.rollback()
+        async with engine.connect() as conn:
+            _print_plans("current indexes", await _collect_plans(conn))
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show query plans for hot query shapes")
+    parser.add_argument("--compare", action="store_true",
+                        help="Also show plans with the hot-path indexes hidden (staging only)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(_run(args.compare))
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+# Replication delay in seconds, 0 when the replica has replayed everything it
+# received (an idle primary otherwise looks like an ever-growing lag) and NULL
+# when the target is not a standby at all.
+_REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReportingDatabase:
+    """Routes read-only reporting queries to the replica when it is healthy.
+
+    Admin statistics, log browsing, CSV exports and inline stats use
+    `session()`. The replica is used only when configured and its replication
+    lag is below `max_lag_seconds`; otherwise the caller's primary session (or a
+    fresh primary session) is used. Lag is checked at most once per
+    `lag_check_interval` seconds.
+    """
+
+    def __init__(self,
+                 primary_session_factory: sessionmaker,
+                 replica_session_factory: Optional[sessionmaker] = None,
+                 max_lag_seconds: float = 30.0,
+                 lag_check_interval: float = 15.0):
+        self.primary_session_factory = primary_session_factory
+        self.replica_session_factory = replica_session_factory
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_check_interval = lag_check_interval
+        self._replica_usable = False
+        self._checked_at: Optional[float] = None
+        self._check_lock = asyncio.Lock()
+
+    @property
+    def has_replica(self) -> bool:
+        return self.replica_session_factory is not None
+
+    def mark_replica_unhealthy(self) -> None:
+        self._replica_usable = False
+        self._checked_at = time.monotonic()
+
+    async def _check_replica(self) -> bool:
+        try:
+            async with self.replica_session_factory() as replica_session:
+                lag = (await replica_session.execute(_REPLICA_LAG_SQL)).scalar()
+        except Exception as e:
+            logging.warning(f"Read replica health check failed, using primary: {e}")
+            return False
+        lag_seconds = float(lag or 0)
+        if lag_seconds > self.max_lag_seconds:
+            logging.warning(
+                f"Read replica lag {lag_seconds:.1f}s exceeds {self.max_lag_seconds}s, using primary."
+            )
+            return False
+        return True
+
+    async def is_replica_usable(self) -> bool:
+        if not self.has_replica:
+            return False
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.lag_check_interval:
+            return self._replica_usable
+        async with self._check_lock:
+            # Another coroutine may have refreshed the state while we waited
+            if self._checked_at is not None and time.monotonic() - self._checked_at < self.lag_check_interval:
+                return self._replica_usable
+            self._replica_usable = await self._check_replica()
+            self._checked_at = time.monotonic()
+        return self._replica_usable
+
+    @asynccontextmanager
+    async def session(self, primary_session: Optional[AsyncSession] = None) -> AsyncIterator[AsyncSession]:
+        """Yield a session for read-only reporting queries.
+
+        Falls back to `primary_session` (or a new primary session) when the
+        replica is absent, lagging or was found broken. Connection errors on the
+        replica mark it unhealthy until the next lag check.
+        """
+        if await self.is_replica_usable():
+            async with self.replica_session_factory() as replica_session:
+                try:
+                    yield replica_session
+                except (OperationalError, DBAPIError, OSError):
+                    self.mark_replica_unhealthy()
+                    raise
+            return
+
+        if primary_session is not None:
+            yield primary_session
+            return
+
+        async with self.primary_session_factory() as new_primary_session:
+            yield new_primary_session
+
+
+@asynccontextmanager
+async def reporting_session(reporting_db: Optional[ReportingDatabase],
+                            primary_session: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """Use the reporting database if it was injected, otherwise the primary session."""
+    if reporting_db is None:
+        yield primary_session
+        return
+    async with reporting_db.session(primary_session) as session:
+        yield session
@@ -0,0 +1,49 @@
+"""Check or repair the per-inviter referral counters.
+
+    python -m db.referral_counters check    # list inviters whose counters drifted
+    python -m db.referral_counters repair   # recompute invited/purchased from users and payments
+
+The counters are kept up to date incrementally (user creation, referrer
+attribution, first succeeded payment, inviter bonus). ``repair`` rebuilds
+``invited`` and ``purchased`` from the source tables in one transaction;
+``bonus_days_earned`` has no source table and is left as recorded.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+
+async def _run(command: str) -> int:
+    from dotenv import load_dotenv
+    from config.settings import get_settings
+    from . import database_setup
+    from .dal import referral_dal
+
+    load_dotenv()
+    session_factory = database_setup.init_db_connection(get_settings())
+    engine = database_setup.async_engine
+    try:
+        async with session_factory() as session:
+            if command == "repair":
+                changed = await referral_dal.rebuild_referral_counters(session)
+                await session.commit()
+                print(f"Referral counters repaired: {changed} row(s) changed.")
+                return 0
+            drift = await referral_dal.find_counter_drift(session)
+        for row in drift:
+            print(f"inviter {row['inviter_id']}: "
+                  f"invited {row['invited']} (expected {row['expected_invited']}), "
+                  f"purchased {row['purchased']} (expected {row['expected_purchased']})")
+        print(f"{len(drift)} inviter(s) with drifted counters.")
+        return 1 if drift else 0
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Referral counters check and repair")
+    parser.add_argument("command", nargs="?", default="check", choices=("check", "repair"))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(asyncio.run(_run(args.command)))